@@ -0,0 +1,268 @@
+"""
+Benchmark the DatabaseManager and the table pages on synthetic databases
+
+Each size runs in its own process with its own database file, the results
+are written as JSON so they can be compared between commits:
+
+    uv run python benchmarks/bench.py --sizes 10000 100000 --output bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from functools import partial
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def timed(
+    results: list,
+    name: str,
+    function,
+    rows: int = None,
+    repeat: int = 1,
+    before=None,
+):
+    """
+    Run the function and record its best time, before is called untimed
+    before each run
+    """
+    best = None
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+
+    result = {"benchmark": name, "seconds": round(best, 6)}
+    if rows is not None:
+        result["rows"] = rows
+        result["rows_per_second"] = round(rows / best) if best else None
+    results.append(result)
+    print(f"  {name}: {best:.4f}s", file=sys.stderr)
+
+
+def run_size(size: int, folder: str, skip_slow: bool) -> list:
+    """
+    Generate a database of the given size and run the benchmarks on it
+
+    Must run in a fresh process, the engine is created from
+    LOCATION_DATABASE_URL when the location package is imported.
+    """
+    sys.path.insert(0, BENCHMARKS_DIR)
+    from generate import generate
+
+    from location.database.migrations import migrate
+    from location.database.database_manager import DatabaseManager
+    from location.database.schema import EquipmentCreate, LocationCreate
+    from location.logs import configure_logging
+
+    results = []
+    clients, equipments = size, max(size // 10, 10)
+
+    configure_logging()
+    generate(folder, clients, equipments, size)
+    migrate()
+    db = DatabaseManager()
+
+    # Writes
+    timed(results, "seed", lambda: db.seed(folder), rows=clients + equipments + size)
+
+    new_equipments = []
+
+    def create_equipments(count=200):
+        for i in range(count):
+            new_equipments.append(
+                db.create_equipment(
+                    EquipmentCreate(
+                        name=f"Benchmark {i}", cost_per_day=10, is_available=True
+                    )
+                )
+            )
+
+    def create_locations():
+        for i, equipment_id in enumerate(new_equipments):
+            db.create_location(
+                LocationCreate(
+                    id_client=1 + i % clients,
+                    id_equipment=equipment_id,
+                    start_date=datetime(2030, 1, 1),
+                    end_date=datetime(2030, 1, 2),
+                    is_returned=False,
+                )
+            )
+
+    timed(results, "create_equipment", create_equipments, rows=200)
+    timed(results, "create_location", create_locations, rows=200)
+
+    # Reads
+    timed(
+        results,
+        "get_locations_page",
+        lambda: db.get_locations_page(limit=500),
+        rows=500,
+        repeat=5,
+    )
+    timed(
+        results,
+        "iter_locations_pages",
+        lambda: sum(1 for _ in db.iter_pages(db.get_locations_page, 2000)),
+        rows=size,
+    )
+    timed(
+        results,
+        "iter_location_rows_pages",
+        lambda: sum(
+            1 for _ in db.iter_pages(partial(db.get_rows_page, "locations"), 2000)
+        ),
+        rows=size,
+    )
+    if not skip_slow:
+        timed(results, "get_locations", db.get_locations, rows=size)
+    # Cached reads are measured cold and warm
+    timed(
+        results,
+        "get_clients",
+        db.get_clients,
+        rows=clients,
+        before=db.cache.clear,
+    )
+    timed(
+        results,
+        "get_free_equipments",
+        lambda: db.get_free_equipments(datetime(2024, 1, 1), datetime(2024, 1, 8)),
+        repeat=3,
+        before=db.cache.clear,
+    )
+    timed(
+        results,
+        "get_client_by_id_cached",
+        lambda: [db.get_client_by_id(1 + i % 100) for i in range(10_000)],
+        rows=10_000,
+    )
+
+    # Searches
+    timed(results, "search_clients", lambda: db.search_clients("Martin"), repeat=5)
+    timed(results, "search_equipments", lambda: db.search_equipments("Scie"), repeat=5)
+    timed(results, "search_locations", lambda: db.search_locations("Scie"), repeat=3)
+
+    # Table population, headless
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtWidgets import QApplication
+    from location.ui.location_page import LocationPage
+
+    app = QApplication.instance() or QApplication([])
+    page = LocationPage()
+
+    def populate():
+        page.show()
+        while page.loader.is_loading():
+            app.processEvents()
+
+    timed(results, "location_page_populate", populate, rows=size)
+
+    for result in results:
+        result["size"] = size
+    return results
+
+
+def compare(old_path: str, new_path: str):
+    """
+    Print the change of each benchmark between two result files
+    """
+    with open(old_path) as f:
+        old = {(r["size"], r["benchmark"]): r for r in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = json.load(f)["results"]
+
+    for result in new:
+        key = (result["size"], result["benchmark"])
+        if key not in old or not old[key]["seconds"]:
+            continue
+        ratio = result["seconds"] / old[key]["seconds"]
+        flag = "  REGRESSION" if ratio > 1.2 else ""
+        print(
+            f"{key[0]:>9} {key[1]:<28} {old[key]['seconds']:>10.4f}s "
+            f"-> {result['seconds']:>10.4f}s  x{ratio:.2f}{flag}"
+        )
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=BENCHMARKS_DIR,
+        ).stdout.strip()
+    except OSError:
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument(
+        "--skip-slow", action="store_true", help="skip the full get_locations"
+    )
+    parser.add_argument(
+        "--compare", metavar="OLD_RESULTS", help="compare the output with old results"
+    )
+    # Internal: run a single size in this process
+    parser.add_argument("--run-size", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--folder", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_size is not None:
+        results = run_size(args.run_size, args.folder, args.skip_slow)
+        print(json.dumps(results))
+        return
+
+    results = []
+    for size in args.sizes:
+        print(f"Size {size}", file=sys.stderr)
+        with tempfile.TemporaryDirectory() as folder:
+            env = dict(os.environ)
+            env["LOCATION_DATABASE_URL"] = f"sqlite:///{folder}/bench.db"
+            command = [
+                sys.executable,
+                __file__,
+                "--run-size",
+                str(size),
+                "--folder",
+                folder,
+            ]
+            if args.skip_slow:
+                command.append("--skip-slow")
+
+            process = subprocess.run(
+                command, env=env, stdout=subprocess.PIPE, text=True, check=True
+            )
+            results.extend(json.loads(process.stdout.strip().splitlines()[-1]))
+
+    report = {
+        "commit": git_commit(),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+    if args.compare:
+        compare(args.compare, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Generate synthetic CSV files in the format of the data folder
+"""
+
+import argparse
+import csv
+import os
+import random
+from datetime import date, timedelta
+
+FIRST_NAMES = ["Marc", "Sophie", "Julien", "Camille", "Thomas", "Manon", "Lucas"]
+LAST_NAMES = ["Dubois", "Martin", "Bernard", "Girard", "Robert", "Lambert", "Petit"]
+EQUIPMENTS = ["Perceuse", "Scie", "Ponceuse", "Marteau-piqueur", "Échafaudage"]
+
+# Rentals are spread over this period
+FIRST_DAY = date(2020, 1, 1)
+DAYS = 6 * 365
+
+
+def generate(folder: str, clients: int, equipments: int, locations: int, seed=42):
+    """
+    Write clients.csv, equipments.csv and locations.csv in the folder
+    """
+    rng = random.Random(seed)
+    os.makedirs(folder, exist_ok=True)
+
+    with open(os.path.join(folder, "clients.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "email", "phone"])
+        for i in range(clients):
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            writer.writerow([name, f"client{i}@example.com", f"{5140000000 + i}"])
+
+    with open(os.path.join(folder, "equipments.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "cost_per_day", "is_available"])
+        for i in range(equipments):
+            cost = f"{rng.randint(500, 20000) / 100:.2f}"
+            writer.writerow([f"{rng.choice(EQUIPMENTS)} {i}", cost, "True"])
+
+    with open(os.path.join(folder, "locations.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            ["id_client", "id_equipment", "start_date", "end_date", "is_returned"]
+        )
+        for _ in range(locations):
+            start = FIRST_DAY + timedelta(days=rng.randrange(DAYS))
+            end = start + timedelta(days=rng.randint(1, 30))
+            writer.writerow(
+                [
+                    rng.randint(1, clients),
+                    rng.randint(1, equipments),
+                    start.isoformat(),
+                    end.isoformat(),
+                    # Most of the rentals are returned
+                    "True" if rng.random() < 0.95 else "False",
+                ]
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("folder")
+    parser.add_argument("--clients", type=int, default=10_000)
+    parser.add_argument("--equipments", type=int, default=1_000)
+    parser.add_argument("--locations", type=int, default=10_000)
+    args = parser.parse_args()
+
+    generate(args.folder, args.clients, args.equipments, args.locations)
+
+
+if __name__ == "__main__":
+    main()
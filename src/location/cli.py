@@ -0,0 +1,200 @@
+"""
+Batch operations on the database, without the graphical interface
+
+    uv run cli overdue
+    uv run cli return-before 2025-01-01
+    uv run cli set-price --percent 5 --name Perceuse
+    uv run cli import-clients clients.csv
+    uv run cli sync ../succursale-nord/my_app.db
+    uv run cli sync http://192.168.1.20:8000
+    uv run cli snapshot //serveur/partage/snapshot.db
+"""
+
+import argparse
+import csv
+import sys
+from datetime import datetime
+from decimal import Decimal
+
+# Only the database is imported, the CLI must start without Qt
+from location.database.database_manager import DatabaseManager
+from location.database.migrations import migrate
+from location.logs import configure_logging
+
+
+def parse_date(value: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date {value}, expected YYYY-MM-DD")
+
+
+def print_overdue(rows: list, as_csv: bool):
+    today = datetime.now().date()
+    headers = ["id", "client", "equipment", "end_date", "days_late"]
+    lines = [
+        (
+            row.id,
+            row.client_name or "",
+            row.equipment_name or "",
+            row.end_date.date().isoformat(),
+            (today - row.end_date.date()).days,
+        )
+        for row in rows
+    ]
+
+    if as_csv:
+        writer = csv.writer(sys.stdout)
+        writer.writerow(headers)
+        writer.writerows(lines)
+        return
+
+    widths = [
+        max([len(header)] + [len(str(line[i])) for line in lines])
+        for i, header in enumerate(headers)
+    ]
+    for line in [headers] + lines:
+        print("  ".join(str(value).ljust(width) for value, width in zip(line, widths)))
+    print(f"{len(lines)} overdue locations")
+
+
+def overdue(db: DatabaseManager, args):
+    print_overdue(db.get_overdue_locations(args.before), args.csv)
+
+
+def return_before(db: DatabaseManager, args):
+    if args.dry_run:
+        rows = db.get_overdue_locations(args.date)
+        print(f"{len(rows)} locations would be returned")
+        return
+
+    ids = db.return_locations_before(args.date)
+    print(f"{len(ids)} locations returned")
+
+
+def set_price(db: DatabaseManager, args):
+    ids = db.update_prices(
+        percent=args.percent,
+        cost_per_day=args.daily,
+        equipment_ids=args.equipment,
+        name=args.name,
+    )
+    print(f"{len(ids)} equipments updated")
+
+
+def import_clients(db: DatabaseManager, args):
+    report = db.import_clients(args.path, update_existing=not args.skip_existing)
+    print(report)
+    for error in report.errors:
+        print(f"    {error}")
+
+
+def sync(db: DatabaseManager, args):
+    for report in db.sync_with(args.target):
+        print(report)
+        for error in report.errors:
+            print(f"    {error}")
+
+    conflicts = db.get_sync_conflicts()
+    if conflicts:
+        print(f"{len(conflicts)} double bookings to solve:")
+        for conflict in conflicts:
+            print(
+                f"    equipment {conflict.id_equipment}: locations "
+                f"{conflict.location_id} and {conflict.other_location_id}"
+            )
+
+
+def sync_node(db: DatabaseManager, args):
+    print(db.new_sync_node_id() if args.new else db.sync_node_id())
+
+
+def snapshot(db: DatabaseManager, args):
+    print(db.create_snapshot(args.path))
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser(
+        "overdue", help="list the locations not returned after their end date"
+    )
+    command.add_argument(
+        "--before", type=parse_date, help="end date limit, today by default"
+    )
+    command.add_argument("--csv", action="store_true", help="print as CSV")
+    command.set_defaults(run=overdue)
+
+    command = commands.add_parser(
+        "return-before",
+        help="mark all the locations ending before a date as returned today, "
+        "the late fees are counted up to today",
+    )
+    command.add_argument("date", type=parse_date)
+    command.add_argument(
+        "--dry-run", action="store_true", help="only count the locations"
+    )
+    command.set_defaults(run=return_before)
+
+    command = commands.add_parser(
+        "set-price", help="change the rates of many equipments at once"
+    )
+    price = command.add_mutually_exclusive_group(required=True)
+    price.add_argument(
+        "--percent", type=float, help="change all the rates by a percentage"
+    )
+    price.add_argument("--daily", type=Decimal, help="set the daily rate")
+    command.add_argument("--equipment", type=int, nargs="+", help="equipment ids")
+    command.add_argument("--name", help="only the equipments whose name contains it")
+    command.set_defaults(run=set_price)
+
+    command = commands.add_parser(
+        "import-clients",
+        help="merge a CSV of clients (name, email, phone) matched on email or phone",
+    )
+    command.add_argument("path")
+    command.add_argument(
+        "--skip-existing",
+        action="store_true",
+        help="leave the clients already in the database unchanged",
+    )
+    command.set_defaults(run=import_clients)
+
+    command = commands.add_parser(
+        "sync",
+        help="exchange the changes with the database of another branch",
+    )
+    command.add_argument(
+        "target", help="path or URL of its database, or URL of its server"
+    )
+    command.set_defaults(run=sync)
+
+    command = commands.add_parser("sync-node", help="print the branch id")
+    command.add_argument(
+        "--new",
+        action="store_true",
+        help="give a new branch id, after copying the database of another branch",
+    )
+    command.set_defaults(run=sync_node)
+
+    command = commands.add_parser(
+        "snapshot",
+        help="write a compact copy of the database for the read-only workstations",
+    )
+    command.add_argument("path")
+    command.set_defaults(run=snapshot)
+
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    # Initialize the database and apply the migrations
+    migrate()
+    try:
+        args.run(DatabaseManager(), args)
+    except Exception as e:
+        parser.exit(1, f"Error: {e}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+from datetime import datetime
+from sqlalchemy import Integer, and_, case, cast, func, literal, select
+
+from .models import Client, Equipment, Location
+from .pricing import PricingEngine
+
+# Groups of the revenue report
+REVENUE_GROUPS = ("equipment", "client", "month")
+
+
+class AnalyticsEngine:
+    """
+    Build the aggregate reports on the locations as SQL queries, so years of
+    history are summed by the database instead of row by row in Python
+    """
+
+    pricing = PricingEngine()
+
+    def revenue(self, group_by: str, start: datetime = None, end: datetime = None):
+        """
+        Query of the revenue per equipment, client or month of the locations
+        starting between the dates, summed from their stored cost
+
+        Rows are (key, label, rentals, days, revenue), the key of a month is
+        its number as yyyymm.
+        """
+        # Group on the columns of the locations so SQLite can walk their
+        # indexes, the names are joined on the totals
+        if group_by == "equipment":
+            key = Location.id_equipment
+        elif group_by == "client":
+            key = Location.id_client
+        elif group_by == "month":
+            key = cast(func.strftime("%Y%m", Location.start_date), Integer)
+        else:
+            raise ValueError(f"Cannot group the revenue by {group_by}")
+
+        days = self.pricing.sql_rental_days()
+        totals = (
+            select(
+                key.label("key"),
+                func.min(Location.start_date).label("first_start_date"),
+                func.count(Location.id).label("rentals"),
+                func.sum(days).label("days"),
+                func.round(func.sum(Location.total_cost), 2).label("revenue"),
+            )
+            .where(*self.started_between(start, end))
+            .group_by(key)
+            .subquery()
+        )
+
+        if group_by == "equipment":
+            label = Equipment.name
+            source = totals.join(Equipment, totals.c.key == Equipment.id)
+        elif group_by == "client":
+            label = Client.name
+            source = totals.join(Client, totals.c.key == Client.id)
+        else:
+            label = func.strftime("%Y-%m", totals.c.first_start_date)
+            source = totals
+
+        return (
+            select(
+                totals.c.key,
+                label.label("label"),
+                totals.c.rentals,
+                totals.c.days,
+                totals.c.revenue,
+            )
+            .select_from(source)
+            .order_by(totals.c.key)
+        )
+
+    def utilization(self, start: datetime, end: datetime, now: datetime = None):
+        """
+        Query of the share of the days between the dates each equipment was
+        rented
+
+        The locations are clipped to the dates. A location not returned
+        after its end date keeps its equipment busy until now, like in the
+        availability checks. Rows are (id, name, rented_days, utilization).
+        """
+        self.check_dates(start, end)
+        now = now or datetime.now()
+        period_days = max((end - start).total_seconds() / 86400, 1)
+
+        # Overdue locations are still running
+        location_end = case(
+            (and_(~Location.is_returned, Location.end_date < now), literal(now)),
+            else_=Location.end_date,
+        )
+        rented = func.max(
+            func.min(func.julianday(location_end), func.julianday(literal(end)))
+            - func.max(
+                func.julianday(Location.start_date), func.julianday(literal(start))
+            ),
+            0,
+        )
+        rented_days = (
+            select(
+                Location.id_equipment,
+                func.sum(rented).label("rented_days"),
+            )
+            .where(Location.start_date < end, location_end > start)
+            .group_by(Location.id_equipment)
+            .subquery()
+        )
+
+        days = func.coalesce(rented_days.c.rented_days, 0)
+        return (
+            select(
+                Equipment.id,
+                Equipment.name,
+                days.label("rented_days"),
+                # Imported locations of an equipment may overlap
+                func.min(days / period_days, 1.0).label("utilization"),
+            )
+            .outerjoin(rented_days, rented_days.c.id_equipment == Equipment.id)
+            .order_by(Equipment.id)
+        )
+
+    def overdue(self, today: datetime):
+        """
+        Query of the number of locations not returned after their end date,
+        per client
+
+        Rows are (id, name, count, oldest_end_date).
+        """
+        return (
+            select(
+                Client.id,
+                Client.name,
+                func.count(Location.id).label("count"),
+                func.min(Location.end_date).label("oldest_end_date"),
+            )
+            .select_from(Location)
+            .join(Client, Location.id_client == Client.id)
+            .where(~Location.is_returned, Location.end_date < today)
+            .group_by(Client.id)
+            .order_by(Client.id)
+        )
+
+    def started_between(self, start: datetime, end: datetime):
+        conditions = []
+        if start is not None:
+            conditions.append(Location.start_date >= start)
+        if end is not None:
+            conditions.append(Location.start_date < end)
+        if start is not None and end is not None:
+            self.check_dates(start, end)
+        return conditions
+
+    def check_dates(self, start: datetime, end: datetime):
+        if end < start:
+            raise ValueError("End date is before start date")
@@ -0,0 +1,107 @@
+from datetime import datetime
+from sqlalchemy import and_, exists, insert, literal, or_, select
+
+from .models import Equipment, Location
+from .overdue import start_of_today
+from .schema import LocationCreate
+
+
+class OverlapError(Exception):
+    """
+    Raised when an equipment is already rented for some of the requested dates
+    """
+
+
+class AvailabilityEngine:
+    """
+    Answer which equipments are free between two dates with the
+    (id_equipment, start_date, end_date) index of the locations
+
+    Equipment.is_available is only set by the staff, to take an equipment out
+    of service. Whether it is rented always comes from its locations.
+    """
+
+    def overlaps(self, start: datetime, end: datetime):
+        """
+        Condition on the locations that keep an equipment busy between the dates
+
+        Dates are inclusive. A location not returned after its end day
+        (overdue) keeps its equipment busy until it is returned.
+        """
+        return and_(
+            ~Location.is_returned,
+            Location.start_date <= end,
+            or_(Location.end_date >= start, Location.end_date < start_of_today()),
+        )
+
+    def busy(self, start: datetime, end: datetime, equipment_id=Equipment.id):
+        """
+        Condition true if the equipment has a location between the dates
+        """
+        return exists().where(
+            Location.id_equipment == equipment_id, self.overlaps(start, end)
+        )
+
+    def free(self, start: datetime, end: datetime, equipment_id: int):
+        """
+        Condition true if the equipment is in service and has no location
+        between the dates
+        """
+        in_service = exists().where(
+            Equipment.id == equipment_id, Equipment.is_available
+        )
+        return and_(in_service, ~self.busy(start, end, equipment_id))
+
+    def rented(self, now: datetime, equipment_id=Equipment.id):
+        """
+        Condition true if the equipment is out: one of its locations has
+        started and is not returned
+        """
+        return exists().where(
+            Location.id_equipment == equipment_id,
+            ~Location.is_returned,
+            Location.start_date <= now,
+        )
+
+    def free_equipments(self, start: datetime, end: datetime):
+        """
+        Query of the equipments in service and free between the dates
+        """
+        self.check_dates(start, end)
+        return (
+            select(Equipment)
+            .where(Equipment.is_available, ~self.busy(start, end))
+            .order_by(Equipment.id)
+        )
+
+    def is_free(self, session, equipment_id: int, start: datetime, end: datetime):
+        self.check_dates(start, end)
+        stmt = select(self.free(start, end, equipment_id))
+        return session.execute(stmt).scalar()
+
+    def insert_location(self, session, data: LocationCreate, **extra) -> int:
+        """
+        Insert the location only if its equipment is in service and free for
+        its dates, extra are the values of the other columns of the location
+
+        The check and the insert are a single INSERT ... SELECT ... WHERE NOT
+        EXISTS statement, so two concurrent bookings can't both succeed.
+        """
+        self.check_dates(data.start_date, data.end_date)
+
+        values = data.model_dump() | extra
+        columns = list(values)
+        source = select(*[literal(values[c]) for c in columns]).where(
+            self.free(data.start_date, data.end_date, data.id_equipment)
+        )
+        stmt = insert(Location).from_select(columns, source).returning(Location.id)
+
+        location_id = session.execute(stmt).scalar()
+        if location_id is None:
+            raise OverlapError("Equipment is not available for these dates")
+
+        return location_id
+
+    def check_dates(self, start: datetime, end: datetime):
+        if end < start:
+            raise ValueError("End date is before start date")
@@ -0,0 +1,113 @@
+import csv
+import os
+import time
+from itertools import islice
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from sqlalchemy import insert
+
+from .database import engine
+from .models import Client, Equipment, Location
+from .pricing import PricingEngine
+from .schema import ClientCreate, EquipmentCreate, LocationCreate
+
+# Number of CSV rows validated and inserted at once
+CHUNK_SIZE = 10_000
+
+# CSV file, model and schema of each table, in the order they must be imported
+IMPORTS = [
+    ("clients.csv", Client, ClientCreate),
+    ("equipments.csv", Equipment, EquipmentCreate),
+    ("locations.csv", Location, LocationCreate),
+]
+
+
+class ImportReport(BaseModel):
+    table: str
+    inserted: int = 0
+    rejected: int = 0
+    seconds: float = 0.0
+    errors: list[str] = []
+
+    @property
+    def rows_per_second(self) -> float:
+        if self.seconds == 0:
+            return 0.0
+        return self.inserted / self.seconds
+
+    def __str__(self):
+        return (
+            f"{self.table}: {self.inserted} rows in {self.seconds:.2f}s "
+            f"({self.rows_per_second:,.0f} rows/s), {self.rejected} rejected"
+        )
+
+
+class BulkImporter:
+    """
+    Import CSV files in chunks, each chunk being validated at once and
+    inserted with a single executemany in one transaction per file
+    """
+
+    # Only keep the first errors in the report
+    max_errors = 20
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE):
+        self.chunk_size = chunk_size
+
+    def validate(self, schema, rows: list[dict], first_line: int, report):
+        """
+        Validate a chunk of rows and return the valid ones as dicts
+        """
+        adapter = TypeAdapter(list[schema])
+        try:
+            return [item.model_dump() for item in adapter.validate_python(rows)]
+        except ValidationError as e:
+            # Drop the invalid rows and validate the others again
+            invalid = {error["loc"][0] for error in e.errors()}
+            for error in e.errors():
+                if len(report.errors) < self.max_errors:
+                    line = first_line + error["loc"][0]
+                    report.errors.append(f"line {line}: {error['msg']}")
+
+            report.rejected += len(invalid)
+            valid = [row for index, row in enumerate(rows) if index not in invalid]
+            return [item.model_dump() for item in adapter.validate_python(valid)]
+
+    def import_csv(self, path: str, model, schema) -> ImportReport:
+        """
+        Stream a CSV file into a table
+        """
+        report = ImportReport(table=model.__tablename__)
+        start = time.perf_counter()
+
+        with (
+            open(path, "r", newline="", encoding="utf-8-sig") as f,
+            engine.begin() as connection,
+        ):
+            reader = csv.DictReader(f)
+            # The first data row is on line 2, after the header
+            line = 2
+
+            while chunk := list(islice(reader, self.chunk_size)):
+                rows = self.validate(schema, chunk, line, report)
+                if rows:
+                    connection.execute(insert(model), rows)
+                    report.inserted += len(rows)
+                line += len(chunk)
+
+            if model is Location:
+                # Price the imported locations with the rates of their equipment
+                PricingEngine().backfill(connection)
+
+        report.seconds = time.perf_counter() - start
+        return report
+
+    def import_folder(self, folder: str = "data") -> list[ImportReport]:
+        """
+        Import the clients, equipments and locations CSV files of a folder
+        """
+        reports = []
+        for filename, model, schema in IMPORTS:
+            path = os.path.join(folder, filename)
+            if os.path.exists(path):
+                reports.append(self.import_csv(path, model, schema))
+        return reports
@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Number of entries kept by default
+CACHE_SIZE = 1024
+
+# Seconds between two reads of the version, the writes of the other
+# processes are seen after at most this delay
+VERSION_INTERVAL = 1.0
+
+
+class LRUCache:
+    """
+    A thread-safe least recently used cache of query results
+
+    Entries are keyed by (entity, id) or by (entity, query, *arguments) for
+    the lists. A list entry can depend on several entities and is dropped as
+    soon as one of them changes.
+
+    The writes of the process invalidate their entries. version returns a
+    number changing with the writes of the other connections, read at most
+    once per version_interval: the whole cache is dropped when it changed,
+    unless the change was acknowledged as made by the writes of the process.
+    """
+
+    def __init__(
+        self,
+        max_size: int = CACHE_SIZE,
+        version=None,
+        version_interval: float = VERSION_INTERVAL,
+    ):
+        self.max_size = max_size
+        self.version = version
+        self.version_interval = version_interval
+        self.data_version = None
+        self.checked_at = None
+        self.entries = OrderedDict()
+        self.lists = {}
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, key: tuple, load, depends_on: tuple = ()):
+        """
+        Return the cached value of the key, or load it and cache it
+
+        A value loaded while an invalidation happened is not cached, it may
+        already be stale.
+        """
+        self.check_version()
+
+        with self.lock:
+            if key in self.entries:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return self.entries[key]
+
+            self.misses += 1
+            generation = self.generation
+
+        value = load()
+
+        with self.lock:
+            if generation == self.generation:
+                self.entries[key] = value
+                for entity in depends_on:
+                    self.lists.setdefault(entity, set()).add(key)
+                self.evict()
+
+        return value
+
+    def check_version(self):
+        """
+        Drop the whole cache if the version changed since it was last read
+        """
+        if self.version is None:
+            return
+
+        now = time.monotonic()
+        with self.lock:
+            if self.checked_at is not None:
+                if now - self.checked_at < self.version_interval:
+                    return
+            self.checked_at = now
+
+        data_version = self.version()
+        with self.lock:
+            if data_version != self.data_version:
+                self.data_version = data_version
+                self.generation += 1
+                self.entries.clear()
+                self.lists.clear()
+
+    def acknowledge(self, before: int, after: int):
+        """
+        Keep the cache over a change of the version made only by writes of
+        the process, their entries are invalidated one by one
+
+        before is the version read before the writes, after the version read
+        after their commit.
+        """
+        with self.lock:
+            if before is not None and before == self.data_version:
+                self.data_version = after
+
+    def evict(self):
+        while len(self.entries) > self.max_size:
+            key, _ = self.entries.popitem(last=False)
+            for keys in self.lists.values():
+                keys.discard(key)
+
+    def invalidate(self, entity: str, ids: list[int] = ()):
+        """
+        Drop the entries of some rows of an entity and all its lists
+        """
+        with self.lock:
+            self.generation += 1
+            for id in ids:
+                self.entries.pop((entity, id), None)
+            for key in self.lists.pop(entity, set()):
+                self.entries.pop(key, None)
+                for keys in self.lists.values():
+                    keys.discard(key)
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+            self.lists.clear()
+
+    def stats(self) -> dict:
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
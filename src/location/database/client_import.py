@@ -0,0 +1,256 @@
+import csv
+import time
+from itertools import islice
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import IntegrityError
+
+from .models import Client
+from .validation import (
+    is_valid_email,
+    is_valid_phone,
+    normalize_email,
+    normalize_phone,
+)
+
+# Number of CSV rows written at once
+CHUNK_SIZE = 10_000
+
+
+class DuplicateClientError(Exception):
+    pass
+
+
+class ClientImportReport(BaseModel):
+    path: str = ""
+    inserted: int = 0
+    updated: int = 0
+    # Existing clients left as they were
+    unchanged: int = 0
+    # Rows with the email or the phone of a previous row of the file
+    duplicates: int = 0
+    # Rows with the email of a client and the phone of another one
+    conflicts: int = 0
+    rejected: int = 0
+    seconds: float = 0.0
+    errors: list[str] = []
+    inserted_ids: list[int] = []
+    updated_ids: list[int] = []
+
+    @property
+    def rows(self) -> int:
+        return (
+            self.inserted
+            + self.updated
+            + self.unchanged
+            + self.duplicates
+            + self.conflicts
+            + self.rejected
+        )
+
+    @property
+    def rows_per_second(self) -> float:
+        if self.seconds == 0:
+            return 0.0
+        return self.rows / self.seconds
+
+    def __str__(self):
+        return (
+            f"clients: {self.rows} rows in {self.seconds:.2f}s "
+            f"({self.rows_per_second:,.0f} rows/s), {self.inserted} inserted, "
+            f"{self.updated} updated, {self.unchanged} unchanged, "
+            f"{self.duplicates} duplicates, {self.conflicts} conflicts, "
+            f"{self.rejected} rejected"
+        )
+
+
+class ClientIndex:
+    """
+    Hash index of the clients by email and by phone, normalized
+    """
+
+    def __init__(self, rows):
+        self.clients = {}
+        self.by_email = {}
+        self.by_phone = {}
+        for id, name, email, phone in rows:
+            self.add(id, name, email, phone)
+
+    def add(self, id: int, name: str, email: str, phone: str):
+        self.clients[id] = (name, email, phone)
+        if email:
+            self.by_email[normalize_email(email)] = id
+        if phone:
+            self.by_phone[normalize_phone(phone)] = id
+
+    def remove(self, id: int):
+        _, email, phone = self.clients.pop(id)
+        if email and self.by_email.get(normalize_email(email)) == id:
+            del self.by_email[normalize_email(email)]
+        if phone and self.by_phone.get(normalize_phone(phone)) == id:
+            del self.by_phone[normalize_phone(phone)]
+
+    def match(self, email: str, phone: str) -> set[int]:
+        """
+        Return the ids of the clients with the email or the phone
+        """
+        ids = {self.by_email.get(email), self.by_phone.get(phone)}
+        ids.discard(None)
+        return ids
+
+
+class ClientImporter:
+    """
+    Merge a list of clients into the table in one pass
+
+    The existing clients are loaded once in a hash index by email and phone,
+    each row is then validated and matched in memory. Rows matching a client
+    update it, the others are inserted. Each chunk is written by a single
+    INSERT ... ON CONFLICT(id) DO UPDATE. A client inserted meanwhile by
+    another connection with an email or a phone of the file fails the
+    import, run again it updates that client.
+    """
+
+    # Only keep the first errors in the report
+    max_errors = 20
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE, update_existing: bool = True):
+        self.chunk_size = chunk_size
+        self.update_existing = update_existing
+
+    def import_csv(self, connection, path: str) -> ClientImportReport:
+        """
+        Merge a CSV file with the columns name, email and phone
+        """
+        with open(path, "r", newline="", encoding="utf-8-sig") as f:
+            report = self.import_rows(connection, csv.DictReader(f))
+        report.path = path
+        return report
+
+    def import_rows(self, connection, rows, first_line: int = 2):
+        """
+        Merge rows given as dicts, first_line is the line of the first row
+        in the errors
+        """
+        report = ClientImportReport()
+        start = time.perf_counter()
+
+        index = ClientIndex(
+            connection.execute(
+                select(Client.id, Client.name, Client.email, Client.phone)
+            )
+        )
+        # Line of the first row of the file with each email and phone
+        emails, phones = {}, {}
+
+        rows = iter(rows)
+        line = first_line
+        while chunk := list(islice(rows, self.chunk_size)):
+            inserts, updates = [], []
+            for offset, row in enumerate(chunk):
+                values = self.merge(row, line + offset, index, emails, phones, report)
+                if values is None:
+                    continue
+                if values["id"] is None:
+                    inserts.append(values)
+                else:
+                    updates.append(values)
+
+            self.write(connection, updates + inserts, report)
+            line += len(chunk)
+
+        report.seconds = time.perf_counter() - start
+        return report
+
+    def error(self, report: ClientImportReport, message: str):
+        if len(report.errors) < self.max_errors:
+            report.errors.append(message)
+
+    def merge(self, row: dict, line: int, index, emails, phones, report):
+        """
+        Validate a row and match it with the clients and the previous rows
+
+        Return the values to write, with the id of the client to update or
+        None to insert, None if the row is skipped.
+        """
+        name = (row.get("name") or "").strip()
+        email = normalize_email(row.get("email") or "")
+        phone = normalize_phone(row.get("phone") or "")
+
+        error = None
+        if not name:
+            error = "missing name"
+        elif not is_valid_email(email):
+            error = f"invalid email {email!r}"
+        elif not is_valid_phone(phone):
+            error = f"invalid phone {phone!r}"
+        if error is not None:
+            report.rejected += 1
+            self.error(report, f"line {line}: {error}")
+            return None
+
+        first = emails.get(email) or phones.get(phone)
+        if first is not None:
+            report.duplicates += 1
+            self.error(report, f"line {line}: duplicate of line {first}")
+            return None
+        emails[email] = phones[phone] = line
+
+        ids = index.match(email, phone)
+        if len(ids) > 1:
+            report.conflicts += 1
+            email_id, phone_id = index.by_email[email], index.by_phone[phone]
+            self.error(
+                report,
+                f"line {line}: email of client {email_id} "
+                f"and phone of client {phone_id}",
+            )
+            return None
+
+        if not ids:
+            return {"id": None, "name": name, "email": email, "phone": phone}
+
+        id = ids.pop()
+        if not self.update_existing or index.clients[id] == (name, email, phone):
+            report.unchanged += 1
+            return None
+
+        index.remove(id)
+        index.add(id, name, email, phone)
+        return {"id": id, "name": name, "email": email, "phone": phone}
+
+    def write(self, connection, rows: list[dict], report):
+        """
+        Upsert the rows in a single statement, the rows with the id of a
+        client update it
+
+        The updates come first, they may free emails and phones taken by the
+        inserts.
+        """
+        if not rows:
+            return
+
+        stmt = insert(Client)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Client.id],
+            set_={
+                "name": stmt.excluded.name,
+                "email": stmt.excluded.email,
+                "phone": stmt.excluded.phone,
+            },
+        ).returning(Client.id, Client.email)
+        try:
+            written = {email: id for id, email in connection.execute(stmt, rows)}
+        except IntegrityError as e:
+            raise DuplicateClientError(
+                "A client of the file was added meanwhile, import it again"
+            ) from e
+
+        for row in rows:
+            if row["id"] is None:
+                report.inserted += 1
+                report.inserted_ids.append(written[row["email"]])
+            else:
+                report.updated += 1
+                report.updated_ids.append(row["id"])
@@ -1,10 +1,171 @@
-from sqlalchemy import create_engine
+import logging
+import os
+import threading
+from functools import partial
+from pathlib import Path
+from sqlalchemy import create_engine, event, make_url
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import StaticPool
+from .instrumentation import query_profiler
+
+logger = logging.getLogger(__name__)
+
+# The database can be configured with environment variables, the logs are
+# configured by the entry points (location.logs)
+DATABASE_URL = os.environ.get("LOCATION_DATABASE_URL", "sqlite:///./my_app.db")
+
+# Set LOCATION_READ_ONLY=1 to open a snapshot of the database for browsing
+READ_ONLY = os.environ.get("LOCATION_READ_ONLY", "") not in ("", "0")
+
+# Pragmas applied to every new SQLite connection
+SQLITE_PRAGMAS = {
+    # Readers don't block the writer and the writer doesn't block readers
+    "journal_mode": "WAL",
+    # Safe with WAL, only the last transactions can be lost on power failure
+    "synchronous": "NORMAL",
+    # 256 MB memory mapped I/O
+    "mmap_size": 256 * 1024 * 1024,
+    # Negative value is in KB: 64 MB page cache
+    "cache_size": -64 * 1024,
+    "temp_store": "MEMORY",
+    # Wait for the writer instead of failing with "database is locked"
+    "busy_timeout": 5000,
+}
+
+
+# Pragmas of a read-only connection, the file is never written so it can be
+# mapped in memory whole and shared by the processes reading it
+READ_ONLY_PRAGMAS = {
+    # 2 GB memory mapped I/O, the most SQLite allows by default
+    "mmap_size": 2 * 1024 * 1024 * 1024 - 64 * 1024,
+    "cache_size": -64 * 1024,
+    "temp_store": "MEMORY",
+    "query_only": 1,
+}
+
+
+class ReadOnlyError(Exception):
+    """
+    Raised on a write to a database opened read-only
+    """
+
+
+class NotFoundError(Exception):
+    """
+    Raised when a row to change doesn't exist
+    """
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record, pragmas=SQLITE_PRAGMAS):
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+    cursor.close()
+
+
+def read_only_url(url: str) -> str:
+    """
+    URL opening a SQLite file read-only and immutable: SQLite doesn't lock
+    it nor look for a journal, any number of readers share it without
+    contention. The file must not be written while it is open.
+    """
+    uri = Path(make_url(url).database).absolute().as_uri()
+    return f"sqlite:///{uri}?mode=ro&immutable=1&uri=true"
+
+
+def is_read_only(bind) -> bool:
+    return bind.url.query.get("mode") == "ro"
+
+
+def create_db_engine(url: str = DATABASE_URL, read_only: bool = False):
+    """
+    Create an engine for the database, tuned for SQLite
+    """
+    logger.debug("Engine of %s, read-only: %s", url, read_only)
+
+    if not url.startswith("sqlite"):
+        db_engine = create_engine(url)
+        if query_profiler.enabled:
+            query_profiler.attach(db_engine)
+        return db_engine
+
+    pragmas = SQLITE_PRAGMAS
+    if url in ("sqlite://", "sqlite:///:memory:"):
+        # An in-memory database only exists in its connection, share it
+        db_engine = create_engine(
+            url,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+    else:
+        if read_only:
+            url, pragmas = read_only_url(url), READ_ONLY_PRAGMAS
+
+        # A small pool of connections, reused between sessions and threads
+        db_engine = create_engine(
+            url,
+            connect_args={"check_same_thread": False},
+            pool_size=5,
+            max_overflow=10,
+        )
+
+    event.listen(db_engine, "connect", partial(set_sqlite_pragmas, pragmas=pragmas))
+    if query_profiler.enabled:
+        query_profiler.attach(db_engine)
+    return db_engine
+
+
+class DataVersion:
+    """
+    Number changing each time another connection, of this process or not,
+    commits to the SQLite database (PRAGMA data_version)
+
+    The number is only comparable on the same connection, so it is read on
+    a connection of its own, taken from the pool once and kept.
+    """
+
+    def __init__(self, bind):
+        self.bind = bind
+        self.connection = None
+        self.lock = threading.Lock()
+
+    def is_supported(self) -> bool:
+        url = self.bind.url
+        in_memory = url.database in (None, "", ":memory:")
+        return url.get_backend_name() == "sqlite" and not in_memory
+
+    def __call__(self) -> int:
+        """
+        Return the current number, None when the database can't tell
+        """
+        if not self.is_supported():
+            return None
+
+        with self.lock:
+            if self.connection is None:
+                self.connection = self.bind.raw_connection()
+            return self.read(self.connection)
+
+    def of(self, connection) -> int:
+        """
+        Return the number of another connection of the engine, it only
+        changes with the commits of the connections other than this one
+        """
+        if not self.is_supported():
+            return None
+        return self.read(connection.connection.dbapi_connection)
+
+    @staticmethod
+    def read(dbapi_connection) -> int:
+        cursor = dbapi_connection.cursor()
+        try:
+            return cursor.execute("PRAGMA data_version").fetchone()[0]
+        finally:
+            cursor.close()
 
-DATABASE_URL = "sqlite:///./my_app.db"
 
 # Create the Engine
-engine = create_engine(DATABASE_URL, echo=True)
+engine = create_db_engine(read_only=READ_ONLY)
 
 # Create the SessionLocal class
 SessionLocal = sessionmaker(bind=engine)
@@ -1,9 +1,31 @@
-from datetime import datetime
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
 from decimal import Decimal
-import csv
+from sqlalchemy import and_, func, or_, select, text, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import joinedload
-from .database import SessionLocal
-from .models import Client, Equipment, Location
+from .analytics import AnalyticsEngine
+from .availability import AvailabilityEngine
+from .bulk_import import BulkImporter
+from .cache import LRUCache
+from .client_import import ClientImporter, ClientImportReport, DuplicateClientError
+from .database import (
+    DataVersion,
+    NotFoundError,
+    ReadOnlyError,
+    SessionLocal,
+    engine,
+    is_read_only,
+)
+from .instrumentation import query_profiler
+from .models import Client, Equipment, Location, SyncConflict
+from .overdue import SCAN_INTERVAL, OverdueTracker, start_of_today
+from .pricing import AlreadyReturnedError, PricingEngine
+from .search import MIN_MATCH_LENGTH, match_query
+from .snapshot import LocationRow, SnapshotReport, create_snapshot, has_location_rows
+from .sync import SyncEngine, SyncReport, open_peer, synchronize
+from .validation import normalize_email, normalize_phone
 from .schema import (
     ClientCreate,
     ClientRead,
@@ -11,63 +33,272 @@ from .schema import (
     EquipmentRead,
     LocationCreate,
     LocationRead,
+    OverdueRead,
+    Page,
+    RevenueRead,
+    UtilizationRead,
 )
 
+# Columns the paginated queries can be sorted on
+SORT_COLUMNS = {
+    Client: {"id", "name", "email", "phone"},
+    Equipment: {
+        "id",
+        "name",
+        "cost_per_day",
+        "cost_per_week",
+        "cost_per_month",
+        "is_available",
+    },
+    Location: {"id", "start_date", "end_date", "is_returned", "total_cost"},
+}
+SORT_COLUMNS[LocationRow] = SORT_COLUMNS[Location]
+
 
 class DatabaseManager:
-    def create_client(self, data: ClientCreate):
+    availability = AvailabilityEngine()
+    analytics = AnalyticsEngine()
+    pricing = PricingEngine()
+    sync = SyncEngine()
+
+    # Read-through cache shared by all managers, invalidated by notify and
+    # by the commits of the other processes
+    data_version = DataVersion(engine)
+    cache = LRUCache(version=data_version)
+
+    # Callbacks notified after each write, shared by all managers
+    listeners = []
+
+    # Ids of the overdue locations, once track_overdue is called
+    overdue = OverdueTracker()
+
+    # Snapshot opened with LOCATION_READ_ONLY=1, the writes are refused
+    read_only = is_read_only(engine)
+
+    # Whether the rows of the locations are precomputed, checked once
+    location_rows = None
+
+    @classmethod
+    def subscribe(cls, listener):
+        """
+        Register a callback called after a write by any DatabaseManager with
+        the table name, the ids of the rows inserted or updated and the
+        columns that changed (None for inserted rows)
+        """
+        cls.listeners.append(listener)
+
+    @classmethod
+    def unsubscribe(cls, listener):
+        if listener in cls.listeners:
+            cls.listeners.remove(listener)
+
+    def __init__(self):
+        # Session of the current transaction, per thread
+        self.local = threading.local()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run several writes in one session and one commit
+
+            with db.transaction():
+                client_id = db.create_client(client)
+                db.create_location(location)
+
+        The writes of the block share the session and its identity map, they
+        are all rolled back if one of them fails. Nested transactions join
+        the outer one. The changes are notified once committed.
+        """
+        if self.read_only:
+            raise ReadOnlyError("The database is opened read-only")
+
+        session = getattr(self.local, "session", None)
+        if session is not None:
+            yield session
+            return
+
+        # The version of the connection of the session only changes with
+        # the commits of the other connections, read it before the version
+        # of the cache
+        connection = engine.connect()
+        others = self.data_version.of(connection)
+        before = self.data_version()
+
+        self.local.session = session = SessionLocal(bind=connection)
+        self.local.pending = []
+        try:
+            yield session
+            session.commit()
+            after = self.data_version()
+            # Nothing else committed, the cache only misses these writes
+            if self.data_version.of(connection) == others:
+                self.cache.acknowledge(before, after)
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            pending = self.local.pending
+            self.local.session = None
+            self.local.pending = []
+            session.close()
+            connection.close()
+
+        for entity, ids, fields in pending:
+            self.notify(entity, ids, fields)
+
+    def notify(self, entity: str, ids: list[int], fields: set[str] = None):
+        # Wait for the commit of the current transaction
+        if getattr(self.local, "session", None) is not None:
+            self.local.pending.append((entity, ids, fields))
+            return
+
+        self.cache.invalidate(entity, ids)
+        for listener in list(self.listeners):
+            listener(entity, ids, fields)
+
+    def client_duplicates(self, session, email: str, phone: str, exclude_id=None):
+        """
+        Query of the clients with the same email, whatever its case, or the
+        same phone once normalized
+        """
+        query = session.query(Client).filter(
+            or_(
+                func.lower(Client.email) == normalize_email(email),
+                Client.phone == normalize_phone(phone),
+            )
+        )
+        if exclude_id is not None:
+            query = query.filter(Client.id != exclude_id)
+        return query
+
+    def find_client_duplicates(
+        self, email: str, phone: str, exclude_id: int = None
+    ) -> list[ClientRead]:
         with SessionLocal() as session:
+            query = self.client_duplicates(session, email, phone, exclude_id)
+            return [ClientRead.model_validate(c) for c in query.all()]
+
+    def check_client_duplicates(self, session, client: Client):
+        """
+        Raise DuplicateClientError if another client has the email or the
+        phone of a client written in the transaction
+
+        The client is flushed first: the transaction holds the write lock of
+        the database, so no other one can write a duplicate before the commit.
+        The unique columns already refuse the same email or phone.
+        """
+        try:
+            session.flush()
+        except IntegrityError as e:
+            raise DuplicateClientError("A client has the same email or phone") from e
+
+        duplicate = self.client_duplicates(
+            session, client.email, client.phone, client.id
+        ).first()
+        if duplicate is not None:
+            raise DuplicateClientError(
+                f"Client {duplicate.id} has the same email or phone"
+            )
+
+    def create_client(self, data: ClientCreate) -> int:
+        with self.transaction() as session:
             client = Client(**data.model_dump())
             session.add(client)
-            session.commit()
+            self.check_client_duplicates(session, client)
+            client_id = client.id
+
+        self.notify("clients", [client_id])
+        return client_id
 
     def update_client(self, client_id: int, data: ClientCreate):
-        with SessionLocal() as session:
-            client = session.query(Client).get(client_id)
+        with self.transaction() as session:
+            client = session.get(Client, client_id)
 
             if client is None:
-                raise Exception("Client not found")
+                raise NotFoundError("Client not found")
 
             client.name = data.name
             client.email = data.email
             client.phone = data.phone
-            session.commit()
+            self.check_client_duplicates(session, client)
 
-    def create_equipment(self, data: EquipmentCreate):
-        with SessionLocal() as session:
+        self.notify("clients", [client_id], {"name", "email", "phone"})
+
+    def import_clients(
+        self, path: str, update_existing: bool = True, notify: bool = True
+    ) -> ClientImportReport:
+        """
+        Merge a CSV file of clients, matched on their email or phone
+
+        Called off the GUI thread, pass notify=False and call notify_import
+        from the GUI thread once done.
+        """
+        with self.transaction() as session:
+            importer = ClientImporter(update_existing=update_existing)
+            report = importer.import_csv(session.connection(), path)
+
+        if notify:
+            self.notify_import(report)
+        return report
+
+    def notify_import(self, report: ClientImportReport):
+        if report.inserted_ids:
+            self.notify("clients", report.inserted_ids)
+        if report.updated_ids:
+            self.notify("clients", report.updated_ids, {"name", "email", "phone"})
+
+    def create_equipment(self, data: EquipmentCreate) -> int:
+        with self.transaction() as session:
             equipment = Equipment(**data.model_dump())
             session.add(equipment)
-            session.commit()
+            session.flush()
+            equipment_id = equipment.id
+
+        self.notify("equipments", [equipment_id])
+        return equipment_id
 
     def update_equipment(self, equipment_id: int, data: EquipmentCreate):
-        with SessionLocal() as session:
-            equipment = session.query(Equipment).get(equipment_id)
+        with self.transaction() as session:
+            equipment = session.get(Equipment, equipment_id)
 
             if equipment is None:
-                raise Exception("Equipment not found")
+                raise NotFoundError("Equipment not found")
 
             equipment.name = data.name
             equipment.cost_per_day = data.cost_per_day
+            equipment.cost_per_week = data.cost_per_week
+            equipment.cost_per_month = data.cost_per_month
             equipment.is_available = data.is_available
-            session.commit()
 
-    def create_location(self, data: LocationCreate):
-        with SessionLocal() as session:
-            equipment = session.query(Equipment).get(data.id_equipment)
+        fields = {"name", "cost_per_day", "cost_per_week", "cost_per_month"}
+        self.notify("equipments", [equipment_id], fields | {"is_available"})
+
+    def create_location(self, data: LocationCreate) -> int:
+        """
+        Create a location, raise OverlapError if the equipment is already
+        rented for some of its dates
+        """
+        with self.transaction() as session:
+            equipment = session.get(Equipment, data.id_equipment)
 
             if equipment is None:
-                raise Exception("Equipment not found")
+                raise NotFoundError("Equipment not found")
 
-            equipment.is_available = False
+            # Keep the rates of the equipment, later price changes don't
+            # change the cost of the location
+            quote = self.pricing.quote(equipment, data.start_date, data.end_date)
+            location_id = self.availability.insert_location(session, data, **quote)
 
-            location = Location(**data.model_dump())
-            session.add(location)
-            session.commit()
+        self.notify("locations", [location_id])
+        return location_id
 
     def get_clients(self):
-        with SessionLocal() as session:
-            clients = session.query(Client).all()
-            return [ClientRead.model_validate(c) for c in clients]
+        def load():
+            with SessionLocal() as session:
+                clients = session.query(Client).all()
+                return [ClientRead.model_validate(c) for c in clients]
+
+        return list(self.cache.get_or_load(("clients", "all"), load, ("clients",)))
 
     def get_equipments(self):
         with SessionLocal() as session:
@@ -84,77 +315,698 @@ class DatabaseManager:
 
             return [LocationRead.model_validate(loc) for loc in locations]
 
-    def return_location(self, id):
+    def get_clients_by_ids(self, ids: list[int]):
+        with SessionLocal() as session:
+            clients = session.query(Client).filter(Client.id.in_(ids)).all()
+            return [ClientRead.model_validate(c) for c in clients]
+
+    def get_equipments_by_ids(self, ids: list[int]):
+        with SessionLocal() as session:
+            stmt = session.query(Equipment).filter(Equipment.id.in_(ids))
+            equipments = stmt.all()
+            return [EquipmentRead.model_validate(e) for e in equipments]
+
+    def get_locations_by_ids(self, ids: list[int]):
+        with SessionLocal() as session:
+            stmt = (
+                session.query(Location)
+                .options(joinedload(Location.client), joinedload(Location.equipment))
+                .filter(Location.id.in_(ids))
+            )
+
+            locations = stmt.all()
+
+            return [LocationRead.model_validate(loc) for loc in locations]
+
+    def get_location_ids_for(self, client_ids=None, equipment_ids=None):
+        """
+        Return the ids of the locations of some clients or equipments
+        """
+        with SessionLocal() as session:
+            stmt = session.query(Location.id)
+            if client_ids is not None:
+                stmt = stmt.filter(Location.id_client.in_(client_ids))
+            if equipment_ids is not None:
+                stmt = stmt.filter(Location.id_equipment.in_(equipment_ids))
+            return [row.id for row in stmt]
+
+    def paginate(self, stmt, model, limit, cursor, order_by, descending):
+        """
+        Apply a keyset pagination on (order_by, id) to a query
+
+        Return the rows of the page and the cursor of the next one. Empty
+        values come first, and last in descending order.
+        """
+        if order_by not in SORT_COLUMNS[model]:
+            raise ValueError(f"Cannot sort on {order_by}")
+
+        sort_column = getattr(model, order_by)
+
+        # Only keep the rows after the cursor
+        if cursor is not None:
+            value, last_id = cursor
+            after_id = model.id < last_id if descending else model.id > last_id
+
+            if order_by == "id":
+                stmt = stmt.filter(after_id)
+            elif value is None:
+                # Rows after the empty values: the values, or none at all
+                if descending:
+                    stmt = stmt.filter(sort_column.is_(None), after_id)
+                else:
+                    stmt = stmt.filter(
+                        or_(
+                            sort_column.is_not(None),
+                            and_(sort_column.is_(None), after_id),
+                        )
+                    )
+            else:
+                if descending:
+                    after_value = or_(sort_column < value, sort_column.is_(None))
+                else:
+                    after_value = sort_column > value
+                stmt = stmt.filter(
+                    or_(after_value, and_(sort_column == value, after_id))
+                )
+
+        if descending:
+            stmt = stmt.order_by(sort_column.desc().nulls_last(), model.id.desc())
+        else:
+            stmt = stmt.order_by(sort_column.asc().nulls_first(), model.id)
+
+        # Fetch one more row to know if there is a next page
+        rows = stmt.limit(limit + 1).all()
+        if len(rows) <= limit:
+            return rows, None
+
+        rows = rows[:limit]
+        last = rows[-1]
+        return rows, (getattr(last, order_by), last.id)
+
+    def get_clients_page(
+        self,
+        limit: int = 500,
+        cursor: tuple = None,
+        order_by: str = "id",
+        descending: bool = False,
+        name: str = None,
+    ) -> Page[ClientRead]:
+        with SessionLocal() as session:
+            stmt = session.query(Client)
+            if name:
+                stmt = stmt.filter(Client.name.contains(name, autoescape=True))
+
+            clients, next_cursor = self.paginate(
+                stmt, Client, limit, cursor, order_by, descending
+            )
+
+            return Page[ClientRead](
+                items=[ClientRead.model_validate(c) for c in clients],
+                next_cursor=next_cursor,
+            )
+
+    def get_equipments_page(
+        self,
+        limit: int = 500,
+        cursor: tuple = None,
+        order_by: str = "id",
+        descending: bool = False,
+        name: str = None,
+        is_available: bool = None,
+    ) -> Page[EquipmentRead]:
+        with SessionLocal() as session:
+            stmt = session.query(Equipment)
+            if name:
+                stmt = stmt.filter(Equipment.name.contains(name, autoescape=True))
+            if is_available is not None:
+                stmt = stmt.filter(Equipment.is_available == is_available)
+
+            equipments, next_cursor = self.paginate(
+                stmt, Equipment, limit, cursor, order_by, descending
+            )
+
+            return Page[EquipmentRead](
+                items=[EquipmentRead.model_validate(e) for e in equipments],
+                next_cursor=next_cursor,
+            )
+
+    def get_locations_page(
+        self,
+        limit: int = 500,
+        cursor: tuple = None,
+        order_by: str = "id",
+        descending: bool = False,
+        id_client: int = None,
+        id_equipment: int = None,
+        is_returned: bool = None,
+        start_after: datetime = None,
+        end_before: datetime = None,
+    ) -> Page[LocationRead]:
+        with SessionLocal() as session:
+            stmt = session.query(Location).options(
+                joinedload(Location.client), joinedload(Location.equipment)
+            )
+            if id_client is not None:
+                stmt = stmt.filter(Location.id_client == id_client)
+            if id_equipment is not None:
+                stmt = stmt.filter(Location.id_equipment == id_equipment)
+            if is_returned is not None:
+                stmt = stmt.filter(Location.is_returned == is_returned)
+            if start_after is not None:
+                stmt = stmt.filter(Location.start_date >= start_after)
+            if end_before is not None:
+                stmt = stmt.filter(Location.end_date < end_before)
+
+            locations, next_cursor = self.paginate(
+                stmt, Location, limit, cursor, order_by, descending
+            )
+
+            return Page[LocationRead](
+                items=[LocationRead.model_validate(loc) for loc in locations],
+                next_cursor=next_cursor,
+            )
+
+    def row_query(self, session, entity: str):
+        """
+        Query of the columns displayed for an entity, returning plain rows
+        instead of ORM objects
+        """
+        if entity == "clients":
+            query = session.query(Client.id, Client.name, Client.email, Client.phone)
+            return query, Client
+
+        if entity == "equipments":
+            query = session.query(
+                Equipment.id,
+                Equipment.name,
+                Equipment.is_available,
+                Equipment.cost_per_day,
+                Equipment.cost_per_week,
+                Equipment.cost_per_month,
+            )
+            return query, Equipment
+
+        if entity == "locations" and self.use_location_rows(session):
+            query = session.query(
+                LocationRow.id,
+                LocationRow.client_name,
+                LocationRow.equipment_name,
+                LocationRow.start_date,
+                LocationRow.end_date,
+                LocationRow.is_returned,
+                LocationRow.total_cost,
+            )
+            return query, LocationRow
+
+        if entity == "locations":
+            query = (
+                session.query(
+                    Location.id,
+                    Client.name.label("client_name"),
+                    Equipment.name.label("equipment_name"),
+                    Location.start_date,
+                    Location.end_date,
+                    Location.is_returned,
+                    Location.total_cost,
+                )
+                .outerjoin(Client, Location.id_client == Client.id)
+                .outerjoin(Equipment, Location.id_equipment == Equipment.id)
+            )
+            return query, Location
+
+        raise Exception(f"Unknown entity {entity}")
+
+    def use_location_rows(self, session) -> bool:
+        """
+        A snapshot has the rows of the list of the locations precomputed,
+        they can't be used on a database that is written
+        """
+        if DatabaseManager.location_rows is None:
+            DatabaseManager.location_rows = self.read_only and has_location_rows(
+                session.connection()
+            )
+        return DatabaseManager.location_rows
+
+    def row_columns(self, entity: str) -> list[tuple]:
+        """
+        Return the name and the SQL type of the columns of the rows of an entity
+        """
+        with SessionLocal() as session:
+            query, _ = self.row_query(session, entity)
+            return [(c["name"], c["type"]) for c in query.column_descriptions]
+
+    def count_rows(self, entity: str) -> int:
+        with SessionLocal() as session:
+            _, model = self.row_query(session, entity)
+            return session.scalar(select(func.count()).select_from(model))
+
+    def get_rows_page(
+        self,
+        entity: str,
+        limit: int = 500,
+        cursor: tuple = None,
+        order_by: str = "id",
+        descending: bool = False,
+        **filters,
+    ) -> Page[tuple]:
+        """
+        Lean version of the get_*_page methods: the rows are tuples of the
+        displayed columns, without ORM objects nor validation
+
+        Filters are equality conditions on the columns of the entity.
+        """
+        with SessionLocal() as session:
+            stmt, model = self.row_query(session, entity)
+            for column, value in filters.items():
+                stmt = stmt.filter(getattr(model, column) == value)
+
+            rows, next_cursor = self.paginate(
+                stmt, model, limit, cursor, order_by, descending
+            )
+
+            # The rows come from the database, no need to validate them
+            return Page[tuple].model_construct(items=rows, next_cursor=next_cursor)
+
+    def get_rows_by_ids(self, entity: str, ids: list[int]) -> list[tuple]:
+        """
+        Lean version of the get_*_by_ids methods
+        """
+        with SessionLocal() as session:
+            stmt, model = self.row_query(session, entity)
+            return stmt.filter(model.id.in_(ids)).all()
+
+    def iter_pages(self, get_page, batch_size: int = 1000, **filters):
+        """
+        Walk through all the pages of a paginated query and yield their items
+
+        Example: for locations in db.iter_pages(db.get_locations_page): ...
+        """
+        cursor = None
+        while True:
+            page = get_page(limit=batch_size, cursor=cursor, **filters)
+            if page.items:
+                yield page.items
+            if page.next_cursor is None:
+                return
+            cursor = page.next_cursor
+
+    def match_ids(self, model, index: str, columns: list[str], search_text: str):
+        """
+        Build a query returning the ids of the rows where one of the columns
+        contains the text
+        """
+        if len(search_text) >= MIN_MATCH_LENGTH and len(columns) == 1:
+            query = match_query(search_text, columns[0])
+        elif len(search_text) >= MIN_MATCH_LENGTH:
+            query = match_query(search_text)
+        else:
+            # Too short for the full text index, scan the table
+            return select(model.id).where(
+                or_(
+                    *[
+                        getattr(model, column).contains(search_text, autoescape=True)
+                        for column in columns
+                    ]
+                )
+            )
+
+        return (
+            select(text("rowid"))
+            .select_from(text(index))
+            .where(text(f"{index} MATCH :query").bindparams(query=query))
+        )
+
+    def search_clients(self, search_text: str) -> list[int]:
+        """
+        Return the ids of the clients whose name, email or phone contains the text
+        """
+        search_text = search_text.strip()
+        with SessionLocal() as session:
+            stmt = self.match_ids(
+                Client, "clients_search", ["name", "email", "phone"], search_text
+            )
+            return list(session.scalars(stmt))
+
+    def search_equipments(self, search_text: str) -> list[int]:
+        """
+        Return the ids of the equipments whose name contains the text
+        """
+        search_text = search_text.strip()
         with SessionLocal() as session:
-            location = session.query(Location).get(id)
+            stmt = self.match_ids(Equipment, "equipments_search", ["name"], search_text)
+            return list(session.scalars(stmt))
+
+    def search_locations(self, search_text: str) -> list[int]:
+        """
+        Return the ids of the locations whose client or equipment name contains the text
+        """
+        search_text = search_text.strip()
+        with SessionLocal() as session:
+            clients = self.match_ids(Client, "clients_search", ["name"], search_text)
+            equipments = self.match_ids(
+                Equipment, "equipments_search", ["name"], search_text
+            )
+            stmt = select(Location.id).where(
+                or_(
+                    Location.id_client.in_(clients),
+                    Location.id_equipment.in_(equipments),
+                )
+            )
+            return list(session.scalars(stmt))
+
+    def return_location(self, id):
+        with self.transaction() as session:
+            location = session.get(Location, id)
 
             if location is None:
-                raise Exception("Location not found")
+                raise NotFoundError("Location not found")
+            if location.is_returned:
+                raise AlreadyReturnedError("Location already returned")
 
             location.is_returned = True
-            equipment = session.query(Equipment).get(location.id_equipment)
+            self.pricing.bill_return(location, datetime.now())
+            location_id = location.id
 
-            if equipment is None:
-                raise Exception("Equipment not found")
+        fields = {"is_returned", "returned_at", "total_cost", "late_fee"}
+        self.notify("locations", [location_id], fields)
 
-            equipment.is_available = True
-            session.commit()
+    def return_locations_before(self, end: datetime) -> list[int]:
+        """
+        Return all the locations not returned ending before the date in a
+        single statement, and return their ids
+
+        They are returned now, not at the date: their late fees are counted
+        up to today, like a return at the counter, and added to their cost.
+        The pricing backfill computes the same fees from returned_at.
+        """
+        now = datetime.now()
+        late_fee = self.pricing.sql_late_fee(now)
+        to_return = and_(~Location.is_returned, Location.end_date < end)
+
+        with self.transaction() as session:
+            # Locations without a cost yet, imported or synchronized, are
+            # priced first, like return_location does
+            self.pricing.backfill(session.connection(), where=to_return)
+            stmt = (
+                update(Location)
+                .where(to_return)
+                .values(
+                    is_returned=True,
+                    returned_at=now,
+                    late_fee=late_fee,
+                    total_cost=Location.total_cost + late_fee,
+                )
+                .returning(Location.id)
+                .execution_options(synchronize_session=False)
+            )
+            location_ids = list(session.execute(stmt).scalars())
+
+        fields = {"is_returned", "returned_at", "total_cost", "late_fee"}
+        self.notify("locations", location_ids, fields)
+        return location_ids
+
+    def update_prices(
+        self,
+        percent: float = None,
+        cost_per_day: Decimal = None,
+        equipment_ids: list[int] = None,
+        name: str = None,
+    ) -> list[int]:
+        """
+        Change the rates of many equipments in a single statement, by a
+        percentage of all their rates or to a fixed daily rate, and return
+        their ids
+
+        Only the equipments with the given ids or whose name contains the
+        text are changed, all of them by default. The existing locations
+        keep the rates they were created with.
+        """
+        if (percent is None) == (cost_per_day is None):
+            raise ValueError("Give either a percentage or a daily rate")
+
+        if percent is not None:
+            factor = 1 + percent / 100
+            values = {
+                column: func.round(getattr(Equipment, column) * factor, 2)
+                for column in ("cost_per_day", "cost_per_week", "cost_per_month")
+            }
+        else:
+            values = {"cost_per_day": cost_per_day}
+
+        stmt = update(Equipment).values(**values).returning(Equipment.id)
+        if equipment_ids is not None:
+            stmt = stmt.where(Equipment.id.in_(equipment_ids))
+        if name:
+            stmt = stmt.where(Equipment.name.contains(name, autoescape=True))
+
+        with self.transaction() as session:
+            stmt = stmt.execution_options(synchronize_session=False)
+            ids = list(session.scalars(stmt))
+
+        self.notify("equipments", ids, set(values))
+        return ids
+
+    def get_overdue_locations(self, before: datetime = None) -> list[tuple]:
+        """
+        Return the rows of the locations not returned ending before the date,
+        today by default, the most late first
+        """
+        if before is None:
+            before = start_of_today()
 
-    def get_available_equipments(self):
         with SessionLocal() as session:
-            stmt = session.query(Equipment).filter(Equipment.is_available)
-            equipments = stmt.all()
-            return [EquipmentRead.model_validate(e) for e in equipments]
+            stmt, model = self.row_query(session, "locations")
+            stmt = stmt.filter(~model.is_returned, model.end_date < before)
+            return stmt.order_by(model.end_date, model.id).all()
+
+    def track_overdue(self, interval: float = SCAN_INTERVAL):
+        """
+        Scan the overdue locations periodically in a background thread and
+        keep them up to date with the writes in between
+        """
+        if self.overdue.is_running():
+            return
+
+        self.subscribe(self.overdue.on_database_change)
+        self.overdue.start(interval)
+
+    def get_free_equipments(self, start: datetime, end: datetime):
+        """
+        Return the equipments that can be rented between the dates
+        """
+
+        def load():
+            with SessionLocal() as session:
+                stmt = self.availability.free_equipments(start, end)
+                equipments = session.scalars(stmt).all()
+                return [EquipmentRead.model_validate(e) for e in equipments]
+
+        # Overdue locations keep their equipment busy, the result changes
+        # with the day
+        key = ("equipments", "free", start, end, date.today())
+        return list(self.cache.get_or_load(key, load, ("equipments", "locations")))
+
+    def get_available_equipments(self):
+        def load():
+            with SessionLocal() as session:
+                stmt = session.query(Equipment).filter(Equipment.is_available)
+                equipments = stmt.all()
+                return [EquipmentRead.model_validate(e) for e in equipments]
+
+        key = ("equipments", "available")
+        return list(self.cache.get_or_load(key, load, ("equipments",)))
 
     def get_client_by_id(self, id):
-        with SessionLocal() as session:
-            client = session.query(Client).get(id)
-            if client is None:
-                return None
-            return ClientRead.model_validate(client)
+        def load():
+            with SessionLocal() as session:
+                client = session.get(Client, id)
+                if client is None:
+                    return None
+                return ClientRead.model_validate(client)
+
+        return self.cache.get_or_load(("clients", int(id)), load)
 
     def get_equipment_by_id(self, id):
+        def load():
+            with SessionLocal() as session:
+                equipment = session.get(Equipment, id)
+                if equipment is None:
+                    return None
+                return EquipmentRead.model_validate(equipment)
+
+        return self.cache.get_or_load(("equipments", int(id)), load)
+
+    def get_revenue(
+        self, group_by: str, start: datetime = None, end: datetime = None
+    ) -> list[RevenueRead]:
+        """
+        Return the revenue per "equipment", "client" or "month" of the
+        locations starting between the dates
+        """
+
+        def load():
+            with SessionLocal() as session:
+                stmt = self.analytics.revenue(group_by, start, end)
+                return [RevenueRead.model_validate(r) for r in session.execute(stmt)]
+
+        key = ("locations", "revenue", group_by, start, end)
+        depends_on = ("locations", "equipments", "clients")
+        return list(self.cache.get_or_load(key, load, depends_on))
+
+    def get_utilization(self, start: datetime, end: datetime) -> list[UtilizationRead]:
+        """
+        Return the share of the days between the dates each equipment was rented
+        """
+
+        def load():
+            with SessionLocal() as session:
+                stmt = self.analytics.utilization(start, end)
+                return [
+                    UtilizationRead.model_validate(r) for r in session.execute(stmt)
+                ]
+
+        key = ("locations", "utilization", start, end)
+        return list(self.cache.get_or_load(key, load, ("locations", "equipments")))
+
+    def get_overdue(self) -> list[OverdueRead]:
+        """
+        Return the number of locations not returned after their end date,
+        per client
+        """
+        # A location is overdue the day after its end date
+        today = start_of_today()
+
+        def load():
+            with SessionLocal() as session:
+                stmt = self.analytics.overdue(today)
+                return [OverdueRead.model_validate(r) for r in session.execute(stmt)]
+
+        key = ("locations", "overdue", today)
+        return list(self.cache.get_or_load(key, load, ("locations", "clients")))
+
+    def recompute_costs(self, only_missing: bool = True) -> int:
+        """
+        Price the locations without cost, return the number of locations
+        updated
+
+        Locations without rates take the current rates of their equipment.
+        only_missing=False prices all the locations again, replacing their
+        stored cost.
+        """
+        with self.transaction() as session:
+            updated = self.pricing.backfill(session.connection(), only_missing)
+
+        self.cache.invalidate("locations")
+        return updated
+
+    def sync_node_id(self) -> str:
+        """
+        Return the id of the branch of the database
+        """
         with SessionLocal() as session:
-            equipment = session.query(Equipment).get(id)
-            if equipment is None:
-                return None
-            return EquipmentRead.model_validate(equipment)
+            return self.sync.node_id(session.connection())
+
+    def new_sync_node_id(self) -> str:
+        """
+        Give a new branch id to a database copied from another branch
+        """
+        with self.transaction() as session:
+            return self.sync.new_node_id(session.connection())
+
+    def sync_watermark(self, node: str) -> int:
+        with SessionLocal() as session:
+            return self.sync.watermark(session.connection(), node)
 
-    def seed(self):
+    def sync_handshake(self, node: str) -> tuple[str, int]:
+        """
+        Return the id of this branch and the last change of the branch node
+        applied here
+        """
+        with SessionLocal() as session:
+            connection = session.connection()
+            return self.sync.node_id(connection), self.sync.watermark(connection, node)
+
+    def sync_changes(self, since: int = 0, for_node: str = None) -> dict:
+        """
+        Return the rows changed after the seq since, for the branch for_node
+        """
+        with SessionLocal() as session:
+            return self.sync.changes(session.connection(), since, for_node)
+
+    def apply_changes(self, change_set: dict) -> SyncReport:
+        """
+        Apply the changes of another branch in one transaction
+        """
+        with self.transaction() as session:
+            report = self.sync.apply(session.connection(), change_set)
+
+        for entity, ids in report.changed.items():
+            self.notify(entity, ids)
+        return report
+
+    def sync_with(self, target: str) -> list[SyncReport]:
+        """
+        Exchange the changes with the database of another branch: a path, a
+        SQLAlchemy URL or the URL of its server
+        """
+        peer = open_peer(target)
+        try:
+            reports = synchronize(self, peer)
+        finally:
+            peer.close()
+
+        with self.transaction() as session:
+            self.sync.compact(session.connection())
+        return reports
+
+    def get_sync_conflicts(self, include_resolved: bool = False) -> list:
+        """
+        Return the double bookings found by the synchronizations
+        """
+        with SessionLocal() as session:
+            return self.sync.conflicts(session.connection(), include_resolved)
+
+    def resolve_sync_conflict(self, conflict_id: int):
+        with self.transaction() as session:
+            conflict = session.get(SyncConflict, conflict_id)
+
+            if conflict is None:
+                raise NotFoundError("Conflict not found")
+
+            conflict.is_resolved = True
+
+    def create_snapshot(self, path: str) -> SnapshotReport:
+        """
+        Write a compact read-only copy of the database, to open with
+        LOCATION_READ_ONLY=1
+        """
+        return create_snapshot(path)
+
+    def cache_stats(self) -> dict:
+        """
+        Return the size and the hit/miss counters of the cache
+        """
+        return self.cache.stats()
+
+    def seed(self, folder: str = "data"):
         """
         Seed the database with mock data from the data folder
         """
         try:
-            with open("data/clients.csv", "r") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    self.create_client(ClientCreate(**row))
-
-            with open("data/equipments.csv", "r") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    e = EquipmentCreate(
-                        name=row["name"],
-                        cost_per_day=Decimal(row["cost_per_day"]),
-                        is_available=row["is_available"].lower() == "true",
-                    )
-                    self.create_equipment(e)
-
-            with open("data/locations.csv", "r") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    loc = LocationCreate(
-                        id_client=int(row["id_client"]),
-                        id_equipment=int(row["id_equipment"]),
-                        start_date=datetime.strptime(row["start_date"], "%Y-%m-%d"),
-                        end_date=datetime.strptime(row["end_date"], "%Y-%m-%d"),
-                        is_returned=row["is_returned"].lower() == "true",
-                    )
-                    self.create_location(loc)
+            reports = BulkImporter().import_folder(folder)
+            self.cache.clear()
 
             print("\n")
             print("====================================================")
             print("         Database seeded successfully")
             print("====================================================")
+            for report in reports:
+                print(report)
+                for error in report.errors:
+                    print(f"    {error}")
         except Exception as e:
             print(f"Error when seeding the db: {e}")
+
+
+# Time each method and count its queries, with LOCATION_PROFILE_QUERIES=1
+query_profiler.instrument(DatabaseManager, exclude=("transaction",))
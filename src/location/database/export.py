@@ -0,0 +1,287 @@
+import csv
+import json
+import os
+import struct
+import time
+import zlib
+from array import array
+from datetime import datetime, timedelta
+from decimal import Decimal
+from functools import partial
+from pydantic import BaseModel
+from sqlalchemy import Boolean, DateTime, Integer, Numeric
+
+# Number of rows fetched and written at once
+EXPORT_BATCH_SIZE = 5000
+
+# Format of the files, by extension
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".lcol": "columnar"}
+
+# Columnar files start with this, followed by the version of the format
+COLUMNAR_MAGIC = b"LCOL"
+COLUMNAR_VERSION = 1
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class ExportReport(BaseModel):
+    table: str
+    path: str
+    rows: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        if self.seconds == 0:
+            return 0.0
+        return self.rows / self.seconds
+
+    def __str__(self):
+        return (
+            f"{self.table}: {self.rows} rows in {self.seconds:.2f}s "
+            f"({self.rows_per_second:,.0f} rows/s) to {self.path}"
+        )
+
+
+def format_of(path: str) -> str:
+    """
+    Return the format of a file from its extension
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise Exception(f"Unknown export format {extension}")
+    return FORMATS[extension]
+
+
+def to_text(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class CsvWriter:
+    def __init__(self, f, columns: list):
+        self.writer = csv.writer(f)
+        self.writer.writerow([name for name, _ in columns])
+
+    def write(self, rows: list[tuple]):
+        self.writer.writerows(
+            ["" if v is None else to_text(v) for v in row] for row in rows
+        )
+
+    def close(self):
+        pass
+
+
+class JsonLinesWriter:
+    def __init__(self, f, columns: list):
+        self.f = f
+        self.names = [name for name, _ in columns]
+
+    def write(self, rows: list[tuple]):
+        self.f.writelines(
+            json.dumps(dict(zip(self.names, map(to_text, row))), ensure_ascii=False)
+            + "\n"
+            for row in rows
+        )
+
+    def close(self):
+        pass
+
+
+def column_kind(column_type) -> tuple[str, int]:
+    """
+    Return how a column is stored in a columnar file, and its scale
+    """
+    if isinstance(column_type, Boolean):
+        return "bool", 0
+    if isinstance(column_type, Integer):
+        return "int", 0
+    if isinstance(column_type, Numeric):
+        return "decimal", column_type.scale or 0
+    if isinstance(column_type, DateTime):
+        return "datetime", 0
+    return "str", 0
+
+
+class ColumnarWriter:
+    """
+    Write the rows column by column in a compact binary file
+
+    The file is the magic and version, a JSON header with the columns, then
+    one group per batch of rows: the number of rows and, for each column,
+    a null mask and the values, each compressed with zlib and prefixed with
+    its length. A group of 0 rows ends the file.
+
+    Integers, decimals (as integers of the smallest unit) and dates (as
+    microseconds since 1970) are stored as 64 bits integers, booleans as
+    bytes and strings as UTF-8 with their end offsets.
+    """
+
+    def __init__(self, f, columns: list):
+        self.f = f
+        self.kinds = [column_kind(column_type) for _, column_type in columns]
+
+        header = json.dumps(
+            [
+                {"name": name, "type": kind, "scale": scale}
+                for (name, _), (kind, scale) in zip(columns, self.kinds)
+            ]
+        ).encode()
+        f.write(COLUMNAR_MAGIC + struct.pack("<BI", COLUMNAR_VERSION, len(header)))
+        f.write(header)
+
+    def write(self, rows: list[tuple]):
+        self.f.write(struct.pack("<I", len(rows)))
+        for (kind, scale), values in zip(self.kinds, zip(*rows)):
+            nulls = bytes(value is None for value in values)
+            self.write_block(nulls)
+            self.write_block(self.encode(kind, scale, values))
+
+    def write_block(self, data: bytes):
+        data = zlib.compress(data, 1)
+        self.f.write(struct.pack("<I", len(data)))
+        self.f.write(data)
+
+    def encode(self, kind: str, scale: int, values: tuple) -> bytes:
+        if kind == "str":
+            data = [(value or "").encode() for value in values]
+            ends = array("I")
+            end = 0
+            for item in data:
+                end += len(item)
+                ends.append(end)
+            return ends.tobytes() + b"".join(data)
+
+        if kind == "bool":
+            return bytes(bool(value) for value in values)
+
+        if kind == "decimal":
+            unit = 10**scale
+            numbers = (
+                int(value * unit) if value is not None else 0 for value in values
+            )
+        elif kind == "datetime":
+            microsecond = timedelta(microseconds=1)
+            numbers = (
+                (value - EPOCH) // microsecond if value is not None else 0
+                for value in values
+            )
+        else:
+            numbers = (value if value is not None else 0 for value in values)
+        return array("q", numbers).tobytes()
+
+    def close(self):
+        # Empty group at the end of the file
+        self.f.write(struct.pack("<I", 0))
+
+
+WRITERS = {"csv": CsvWriter, "jsonl": JsonLinesWriter, "columnar": ColumnarWriter}
+
+
+def read_columnar(path: str):
+    """
+    Yield the rows of a columnar file by groups, as lists of tuples
+    """
+    with open(path, "rb") as f:
+        magic, version, length = struct.unpack("<4sBI", f.read(9))
+        if magic != COLUMNAR_MAGIC or version != COLUMNAR_VERSION:
+            raise Exception(f"{path} is not a columnar export")
+        columns = json.loads(f.read(length))
+
+        def read_block():
+            (size,) = struct.unpack("<I", f.read(4))
+            return zlib.decompress(f.read(size))
+
+        while True:
+            (count,) = struct.unpack("<I", f.read(4))
+            if count == 0:
+                return
+
+            values = []
+            for column in columns:
+                nulls = read_block()
+                data = read_block()
+                decoded = decode(column["type"], column["scale"], data, count)
+                values.append(
+                    [None if null else value for null, value in zip(nulls, decoded)]
+                )
+            yield list(zip(*values))
+
+
+def decode(kind: str, scale: int, data: bytes, count: int) -> list:
+    if kind == "str":
+        ends = array("I", data[: 4 * count])
+        text = data[4 * count :]
+        start = 0
+        values = []
+        for end in ends:
+            values.append(text[start:end].decode())
+            start = end
+        return values
+
+    if kind == "bool":
+        return [bool(value) for value in data]
+
+    numbers = array("q", data)
+    if kind == "decimal":
+        return [Decimal(number).scaleb(-scale) for number in numbers]
+    if kind == "datetime":
+        return [EPOCH + timedelta(microseconds=number) for number in numbers]
+    return list(numbers)
+
+
+class Exporter:
+    """
+    Stream the rows of a table to a file, one batch at a time so the memory
+    used doesn't depend on the size of the table
+    """
+
+    def __init__(self, db, batch_size: int = EXPORT_BATCH_SIZE):
+        self.db = db
+        self.batch_size = batch_size
+
+    def iter_export(self, entity: str, path: str, format: str = None):
+        """
+        Export a table and yield the number of rows written after each batch
+        """
+        format = format or format_of(path)
+        if format not in WRITERS:
+            raise Exception(f"Unknown export format {format}")
+
+        columns = self.db.row_columns(entity)
+        get_page = partial(self.db.get_rows_page, entity)
+
+        # Write to a temporary file so a failed export leaves nothing behind
+        temporary_path = path + ".part"
+        binary = format == "columnar"
+        try:
+            with open(
+                temporary_path,
+                "wb" if binary else "w",
+                newline=None if binary else "",
+                encoding=None if binary else "utf-8",
+            ) as f:
+                writer = WRITERS[format](f, columns)
+                rows = 0
+                for batch in self.db.iter_pages(get_page, self.batch_size):
+                    writer.write(batch)
+                    rows += len(batch)
+                    yield rows
+                writer.close()
+            os.replace(temporary_path, path)
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+    def export(self, entity: str, path: str, format: str = None) -> ExportReport:
+        report = ExportReport(table=entity, path=path)
+        start = time.perf_counter()
+
+        for rows in self.iter_export(entity, path, format):
+            report.rows = rows
+
+        report.seconds = time.perf_counter() - start
+        return report
@@ -0,0 +1,456 @@
+import atexit
+import functools
+import inspect
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Set LOCATION_PROFILE_QUERIES=1 to record the queries and print a report at
+# exit, LOCATION_SLOW_QUERY_MS sets the duration of a slow query
+PROFILE_QUERIES = os.environ.get("LOCATION_PROFILE_QUERIES", "") not in ("", "0")
+SLOW_QUERY_MS = float(os.environ.get("LOCATION_SLOW_QUERY_MS", "100"))
+
+# Upper bounds of the buckets of the latency histograms, in milliseconds
+BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+
+# Same SELECT run this many times by one operation: probably a N+1 pattern
+N_PLUS_ONE_CALLS = 10
+
+# Number of slow queries kept with their plan
+SLOW_QUERY_LOG_SIZE = 100
+
+# Number of statements of a slow operation explained
+EXPLAINED_STATEMENTS = 5
+
+# Lists of parameters and of inserted rows, of any length
+PARAMETER_LIST = re.compile(r"\?(?:, \?)+")
+ROW_LIST = re.compile(r"(\([^()]*\))(?:, \1)+")
+SPACES = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize_statement(statement: str) -> str:
+    """
+    Group the statements that only differ by the length of their lists
+    """
+    statement = SPACES.sub(" ", statement).strip()
+    statement = PARAMETER_LIST.sub("?, ...", statement)
+    return ROW_LIST.sub(r"\1, ...", statement)
+
+
+class Timing:
+    """
+    Latency histogram, with the number of calls, of rows and of queries
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.rows = 0
+        self.queries = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, ms: float, rows: int = 0, queries: int = 0):
+        self.calls += 1
+        self.rows += rows
+        self.queries += queries
+        self.total += ms
+        self.max = max(self.max, ms)
+        self.buckets[bisect_left(BUCKETS_MS, ms)] += 1
+
+    def mean(self) -> float:
+        return self.total / self.calls if self.calls else 0.0
+
+    def percentile(self, p: float) -> float:
+        """
+        Upper bound of the bucket of the percentile, the max for the last one
+        """
+        rank = p * self.calls
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def histogram(self) -> str:
+        labels = [f"<{bound:g}" for bound in BUCKETS_MS] + [f">{BUCKETS_MS[-1]:g}"]
+        return "  ".join(
+            f"{label}ms:{count}" for label, count in zip(labels, self.buckets) if count
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "rows": self.rows,
+            "queries": self.queries,
+            "total_ms": round(self.total, 3),
+            "mean_ms": round(self.mean(), 3),
+            "p50_ms": round(self.percentile(0.5), 3),
+            "p95_ms": round(self.percentile(0.95), 3),
+            "max_ms": round(self.max, 3),
+            "buckets": dict(zip([*map(str, BUCKETS_MS), "inf"], self.buckets)),
+        }
+
+
+class Operation:
+    """
+    A call measured by the profiler, the queries run meanwhile by its thread
+    are counted in it
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.seconds = 0.0
+        self.rows = 0
+        self.queries = 0
+        self.selects = Counter()
+        # First parameters of each statement, to explain it if slow
+        self.statements = {}
+
+
+class QueryProfiler:
+    """
+    Record the queries run on an engine and the operations running them
+
+    Each statement executed is timed between the before_cursor_execute and
+    after_cursor_execute events of the engine, and counted in the operation
+    running in the same thread: a DatabaseManager method, a page shown.
+
+    SQLite runs a SELECT up to its first row in execute, the rest is read
+    while fetching. The time of the operation includes the fetching, so the
+    statements and the operations slower than slow_ms are both logged with
+    the EXPLAIN QUERY PLAN of their statements.
+    """
+
+    def __init__(self, enabled: bool = PROFILE_QUERIES, slow_ms: float = SLOW_QUERY_MS):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.engine = None
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.statements = {}
+            self.operations = {}
+            self.n_plus_one = {}
+            self.slow_queries = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+
+    def attach(self, engine):
+        """
+        Time the statements executed on the engine
+        """
+        self.engine = engine
+        event.listen(engine, "before_cursor_execute", self.before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self.after_cursor_execute)
+        event.listen(engine, "handle_error", self.handle_error)
+
+    def before_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def after_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+        # Only known for the writes, the rows read are counted by operation
+        rows = max(cursor.rowcount, 0)
+        key = normalize_statement(statement)
+
+        if executemany and parameters:
+            parameters = parameters[0]
+
+        # A N+1 pattern is usually a loop in an operation calling others
+        stack = getattr(self.local, "stack", ())
+        for operation in stack:
+            operation.queries += 1
+            if key.startswith("SELECT"):
+                operation.selects[key] += 1
+
+        operation = self.current()
+        if operation is not None:
+            if len(operation.statements) < EXPLAINED_STATEMENTS:
+                operation.statements.setdefault(key, (statement, parameters))
+
+        with self.lock:
+            timing = self.statements.get(key)
+            if timing is None:
+                timing = self.statements[key] = Timing()
+            timing.add(ms, rows)
+
+        if ms >= self.slow_ms:
+            dbapi_connection = conn.connection.dbapi_connection
+            plan = self.explain(dbapi_connection, statement, parameters)
+            self.log_slow(ms, operation, [{"statement": key, "plan": plan}])
+
+    def handle_error(self, context):
+        # The statement failed, after_cursor_execute is not called
+        conn = context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
+
+    def log_slow(self, ms: float, operation: Operation, statements: list[dict]):
+        entry = {
+            "ms": round(ms, 3),
+            "operation": operation.name if operation else None,
+            "statements": statements,
+        }
+        with self.lock:
+            self.slow_queries.append(entry)
+        logger.warning(
+            "Slow query (%.1f ms in %s): %s",
+            ms,
+            entry["operation"],
+            statements[0]["statement"],
+        )
+
+    def explain_operation(self, operation: Operation) -> list[dict]:
+        """
+        Return the plans of the statements of an operation, on a connection
+        of the pool once they are done
+        """
+        connection = self.engine.raw_connection()
+        try:
+            return [
+                {"statement": key, "plan": self.explain(connection, *arguments)}
+                for key, arguments in operation.statements.items()
+            ]
+        finally:
+            connection.close()
+
+    def explain(self, dbapi_connection, statement: str, parameters) -> list[str]:
+        """
+        Return the EXPLAIN QUERY PLAN of a statement, run on a new cursor of
+        the connection to keep the results of the statement
+        """
+        if (
+            self.engine.dialect.name != "sqlite"
+            or statement.lstrip()
+            .upper()
+            .startswith(("PRAGMA", "EXPLAIN", "CREATE", "ALTER", "DROP"))
+        ):
+            return []
+
+        try:
+            cursor = dbapi_connection.cursor()
+            try:
+                cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ())
+                return [row[3] for row in cursor.fetchall()]
+            finally:
+                cursor.close()
+        except Exception as e:
+            return [f"no plan: {e}"]
+
+    def current(self):
+        stack = getattr(self.local, "stack", None)
+        return stack[-1] if stack else None
+
+    def enter(self, operation: Operation):
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        self.local.stack.append(operation)
+        return time.perf_counter()
+
+    def exit(self, operation: Operation, start: float):
+        operation.seconds += time.perf_counter() - start
+        self.local.stack.pop()
+
+    def finish(self, operation: Operation):
+        """
+        Record an operation once it is done
+        """
+        ms = operation.seconds * 1000
+        if ms >= self.slow_ms and operation.statements:
+            self.log_slow(ms, operation, self.explain_operation(operation))
+
+        with self.lock:
+            timing = self.operations.get(operation.name)
+            if timing is None:
+                timing = self.operations[operation.name] = Timing()
+            timing.add(ms, operation.rows, operation.queries)
+
+            for statement, calls in operation.selects.items():
+                if calls >= N_PLUS_ONE_CALLS:
+                    key = (operation.name, statement)
+                    seen, most = self.n_plus_one.get(key, (0, 0))
+                    self.n_plus_one[key] = (seen + 1, max(most, calls))
+
+    def operation(self, name: str):
+        """
+        Context manager measuring a block as an operation
+
+            with query_profiler.operation("ClientPage.showEvent"):
+                ...
+        """
+        return OperationBlock(self, name)
+
+    def profile(self, name: str):
+        """
+        Decorator measuring each call of a function as an operation, the
+        rows of the lists returned are counted, the generators are measured
+        while they produce their batches
+        """
+
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+
+                operation = Operation(name)
+                start = self.enter(operation)
+                try:
+                    result = function(*args, **kwargs)
+                finally:
+                    self.exit(operation, start)
+
+                if inspect.isgenerator(result):
+                    return self.profile_generator(operation, result)
+
+                if isinstance(result, list):
+                    operation.rows = len(result)
+                self.finish(operation)
+                return result
+
+            return wrapper
+
+        return decorator
+
+    def profile_generator(self, operation: Operation, generator):
+        while True:
+            start = self.enter(operation)
+            try:
+                item = next(generator)
+            except StopIteration:
+                break
+            finally:
+                self.exit(operation, start)
+
+            if isinstance(item, list):
+                operation.rows += len(item)
+            yield item
+
+        self.finish(operation)
+
+    def instrument(self, cls, exclude: tuple = ()):
+        """
+        Measure all the public methods of a class, if the profiler is enabled
+        """
+        if not self.enabled:
+            return
+
+        for name, value in list(vars(cls).items()):
+            if name.startswith("_") or name in exclude or not inspect.isfunction(value):
+                continue
+            setattr(cls, name, self.profile(f"{cls.__name__}.{name}")(value))
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            return {
+                "operations": {
+                    name: timing.to_dict() for name, timing in self.operations.items()
+                },
+                "statements": {
+                    statement: timing.to_dict()
+                    for statement, timing in self.statements.items()
+                },
+                "n_plus_one": [
+                    {
+                        "operation": operation,
+                        "statement": statement,
+                        "occurrences": seen,
+                        "max_calls": most,
+                    }
+                    for (operation, statement), (seen, most) in self.n_plus_one.items()
+                ],
+                "slow_queries": list(self.slow_queries),
+            }
+
+    def report(self, top: int = 20) -> str:
+        """
+        Return a text report of the operations, the slowest statements, the
+        N+1 patterns and the slow queries
+        """
+        with self.lock:
+            operations = sorted(
+                self.operations.items(), key=lambda item: -item[1].total
+            )
+            statements = sorted(
+                self.statements.items(), key=lambda item: -item[1].total
+            )[:top]
+            n_plus_one = sorted(self.n_plus_one.items(), key=lambda item: -item[1][1])
+            slow_queries = list(self.slow_queries)
+
+        header = (
+            f"{'calls':>7} {'total ms':>10} {'mean ms':>9} {'p95 ms':>8} "
+            f"{'max ms':>9} {'rows':>9}"
+        )
+
+        def line(timing: Timing) -> str:
+            return (
+                f"{timing.calls:>7} {timing.total:>10.1f} {timing.mean():>9.2f} "
+                f"{timing.percentile(0.95):>8.2f} {timing.max:>9.2f} {timing.rows:>9}"
+            )
+
+        lines = ["Operations", f"  {header} {'queries':>8}  name"]
+        for name, timing in operations:
+            lines.append(f"  {line(timing)} {timing.queries:>8}  {name}")
+
+        lines += ["", f"Statements (top {top} by total time)", f"  {header}  sql"]
+        for statement, timing in statements:
+            lines.append(f"  {line(timing)}  {statement[:160]}")
+            lines.append(f"  {'':>7} {timing.histogram()}")
+
+        lines += ["", f"N+1 patterns (same SELECT {N_PLUS_ONE_CALLS}+ times in a call)"]
+        for (operation, statement), (seen, most) in n_plus_one:
+            lines.append(f"  {operation}: up to {most} calls, {seen} times")
+            lines.append(f"    {statement[:160]}")
+
+        lines += ["", f"Slow queries (over {self.slow_ms:g} ms)"]
+        for entry in slow_queries:
+            lines.append(f"  {entry['ms']:.1f} ms in {entry['operation']}")
+            for statement in entry["statements"]:
+                lines.append(f"    {statement['statement'][:160]}")
+                for step in statement["plan"]:
+                    lines.append(f"      {step}")
+
+        return "\n".join(lines)
+
+    def print_report(self):
+        print(self.report(), file=sys.stderr)
+
+
+class OperationBlock:
+    def __init__(self, profiler: QueryProfiler, name: str):
+        self.profiler = profiler
+        self.operation = Operation(name)
+        self.start = None
+
+    def __enter__(self):
+        if self.profiler.enabled:
+            self.start = self.profiler.enter(self.operation)
+        return self.operation
+
+    def __exit__(self, *exc_info):
+        if self.start is not None:
+            self.profiler.exit(self.operation, self.start)
+            self.profiler.finish(self.operation)
+
+
+# Shared by the engine, the DatabaseManager and the pages
+query_profiler = QueryProfiler()
+
+if query_profiler.enabled:
+    atexit.register(query_profiler.print_report)
@@ -0,0 +1,174 @@
+from datetime import datetime
+from sqlalchemy import update
+from sqlalchemy.schema import CreateIndex
+from .availability import AvailabilityEngine
+from .database import Base, engine, is_read_only
+from .models import Client, Equipment, Location
+from .pricing import PricingEngine
+from .search import SEARCH_INDEXES, create_search_indexes
+from .sync import SyncEngine, create_change_log_triggers
+
+
+def create_indexes(connection, names: list[str]):
+    """
+    Create the indexes of the models added after their table was created
+
+    A migration names its indexes: the models may have more recent ones, on
+    columns a later migration adds.
+    """
+    indexes = {
+        index.name: index
+        for table in Base.metadata.sorted_tables
+        for index in table.indexes
+    }
+    # IF NOT EXISTS, the reflection used by checkfirst misses the indexes
+    # on expressions
+    for name in names:
+        connection.execute(CreateIndex(indexes[name], if_not_exists=True))
+
+
+def add_lookup_indexes(connection):
+    """
+    Index the lookups of the locations and the available equipments
+    """
+    create_indexes(
+        connection,
+        [
+            "ix_equipments_is_available",
+            "ix_locations_client",
+            "ix_locations_equipment_dates",
+            "ix_locations_returned_end",
+        ],
+    )
+
+
+def add_columns(connection, table, names: list[str]):
+    """
+    Add the columns added to a model after its table was created
+    """
+    existing = {
+        row[1] for row in connection.exec_driver_sql(f"PRAGMA table_info({table})")
+    }
+    for name in names:
+        if name not in existing:
+            column_type = table.c[name].type.compile(connection.dialect)
+            connection.exec_driver_sql(
+                f"ALTER TABLE {table} ADD COLUMN {name} {column_type}"
+            )
+
+
+def add_pricing(connection):
+    """
+    Store the rates and the cost of the locations, and price the existing ones
+    """
+    add_columns(connection, Equipment.__table__, ["cost_per_week", "cost_per_month"])
+    add_columns(
+        connection,
+        Location.__table__,
+        [
+            "returned_at",
+            "daily_rate",
+            "weekly_rate",
+            "monthly_rate",
+            "total_cost",
+            "late_fee",
+        ],
+    )
+    PricingEngine().backfill(connection)
+
+
+def add_email_index(connection):
+    """
+    Index the emails without case, to find the duplicates of a client
+    """
+    create_indexes(connection, ["ix_clients_email_lower"])
+
+
+def add_sync(connection):
+    """
+    Give the rows a global id and log their changes, to synchronize the
+    databases of the branches
+    """
+    for model in (Client, Equipment, Location):
+        table = model.__table__
+        add_columns(connection, table, ["gid"])
+        connection.exec_driver_sql(
+            f"UPDATE {table} SET gid = lower(hex(randomblob(16))) WHERE gid IS NULL"
+        )
+    create_indexes(
+        connection, ["ux_clients_gid", "ux_equipments_gid", "ux_locations_gid"]
+    )
+    SyncEngine().init_node(connection)
+    create_change_log_triggers(connection)
+
+
+def add_search_indexes(connection):
+    """
+    Create the full text indexes, and only update them when their columns
+    change
+    """
+    for index in SEARCH_INDEXES:
+        connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {index}_update")
+    create_search_indexes(connection)
+
+
+def split_availability(connection):
+    """
+    Only keep the flag of the staff in is_available, the locations tell if an
+    equipment is rented
+
+    The locations cleared the flag of their equipment, the equipments out
+    only because they are rented are in service again.
+    """
+    rented = AvailabilityEngine().rented(datetime.now())
+    connection.execute(
+        update(Equipment)
+        .where(~Equipment.is_available, rented)
+        .values(is_available=True)
+    )
+
+
+# Migrations applied in order, the database stores the number of the last one
+MIGRATIONS = [
+    add_lookup_indexes,
+    add_pricing,
+    add_email_index,
+    add_sync,
+    add_search_indexes,
+    split_availability,
+]
+
+
+def migrate(bind=engine):
+    """
+    Create the missing tables and apply the migrations the database is missing
+    """
+    with bind.begin() as connection:
+        # Up to date, skip the slower checks of create_all. A new table must
+        # come with a migration for its database to be created.
+        version = connection.exec_driver_sql("PRAGMA user_version").scalar()
+        if version >= len(MIGRATIONS):
+            return
+        if is_read_only(bind):
+            raise Exception(
+                "The snapshot is older than the application, create it again"
+            )
+
+        Base.metadata.create_all(connection)
+
+        for number, migration in enumerate(MIGRATIONS, start=1):
+            if number > version:
+                migration(connection)
+                connection.exec_driver_sql(f"PRAGMA user_version = {number}")
+
+
+def optimize(bind=engine):
+    """
+    Update the statistics of the query planner if needed, SQLite advises to
+    run it before closing the database
+    """
+    if is_read_only(bind):
+        return
+
+    with bind.begin() as connection:
+        connection.exec_driver_sql("PRAGMA optimize")
@@ -4,18 +4,35 @@ from sqlalchemy import (
     Column,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     String,
+    func,
+    text,
 )
 from sqlalchemy.orm import relationship
+from uuid import uuid4
 
 from .database import Base
 
 
+def new_gid() -> str:
+    """
+    Global id of a row, the same in the databases of all the branches
+    """
+    return uuid4().hex
+
+
 class Client(Base):
     __tablename__ = "clients"
+    __table_args__ = (
+        # Emails are compared without case (duplicates)
+        Index("ix_clients_email_lower", func.lower(text("email"))),
+        Index("ux_clients_gid", "gid", unique=True),
+    )
 
     id = Column(Integer, primary_key=True)
+    gid = Column(String, default=new_gid)
     name = Column(String)
     email = Column(String, unique=True)
     phone = Column(String, unique=True)
@@ -28,11 +45,16 @@ class Client(Base):
 
 class Equipment(Base):
     __tablename__ = "equipments"
+    __table_args__ = (Index("ux_equipments_gid", "gid", unique=True),)
 
     id = Column(Integer, primary_key=True)
+    gid = Column(String, default=new_gid)
     name = Column(String)
     cost_per_day = Column(DECIMAL(10, 2))
-    is_available = Column(Boolean, default=True)
+    # Optional cheaper rates for long locations
+    cost_per_week = Column(DECIMAL(10, 2), nullable=True)
+    cost_per_month = Column(DECIMAL(10, 2), nullable=True)
+    is_available = Column(Boolean, default=True, index=True)
 
     locations = relationship("Location", back_populates="equipment")
 
@@ -42,16 +64,118 @@ class Equipment(Base):
 
 class Location(Base):
     __tablename__ = "locations"
+    __table_args__ = (
+        # Locations of a client
+        Index("ix_locations_client", "id_client"),
+        # Locations of an equipment in a date range (availability)
+        Index("ix_locations_equipment_dates", "id_equipment", "start_date", "end_date"),
+        # Locations not returned yet, by end date (overdue)
+        Index("ix_locations_returned_end", "is_returned", "end_date"),
+        Index("ux_locations_gid", "gid", unique=True),
+    )
 
     id = Column(Integer, primary_key=True)
+    gid = Column(String, default=new_gid)
     id_client = Column(Integer, ForeignKey("clients.id"))
     id_equipment = Column(Integer, ForeignKey("equipments.id"))
     start_date = Column(DateTime)
     end_date = Column(DateTime)
     is_returned = Column(Boolean, default=False)
+    returned_at = Column(DateTime, nullable=True)
+
+    # Rates of the equipment when the location was created, and its cost
+    daily_rate = Column(DECIMAL(10, 2))
+    weekly_rate = Column(DECIMAL(10, 2), nullable=True)
+    monthly_rate = Column(DECIMAL(10, 2), nullable=True)
+    total_cost = Column(DECIMAL(10, 2))
+    late_fee = Column(DECIMAL(10, 2), default=0)
 
     client = relationship("Client", back_populates="locations")
     equipment = relationship("Equipment", back_populates="locations")
 
     def __repr__(self):
         return f"<Location {self.id_client}, {self.id_equipment}>"
+
+
+class ChangeLog(Base):
+    """
+    One row per insert or update of a client, an equipment or a location,
+    written by triggers. The seq of the last row sent to a branch is its
+    watermark.
+    """
+
+    __tablename__ = "change_log"
+    __table_args__ = (
+        # Version of a row: its last change
+        Index("ix_change_log_row", "entity", "row_id", "seq"),
+        {"sqlite_autoincrement": True},
+    )
+
+    seq = Column(Integer, primary_key=True)
+    entity = Column(String)
+    row_id = Column(Integer)
+    # Branch where the change was made, and when, in UTC
+    origin = Column(String)
+    stamp = Column(String)
+
+
+class SyncNode(Base):
+    """
+    The branch of this database, a single row
+    """
+
+    __tablename__ = "sync_node"
+
+    id = Column(Integer, primary_key=True)
+    node_id = Column(String)
+    # Set while changes of another branch are applied, the triggers don't
+    # log them, they are logged with their own version
+    applying = Column(Boolean, default=False)
+
+
+class SyncPeer(Base):
+    """
+    Last change of another branch applied to this database
+    """
+
+    __tablename__ = "sync_peers"
+
+    node_id = Column(String, primary_key=True)
+    pulled_seq = Column(Integer, default=0)
+    synced_at = Column(DateTime, nullable=True)
+
+
+class GidAlias(Base):
+    """
+    Client created in two branches with the same email or phone, the gid of
+    the other branch points to the client of this one
+    """
+
+    __tablename__ = "gid_aliases"
+
+    gid = Column(String, primary_key=True)
+    target_gid = Column(String)
+
+
+class SyncConflict(Base):
+    """
+    Two locations booking the same equipment for overlapping dates, made in
+    different branches before they were synchronized
+    """
+
+    __tablename__ = "sync_conflicts"
+    __table_args__ = (
+        Index(
+            "ux_sync_conflicts_locations",
+            "location_gid",
+            "other_location_gid",
+            unique=True,
+        ),
+    )
+
+    id = Column(Integer, primary_key=True)
+    equipment_gid = Column(String)
+    location_gid = Column(String)
+    other_location_gid = Column(String)
+    detected_at = Column(DateTime)
+    is_resolved = Column(Boolean, default=False)
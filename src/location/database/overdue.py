@@ -0,0 +1,170 @@
+import logging
+import threading
+from datetime import datetime, time, timedelta
+from sqlalchemy import select
+
+from .database import SessionLocal
+from .models import Location
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two scans of the locations
+SCAN_INTERVAL = 300
+
+# Above this number of changed locations, they are checked with a full scan
+MAX_UPDATE_IDS = 10_000
+
+# Columns of a location that can make it overdue or not
+OVERDUE_FIELDS = {"is_returned", "end_date"}
+
+
+def start_of_today() -> datetime:
+    return datetime.combine(datetime.now().date(), time())
+
+
+class OverdueTracker:
+    """
+    Keep the set of the ids of the overdue locations in memory
+
+    A location is overdue when it is not returned and ends before today. The
+    set is computed by a scan on the (is_returned, end_date) index, repeated
+    in a background thread, and kept up to date between the scans with the
+    locations written, so the views never scan the whole table.
+
+    The listeners are called without arguments after the set changed, from
+    the thread of the scan or of the write.
+    """
+
+    def __init__(self):
+        self.ids = set()
+        self.lock = threading.Lock()
+        self.listeners = []
+        self.scanned = False
+
+        # Locations written during a scan, checked again after it
+        self.written = None
+
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def overdue_ids(self) -> set[int]:
+        with self.lock:
+            return set(self.ids)
+
+    def count(self) -> int:
+        with self.lock:
+            return len(self.ids)
+
+    def is_overdue(self, id: int) -> bool:
+        with self.lock:
+            return id in self.ids
+
+    def query(self, ids=None):
+        stmt = select(Location.id).where(
+            ~Location.is_returned, Location.end_date < start_of_today()
+        )
+        if ids is not None:
+            stmt = stmt.where(Location.id.in_(ids))
+
+        with SessionLocal() as session:
+            return set(session.scalars(stmt))
+
+    def scan(self):
+        """
+        Find all the overdue locations
+        """
+        with self.lock:
+            self.written = set()
+
+        ids = self.query()
+
+        with self.lock:
+            written, self.written = self.written, None
+            changed = ids != self.ids
+            self.ids = ids
+            self.scanned = True
+
+        # The scan may have read some locations before they were written
+        if written:
+            self.update(written)
+        if changed:
+            self.notify()
+
+    def update(self, ids: list[int]):
+        """
+        Check again if the locations with the ids are overdue
+        """
+        ids = set(ids)
+        if len(ids) > MAX_UPDATE_IDS:
+            overdue = self.query() & ids
+        else:
+            overdue = self.query(ids)
+
+        with self.lock:
+            if self.written is not None:
+                self.written |= ids
+            changed = (self.ids & ids) != overdue
+            self.ids -= ids
+            self.ids |= overdue
+
+        if changed:
+            self.notify()
+
+    def notify(self):
+        for listener in list(self.listeners):
+            listener()
+
+    def on_database_change(self, entity: str, ids: list[int], fields: set[str]):
+        """
+        Listener of the DatabaseManager, only the locations written are
+        checked again
+        """
+        if entity != "locations" or not ids:
+            return
+        if fields is not None and not fields & OVERDUE_FIELDS:
+            return
+
+        self.update(ids)
+
+    def is_running(self) -> bool:
+        return self.thread is not None
+
+    def start(self, interval: float = SCAN_INTERVAL):
+        """
+        Scan now and then periodically in a background thread, and at the
+        start of each day when the locations ending the day before become
+        overdue
+        """
+        if self.thread is not None:
+            return
+
+        self.stopped.clear()
+        self.thread = threading.Thread(
+            target=self.run, args=(interval,), name="overdue-scan", daemon=True
+        )
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+
+        self.stopped.set()
+        self.thread.join()
+        self.thread = None
+
+    def run(self, interval: float):
+        while not self.stopped.is_set():
+            try:
+                self.scan()
+            except Exception:
+                logger.exception("Scan of the overdue locations failed")
+
+            until_tomorrow = start_of_today() + timedelta(days=1) - datetime.now()
+            self.stopped.wait(min(interval, until_tomorrow.total_seconds() + 1))
@@ -0,0 +1,250 @@
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import Integer, bindparam, cast, func, select, update
+
+from .models import Equipment, Location
+
+# Number of days covered by the weekly and monthly rates
+WEEK_DAYS = 7
+MONTH_DAYS = 30
+
+# A day late costs the daily rate times this factor
+LATE_FEE_FACTOR = Decimal("1.5")
+
+# Number of locations priced at once by the backfill
+BATCH_SIZE = 10_000
+
+CENT = Decimal("0.01")
+
+
+def to_decimal(value):
+    if value is None or isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+
+class AlreadyReturnedError(Exception):
+    """
+    Raised when a location is returned a second time
+    """
+
+
+class PricingEngine:
+    """
+    Compute the cost of the locations from the rates of their equipment
+
+    The rates are copied on the location when it is created, so a later
+    change of the price of the equipment doesn't change its cost.
+    """
+
+    def rental_days(self, start: datetime, end: datetime) -> int:
+        """
+        Number of days billed, at least one
+        """
+        return max((end.date() - start.date()).days, 1)
+
+    def sql_rental_days(self):
+        """
+        SQL version of rental_days on the dates of the locations
+        """
+        days = func.julianday(func.date(Location.end_date)) - func.julianday(
+            func.date(Location.start_date)
+        )
+        return func.max(cast(days, Integer), 1)
+
+    def sql_late_fee(self, returned_at: datetime):
+        """
+        SQL version of late_fee on the rates and dates of the locations
+        """
+        days = func.julianday(func.date(returned_at)) - func.julianday(
+            func.date(Location.end_date)
+        )
+        days = func.max(cast(days, Integer), 0)
+        return func.round(days * Location.daily_rate * float(LATE_FEE_FACTOR), 2)
+
+    def late_days(self, end: datetime, returned_at: datetime) -> int:
+        return max((returned_at.date() - end.date()).days, 0)
+
+    def price(self, days: int, daily_rate, weekly_rate=None, monthly_rate=None):
+        """
+        Cost of a number of days at the cheapest of the rates
+
+        The days left after the full weeks or months never cost more than
+        one more week or month.
+        """
+        daily_rate = to_decimal(daily_rate)
+        weekly_rate = to_decimal(weekly_rate)
+        monthly_rate = to_decimal(monthly_rate)
+
+        cost = days * daily_rate
+        if weekly_rate is not None:
+            weeks, rest = divmod(days, WEEK_DAYS)
+            cost = min(cost, weeks * weekly_rate + min(rest * daily_rate, weekly_rate))
+        if monthly_rate is not None:
+            months, rest = divmod(days, MONTH_DAYS)
+            rest_cost = self.price(rest, daily_rate, weekly_rate)
+            cost = min(cost, months * monthly_rate + min(rest_cost, monthly_rate))
+
+        return cost.quantize(CENT)
+
+    def late_fee(self, daily_rate, end: datetime, returned_at: datetime):
+        days = self.late_days(end, returned_at)
+        return (days * to_decimal(daily_rate) * LATE_FEE_FACTOR).quantize(CENT)
+
+    def quote(self, equipment, start: datetime, end: datetime) -> dict:
+        """
+        Return the rates and the cost of a new location of the equipment
+        """
+        days = self.rental_days(start, end)
+        return {
+            "daily_rate": equipment.cost_per_day,
+            "weekly_rate": equipment.cost_per_week,
+            "monthly_rate": equipment.cost_per_month,
+            "total_cost": self.price(
+                days,
+                equipment.cost_per_day,
+                equipment.cost_per_week,
+                equipment.cost_per_month,
+            ),
+            "late_fee": Decimal("0.00"),
+        }
+
+    def bill_return(self, location: Location, returned_at: datetime):
+        """
+        Add the late fee of a returned location to its cost
+        """
+        if location.returned_at is not None:
+            raise AlreadyReturnedError("Location already returned")
+
+        if location.daily_rate is None:
+            # Not priced yet, take the current rates like the backfill
+            equipment = location.equipment
+            location.daily_rate = equipment.cost_per_day
+            location.weekly_rate = equipment.cost_per_week
+            location.monthly_rate = equipment.cost_per_month
+
+        days = self.rental_days(location.start_date, location.end_date)
+        location.returned_at = returned_at
+        location.late_fee = self.late_fee(
+            location.daily_rate, location.end_date, returned_at
+        )
+        location.total_cost = (
+            self.price(
+                days, location.daily_rate, location.weekly_rate, location.monthly_rate
+            )
+            + location.late_fee
+        )
+
+    def backfill(
+        self,
+        connection,
+        only_missing: bool = True,
+        batch_size=BATCH_SIZE,
+        where=None,
+    ):
+        """
+        Price the locations in batches and return the number of rows updated
+
+        Locations without rates take the current rates of their equipment.
+        With only_missing, the locations already priced are left untouched.
+        where is an optional condition on the locations to price.
+        """
+        stmt = (
+            select(
+                Location.id,
+                Location.start_date,
+                Location.end_date,
+                Location.returned_at,
+                Location.daily_rate,
+                Location.weekly_rate,
+                Location.monthly_rate,
+                Equipment.cost_per_day,
+                Equipment.cost_per_week,
+                Equipment.cost_per_month,
+            )
+            .join(Equipment, Location.id_equipment == Equipment.id)
+            .order_by(Location.id)
+            .limit(batch_size)
+        )
+        if where is not None:
+            stmt = stmt.where(where)
+        updated = 0
+        if only_missing:
+            updated = self.backfill_daily(connection, where)
+            stmt = stmt.where(Location.total_cost.is_(None))
+
+        set_costs = (
+            update(Location)
+            .where(Location.id == bindparam("location_id"))
+            .values(
+                daily_rate=bindparam("daily"),
+                weekly_rate=bindparam("weekly"),
+                monthly_rate=bindparam("monthly"),
+                total_cost=bindparam("total"),
+                late_fee=bindparam("fee"),
+            )
+        )
+
+        last_id = 0
+        while rows := connection.execute(stmt.where(Location.id > last_id)).all():
+            costs = []
+            for row in rows:
+                if row.daily_rate is None:
+                    rates = row.cost_per_day, row.cost_per_week, row.cost_per_month
+                else:
+                    rates = row.daily_rate, row.weekly_rate, row.monthly_rate
+
+                days = self.rental_days(row.start_date, row.end_date)
+                fee = Decimal("0.00")
+                if row.returned_at is not None:
+                    fee = self.late_fee(rates[0], row.end_date, row.returned_at)
+
+                costs.append(
+                    {
+                        "location_id": row.id,
+                        "daily": rates[0],
+                        "weekly": rates[1],
+                        "monthly": rates[2],
+                        "total": self.price(days, *rates) + fee,
+                        "fee": fee,
+                    }
+                )
+
+            connection.execute(set_costs, costs)
+            updated += len(costs)
+            last_id = rows[-1].id
+
+        return updated
+
+    def backfill_daily(self, connection, where=None) -> int:
+        """
+        Price the locations of the equipments with only a daily rate in a
+        single UPDATE, the cost is then the number of days times the rate
+
+        Returned locations are left to backfill, they may have a late fee.
+        """
+        daily_rate = (
+            select(Equipment.cost_per_day)
+            .where(Equipment.id == Location.id_equipment)
+            .scalar_subquery()
+        )
+        daily_only = select(Equipment.id).where(
+            Equipment.cost_per_week.is_(None), Equipment.cost_per_month.is_(None)
+        )
+        stmt = (
+            update(Location)
+            .where(
+                Location.total_cost.is_(None),
+                Location.daily_rate.is_(None),
+                Location.returned_at.is_(None),
+                Location.id_equipment.in_(daily_only),
+            )
+            .values(
+                daily_rate=daily_rate,
+                total_cost=self.sql_rental_days() * daily_rate,
+                late_fee=0,
+            )
+        )
+        if where is not None:
+            stmt = stmt.where(where)
+        return connection.execute(stmt).rowcount
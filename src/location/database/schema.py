@@ -1,8 +1,10 @@
 from pydantic import BaseModel, ConfigDict
 from datetime import datetime
-from typing import Optional
+from typing import Any, Generic, Optional, TypeVar
 from decimal import Decimal
 
+T = TypeVar("T")
+
 
 # Pydantic models for linking the database with the ui
 class BaseSchema(BaseModel):
@@ -27,6 +29,8 @@ class EquipmentBase(BaseSchema):
     name: str
     cost_per_day: Decimal
     is_available: bool
+    cost_per_week: Optional[Decimal] = None
+    cost_per_month: Optional[Decimal] = None
 
 
 class EquipmentCreate(EquipmentBase):
@@ -50,5 +54,41 @@ class LocationCreate(LocationBase):
 
 class LocationRead(LocationBase):
     id: int
+    returned_at: Optional[datetime] = None
+    daily_rate: Optional[Decimal] = None
+    total_cost: Optional[Decimal] = None
+    late_fee: Optional[Decimal] = None
     client: ClientRead
     equipment: EquipmentRead
+
+
+class Page(BaseModel, Generic[T]):
+    """
+    A page of results, next_cursor is None when it is the last page
+    """
+
+    items: list[T]
+    next_cursor: Optional[tuple[Any, int]] = None
+
+
+# Rows of the analytics reports
+class RevenueRead(BaseSchema):
+    key: int
+    label: str
+    rentals: int
+    days: int
+    revenue: Decimal
+
+
+class UtilizationRead(BaseSchema):
+    id: int
+    name: str
+    rented_days: float
+    utilization: float
+
+
+class OverdueRead(BaseSchema):
+    id: int
+    name: str
+    count: int
+    oldest_end_date: datetime
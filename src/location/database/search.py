@@ -0,0 +1,75 @@
+from sqlalchemy import text
+
+# Full text indexes kept in sync with their table by triggers
+SEARCH_INDEXES = {
+    "clients_search": ("clients", ["name", "email", "phone"]),
+    "equipments_search": ("equipments", ["name"]),
+}
+
+# The trigram tokenizer can't match less than 3 characters
+MIN_MATCH_LENGTH = 3
+
+
+def create_search_indexes(connection):
+    """
+    Create the FTS5 indexes and their triggers if they don't exist yet
+    """
+    for index, (table, columns) in SEARCH_INDEXES.items():
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": index},
+        ).first()
+
+        names = ", ".join(columns)
+        new_values = ", ".join(f"new.{c}" for c in columns)
+        old_values = ", ".join(f"old.{c}" for c in columns)
+
+        connection.execute(
+            text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5("
+                f"{names}, content='{table}', content_rowid='id', "
+                "tokenize='trigram')"
+            )
+        )
+
+        # Keep the index in sync with the table
+        connection.execute(
+            text(
+                f"CREATE TRIGGER IF NOT EXISTS {index}_insert AFTER INSERT ON {table} "
+                f"BEGIN INSERT INTO {index}(rowid, {names}) "
+                f"VALUES (new.id, {new_values}); END"
+            )
+        )
+        connection.execute(
+            text(
+                f"CREATE TRIGGER IF NOT EXISTS {index}_delete AFTER DELETE ON {table} "
+                f"BEGIN INSERT INTO {index}({index}, rowid, {names}) "
+                f"VALUES ('delete', old.id, {old_values}); END"
+            )
+        )
+        # Only the updates of the indexed columns change the index
+        connection.execute(
+            text(
+                f"CREATE TRIGGER IF NOT EXISTS {index}_update "
+                f"AFTER UPDATE OF {names} ON {table} "
+                f"BEGIN INSERT INTO {index}({index}, rowid, {names}) "
+                f"VALUES ('delete', old.id, {old_values}); "
+                f"INSERT INTO {index}(rowid, {names}) "
+                f"VALUES (new.id, {new_values}); END"
+            )
+        )
+
+        # Index the rows of an existing database
+        if exists is None:
+            connection.execute(text(f"INSERT INTO {index}({index}) VALUES ('rebuild')"))
+
+
+def match_query(search_text: str, column: str = None) -> str:
+    """
+    Build an FTS5 query matching the text anywhere in the column (or in all
+    the columns)
+    """
+    phrase = '"' + search_text.replace('"', '""') + '"'
+    if column is None:
+        return phrase
+    return f"{column} : {phrase}"
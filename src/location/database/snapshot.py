@@ -0,0 +1,131 @@
+import os
+import time
+from pydantic import BaseModel
+from sqlalchemy import (
+    DECIMAL,
+    Boolean,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    String,
+    create_engine,
+    insert,
+    inspect,
+    select,
+)
+from sqlalchemy.orm import declarative_base
+
+from .database import engine
+from .models import Client, Equipment, Location
+
+# Tables only found in the snapshots, never created in the database
+SnapshotBase = declarative_base()
+
+
+class LocationRow(SnapshotBase):
+    """
+    Row of the list of the locations with the names of its client and of its
+    equipment, precomputed in a snapshot so the list needs no join
+    """
+
+    __tablename__ = "snapshot_location_rows"
+    __table_args__ = (
+        Index("ix_snapshot_location_rows_client", "id_client"),
+        Index("ix_snapshot_location_rows_equipment", "id_equipment"),
+        Index("ix_snapshot_location_rows_returned_end", "is_returned", "end_date"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    id_client = Column(Integer)
+    id_equipment = Column(Integer)
+    client_name = Column(String)
+    equipment_name = Column(String)
+    start_date = Column(DateTime)
+    end_date = Column(DateTime)
+    is_returned = Column(Boolean)
+    total_cost = Column(DECIMAL(10, 2))
+
+
+def has_location_rows(connection) -> bool:
+    return inspect(connection).has_table(LocationRow.__tablename__)
+
+
+class SnapshotReport(BaseModel):
+    path: str
+    locations: int = 0
+    size: int = 0
+    seconds: float = 0.0
+
+    def __str__(self):
+        return (
+            f"{self.path}: {self.locations} locations, "
+            f"{self.size / 1024 / 1024:.1f} MB in {self.seconds:.2f}s"
+        )
+
+
+def create_snapshot(path: str, bind=engine) -> SnapshotReport:
+    """
+    Write a compact copy of the database for the read-only workstations
+
+    The copy is made by VACUUM INTO, consistent even while the database is
+    written, without the change log of the synchronization and with the
+    rows of the list of the locations precomputed. It is a single file in
+    rollback journal mode, so it can be opened with immutable=1.
+    """
+    report = SnapshotReport(path=path)
+    start = time.perf_counter()
+
+    # Write to a temporary file so a failed snapshot leaves nothing behind
+    temporary_path = path + ".part"
+    if os.path.exists(temporary_path):
+        os.remove(temporary_path)
+
+    try:
+        with bind.connect() as connection:
+            connection.exec_driver_sql("VACUUM INTO ?", (temporary_path,))
+
+        snapshot = create_engine(f"sqlite:///{temporary_path}")
+        try:
+            with snapshot.begin() as connection:
+                connection.exec_driver_sql("DELETE FROM change_log")
+
+                SnapshotBase.metadata.create_all(connection)
+                rows = (
+                    select(
+                        Location.id,
+                        Location.id_client,
+                        Location.id_equipment,
+                        Client.name,
+                        Equipment.name,
+                        Location.start_date,
+                        Location.end_date,
+                        Location.is_returned,
+                        Location.total_cost,
+                    )
+                    .outerjoin(Client, Location.id_client == Client.id)
+                    .outerjoin(Equipment, Location.id_equipment == Equipment.id)
+                    .order_by(Location.id)
+                )
+                columns = [column.name for column in LocationRow.__table__.columns]
+                result = connection.execute(
+                    insert(LocationRow).from_select(columns, rows)
+                )
+                report.locations = result.rowcount
+
+            # Statistics for the query planner, then drop the free pages
+            with snapshot.connect() as connection:
+                connection.exec_driver_sql("ANALYZE")
+                connection.exec_driver_sql("PRAGMA journal_mode = DELETE")
+                connection.exec_driver_sql("VACUUM")
+        finally:
+            snapshot.dispose()
+
+        os.replace(temporary_path, path)
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+    report.size = os.path.getsize(path)
+    report.seconds = time.perf_counter() - start
+    return report
@@ -0,0 +1,635 @@
+import json
+import time
+import urllib.parse
+import urllib.request
+from datetime import datetime, timezone
+from decimal import Decimal
+from itertools import islice
+from pydantic import BaseModel
+from sqlalchemy import DECIMAL, DateTime, bindparam, func, or_, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import aliased
+
+from .models import (
+    ChangeLog,
+    Client,
+    Equipment,
+    GidAlias,
+    Location,
+    SyncConflict,
+    SyncNode,
+    SyncPeer,
+    new_gid,
+)
+from .validation import normalize_email, normalize_phone
+
+# Tables synchronized between the branches, their changes are applied in
+# this order so the clients and the equipments exist before their locations
+SYNCED_TABLES = {"clients": Client, "equipments": Equipment, "locations": Location}
+
+# Foreign keys of the locations, sent as the gid of the row they point to
+REFERENCES = {
+    "id_client": ("client_gid", Client),
+    "id_equipment": ("equipment_gid", Equipment),
+}
+
+# Columns of a location set by its return, a return is never undone
+RETURN_FIELDS = ("is_returned", "returned_at", "total_cost", "late_fee")
+
+# Rows applied at once
+SYNC_CHUNK_SIZE = 5000
+
+# Format of the stamps of the changes, the same as strftime('%f') in SQLite
+STAMP_FORMAT = "%Y-%m-%dT%H:%M:%f"
+
+
+def now_stamp() -> str:
+    now = datetime.now(timezone.utc)
+    return now.strftime("%Y-%m-%dT%H:%M:%S.") + f"{now.microsecond // 1000:03d}"
+
+
+def create_change_log_triggers(connection):
+    """
+    Log the inserts and the updates of the synchronized tables, except the
+    changes of another branch being applied
+    """
+    for table in SYNCED_TABLES:
+        log = (
+            "INSERT INTO change_log (entity, row_id, origin, stamp) "
+            f"SELECT '{table}', new.id, node_id, strftime('{STAMP_FORMAT}', 'now') "
+            "FROM sync_node"
+        )
+        not_applying = "(SELECT applying FROM sync_node) = 0"
+
+        connection.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_log_insert AFTER INSERT ON {table} "
+            f"WHEN {not_applying} BEGIN {log}; END"
+        )
+        # Setting the gid of a new row is not a change
+        connection.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_log_update AFTER UPDATE ON {table} "
+            f"WHEN old.gid IS NOT NULL AND {not_applying} BEGIN {log}; END"
+        )
+        # Rows inserted without the defaults of the models
+        connection.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_gid AFTER INSERT ON {table} "
+            f"WHEN new.gid IS NULL BEGIN UPDATE {table} "
+            "SET gid = lower(hex(randomblob(16))) WHERE id = new.id; END"
+        )
+
+
+def encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def decode(column, value):
+    if value is None:
+        return None
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, DECIMAL):
+        return Decimal(value)
+    return value
+
+
+def chunks(rows: list, size: int = SYNC_CHUNK_SIZE):
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+class SyncReport(BaseModel):
+    # Branch that sent the changes and branch that applied them
+    source: str = ""
+    target: str = ""
+    received: int = 0
+    inserted: int = 0
+    updated: int = 0
+    # Rows already up to date, or changed later in the target
+    skipped: int = 0
+    # Clients created in both branches, matched by email or phone
+    merged: int = 0
+    # New double bookings of an equipment
+    conflicts: int = 0
+    seconds: float = 0.0
+    errors: list[str] = []
+    # Ids of the rows inserted or updated in the target, by table
+    changed: dict[str, list[int]] = {}
+
+    def __str__(self):
+        return (
+            f"{self.source} -> {self.target}: {self.received} changes in "
+            f"{self.seconds:.2f}s, {self.inserted} inserted, {self.updated} "
+            f"updated, {self.skipped} skipped, {self.merged} merged clients, "
+            f"{self.conflicts} conflicts"
+        )
+
+
+class SyncEngine:
+    """
+    Exchange the changes of the clients, the equipments and the locations
+    between the databases of the branches
+
+    Each database logs its changes in the change_log table with the branch
+    and the UTC time where they were made, their version. A branch sends the
+    last version of the rows changed since the watermark of the other one,
+    the seq of the last change it received, never the whole tables.
+
+    A row changed in both branches keeps the most recent version, except
+    that a returned location stays returned. A client created in both
+    branches with the same email or phone is merged. Two locations booking
+    the same equipment for overlapping dates are both kept, they are signed
+    contracts, and the conflict is recorded for the counters to solve.
+    """
+
+    def init_node(self, connection):
+        """
+        Give the database a branch id, its existing rows are its first
+        changes
+        """
+        if connection.execute(select(SyncNode.id)).first() is not None:
+            return
+
+        node = new_gid()
+        connection.execute(insert(SyncNode).values(id=1, node_id=node, applying=False))
+        stamp = now_stamp()
+        for table in SYNCED_TABLES:
+            connection.exec_driver_sql(
+                "INSERT INTO change_log (entity, row_id, origin, stamp) "
+                f"SELECT ?, id, ?, ? FROM {table} ORDER BY id",
+                (table, node, stamp),
+            )
+
+    def node_id(self, connection) -> str:
+        return connection.execute(select(SyncNode.node_id)).scalar_one()
+
+    def new_node_id(self, connection) -> str:
+        """
+        Change the branch id, for a database copied from another branch
+
+        The copy has all the changes of the branch copied, its watermark is
+        the last change of the copy.
+        """
+        copied = self.node_id(connection)
+        node = new_gid()
+        connection.execute(update(SyncNode).values(node_id=node))
+
+        until = connection.execute(select(func.max(ChangeLog.seq))).scalar() or 0
+        self.move_watermark(connection, copied, until)
+        return node
+
+    def watermark(self, connection, node: str) -> int:
+        """
+        Return the seq of the last change of a branch applied here
+        """
+        stmt = select(SyncPeer.pulled_seq).where(SyncPeer.node_id == node)
+        return connection.execute(stmt).scalar() or 0
+
+    def changes(self, connection, since: int = 0, for_node: str = None) -> dict:
+        """
+        Return the last version of the rows changed after the seq since,
+        the changes made by for_node are left out
+        """
+        until = connection.execute(select(func.max(ChangeLog.seq))).scalar() or 0
+        change_set = {
+            "node": self.node_id(connection),
+            "since": since,
+            "until": until,
+            "changes": {},
+        }
+
+        for table, model in SYNCED_TABLES.items():
+            latest = (
+                select(ChangeLog.row_id, func.max(ChangeLog.seq).label("seq"))
+                .where(ChangeLog.entity == table, ChangeLog.seq > since)
+                .where(ChangeLog.seq <= until)
+                .group_by(ChangeLog.row_id)
+                .subquery()
+            )
+            names = [c.name for c in model.__table__.columns if c.name != "id"]
+            columns = [getattr(model, name) for name in names]
+
+            # The foreign keys are sent as gids
+            joins = []
+            for key, (gid_name, target) in REFERENCES.items():
+                if key in names:
+                    target = aliased(target)
+                    index = names.index(key)
+                    names[index] = gid_name
+                    columns[index] = target.gid
+                    joins.append((target, getattr(model, key) == target.id))
+
+            stmt = (
+                select(ChangeLog.origin, ChangeLog.stamp, *columns)
+                .select_from(model)
+                .join(latest, latest.c.row_id == model.id)
+                .join(ChangeLog, ChangeLog.seq == latest.c.seq)
+            )
+            for target, condition in joins:
+                stmt = stmt.outerjoin(target, condition)
+            if for_node is not None:
+                stmt = stmt.where(ChangeLog.origin != for_node)
+
+            rows = []
+            for origin, stamp, *values in connection.execute(
+                stmt.order_by(latest.c.seq)
+            ):
+                values = dict(zip(names, map(encode, values)))
+                gid = values.pop("gid")
+                rows.append(
+                    {"gid": gid, "origin": origin, "stamp": stamp, "values": values}
+                )
+            change_set["changes"][table] = rows
+
+        return change_set
+
+    def apply(self, connection, change_set: dict) -> SyncReport:
+        """
+        Apply the changes of another branch and move its watermark
+        """
+        start = time.perf_counter()
+        node = self.node_id(connection)
+        report = SyncReport(source=change_set["node"], target=node)
+        if change_set["node"] == node:
+            raise ValueError(
+                "Both databases have the same branch id, run "
+                "'cli sync-node --new' on the copied one"
+            )
+
+        # The triggers don't log the changes applied, they keep their version
+        connection.execute(update(SyncNode).values(applying=True))
+
+        for table, model in SYNCED_TABLES.items():
+            rows = change_set["changes"].get(table, [])
+            report.received += len(rows)
+            for chunk in chunks(rows):
+                self.apply_chunk(connection, table, model, chunk, node, report)
+
+        connection.execute(update(SyncNode).values(applying=False))
+        self.move_watermark(connection, change_set["node"], change_set["until"])
+
+        report.seconds = time.perf_counter() - start
+        return report
+
+    def move_watermark(self, connection, node: str, seq: int):
+        stmt = insert(SyncPeer).values(
+            node_id=node, pulled_seq=seq, synced_at=datetime.now()
+        )
+        connection.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[SyncPeer.node_id],
+                set_={
+                    "pulled_seq": stmt.excluded.pulled_seq,
+                    "synced_at": stmt.excluded.synced_at,
+                },
+            )
+        )
+
+    def apply_chunk(self, connection, table, model, chunk, node, report):
+        columns = model.__table__.columns
+        references = {
+            key: self.resolve(
+                connection, target, {row["values"].get(gid_name) for row in chunk}
+            )
+            for key, (gid_name, target) in REFERENCES.items()
+            if key in columns
+        }
+        aliases = self.aliases(connection, [row["gid"] for row in chunk])
+
+        # The local version of the rows, with their last change
+        stmt = select(model).where(
+            model.gid.in_([aliases.get(row["gid"], row["gid"]) for row in chunk])
+        )
+        local = {row.gid: row for row in connection.execute(stmt)}
+        versions = {}
+        stmt = (
+            select(ChangeLog.row_id, ChangeLog.stamp, ChangeLog.origin)
+            .where(ChangeLog.entity == table)
+            .where(ChangeLog.row_id.in_([row.id for row in local.values()]))
+            .order_by(ChangeLog.seq)
+        )
+        for row_id, stamp, origin in connection.execute(stmt):
+            versions[row_id] = (stamp, origin)
+
+        inserts, inserted_versions, updates, logs = [], [], [], []
+        for row in chunk:
+            gid = row["gid"]
+            version = (row["stamp"], row["origin"])
+
+            values = {"gid": gid}
+            for name, value in row["values"].items():
+                if name in columns:
+                    values[name] = decode(columns[name], value)
+            for key, (gid_name, target) in REFERENCES.items():
+                if key in references:
+                    values[key] = references[key].get(row["values"].get(gid_name))
+                    if values[key] is None:
+                        report.errors.append(f"{table} {gid}: {gid_name} not found")
+            if None in (values.get(key, 0) for key in references):
+                continue
+
+            current = local.get(aliases.get(gid, gid))
+            if current is None and table == "clients":
+                current = self.match_client(connection, values)
+                if current is not None:
+                    report.merged += 1
+
+            if current is None:
+                inserts.append(values)
+                inserted_versions.append(version)
+                continue
+
+            old = {name: getattr(current, name) for name in values}
+            newer = version > versions.get(current.id, ("", ""))
+            merged = self.merge(table, old, values, newer)
+
+            # A client merged in both branches keeps the smallest gid, the
+            # other one is an alias
+            merged["gid"] = min(old["gid"], gid)
+            for alias in {old["gid"], gid} - {merged["gid"]}:
+                connection.execute(
+                    insert(GidAlias)
+                    .values(gid=alias, target_gid=merged["gid"])
+                    .on_conflict_do_nothing()
+                )
+
+            if merged == old and merged["gid"] == gid:
+                report.skipped += 1
+                continue
+
+            if merged != old:
+                updates.append({f"new_{n}": value for n, value in merged.items()})
+                updates[-1]["row_id"] = current.id
+            # A merge of both versions is a new change of this branch, sent
+            # back to the other one
+            if merged != values:
+                version = (now_stamp(), node)
+            logs.append((current.id, version))
+
+        if updates:
+            connection.execute(
+                update(model)
+                .where(model.id == bindparam("row_id"))
+                .values({name: bindparam(f"new_{name}") for name in merged}),
+                updates,
+            )
+            report.updated += len(updates)
+
+        if inserts:
+            stmt = insert(model).returning(model.id, sort_by_parameter_order=True)
+            ids = connection.execute(stmt, inserts).scalars().all()
+            logs.extend(zip(ids, inserted_versions))
+            report.inserted += len(inserts)
+
+        if logs:
+            connection.execute(
+                insert(ChangeLog),
+                [
+                    {"entity": table, "row_id": id, "stamp": stamp, "origin": origin}
+                    for id, (stamp, origin) in logs
+                ],
+            )
+            report.changed.setdefault(table, []).extend(id for id, _ in logs)
+            if table == "locations":
+                self.record_conflicts(connection, [id for id, _ in logs], report)
+
+    def resolve(self, connection, model, gids: set[str]) -> dict[str, int]:
+        """
+        Return the local ids of the rows with the gids
+        """
+        gids.discard(None)
+        aliases = self.aliases(connection, gids) if model is Client else {}
+        stmt = select(model.gid, model.id).where(
+            model.gid.in_({aliases.get(gid, gid) for gid in gids})
+        )
+        ids = dict(connection.execute(stmt).all())
+        return {gid: ids.get(aliases.get(gid, gid)) for gid in gids}
+
+    def aliases(self, connection, gids) -> dict[str, str]:
+        stmt = select(GidAlias.gid, GidAlias.target_gid).where(GidAlias.gid.in_(gids))
+        return dict(connection.execute(stmt).all())
+
+    def match_client(self, connection, values: dict):
+        """
+        Return the client with the email or the phone of a client created in
+        another branch
+        """
+        conditions = []
+        if values.get("email"):
+            email = normalize_email(values["email"])
+            conditions.append(func.lower(Client.email) == email)
+        if values.get("phone"):
+            conditions.append(Client.phone == normalize_phone(values["phone"]))
+        if not conditions:
+            return None
+
+        return connection.execute(select(Client).where(or_(*conditions))).first()
+
+    def merge(self, table: str, old: dict, new: dict, newer: bool) -> dict:
+        """
+        Merge the local and the incoming version of a row, the most recent
+        wins except that a returned location stays returned
+        """
+        merged = dict(new if newer else old)
+        if table == "locations" and not merged["is_returned"]:
+            for version in (old, new):
+                if version["is_returned"]:
+                    merged.update({name: version[name] for name in RETURN_FIELDS})
+        return merged
+
+    def record_conflicts(self, connection, ids: list[int], report: SyncReport):
+        """
+        Record the locations applied that book their equipment at the same
+        time as another location
+        """
+        other = aliased(Location)
+        for chunk in chunks(ids):
+            stmt = (
+                select(Equipment.gid, Location.gid, other.gid)
+                .join(Equipment, Equipment.id == Location.id_equipment)
+                .join(
+                    other,
+                    (other.id_equipment == Location.id_equipment)
+                    & (other.id != Location.id),
+                )
+                .where(Location.id.in_(chunk), ~Location.is_returned)
+                .where(
+                    ~other.is_returned,
+                    other.start_date <= Location.end_date,
+                    other.end_date >= Location.start_date,
+                )
+            )
+            conflicts = [
+                {
+                    "equipment_gid": equipment_gid,
+                    "location_gid": min(gid, other_gid),
+                    "other_location_gid": max(gid, other_gid),
+                    "detected_at": datetime.now(),
+                }
+                for equipment_gid, gid, other_gid in connection.execute(stmt)
+            ]
+            if not conflicts:
+                continue
+
+            stmt = insert(SyncConflict).on_conflict_do_nothing(
+                index_elements=[
+                    SyncConflict.location_gid,
+                    SyncConflict.other_location_gid,
+                ]
+            )
+            report.conflicts += connection.execute(stmt, conflicts).rowcount
+
+    def compact(self, connection) -> int:
+        """
+        Delete the changes replaced by a later change of the same row, the
+        watermarks stay valid
+        """
+        stmt = (
+            "DELETE FROM change_log WHERE seq NOT IN "
+            "(SELECT max(seq) FROM change_log GROUP BY entity, row_id)"
+        )
+        return connection.exec_driver_sql(stmt).rowcount
+
+    def conflicts(self, connection, include_resolved: bool = False) -> list:
+        """
+        Return the double bookings with the ids of their locations, those
+        marked resolved or with a returned location are solved
+        """
+        location, other = aliased(Location), aliased(Location)
+        stmt = (
+            select(
+                SyncConflict.id,
+                location.id_equipment,
+                location.id.label("location_id"),
+                other.id.label("other_location_id"),
+                SyncConflict.detected_at,
+                SyncConflict.is_resolved,
+            )
+            .join(location, location.gid == SyncConflict.location_gid)
+            .join(other, other.gid == SyncConflict.other_location_gid)
+            .order_by(SyncConflict.id)
+        )
+        if not include_resolved:
+            stmt = stmt.where(
+                ~SyncConflict.is_resolved, ~location.is_returned, ~other.is_returned
+            )
+        return connection.execute(stmt).all()
+
+
+def synchronize(local, remote) -> list[SyncReport]:
+    """
+    Pull the changes of the remote branch, then push the local changes to it
+
+    local and remote are peers: DatabasePeer, HttpPeer or a DatabaseManager
+    """
+    node = local.sync_node_id()
+    remote_node, pushed_since = remote.sync_handshake(node)
+    if remote_node == node:
+        raise ValueError(
+            "Both databases have the same branch id, run "
+            "'cli sync-node --new' on the copied one"
+        )
+
+    pulled = local.apply_changes(
+        remote.sync_changes(local.sync_watermark(remote_node), node)
+    )
+    pushed = remote.apply_changes(local.sync_changes(pushed_since, remote_node))
+    return [pulled, pushed]
+
+
+class DatabasePeer:
+    """
+    Database of another branch, a file or a SQLAlchemy URL
+    """
+
+    sync = SyncEngine()
+
+    def __init__(self, url: str):
+        # Imported here, the migrations import this module
+        from .database import create_db_engine
+        from .migrations import migrate
+
+        if "://" not in url:
+            url = f"sqlite:///{url}"
+        self.engine = create_db_engine(url)
+        migrate(self.engine)
+
+    def sync_node_id(self) -> str:
+        with self.engine.connect() as connection:
+            return self.sync.node_id(connection)
+
+    def sync_watermark(self, node: str) -> int:
+        with self.engine.connect() as connection:
+            return self.sync.watermark(connection, node)
+
+    def sync_handshake(self, node: str) -> tuple[str, int]:
+        with self.engine.connect() as connection:
+            return self.sync.node_id(connection), self.sync.watermark(connection, node)
+
+    def sync_changes(self, since: int = 0, for_node: str = None) -> dict:
+        with self.engine.connect() as connection:
+            return self.sync.changes(connection, since, for_node)
+
+    def apply_changes(self, change_set: dict) -> SyncReport:
+        with self.engine.begin() as connection:
+            return self.sync.apply(connection, change_set)
+
+    def close(self):
+        self.engine.dispose()
+
+
+class HttpPeer:
+    """
+    Branch served by the API server (python -m location.server)
+    """
+
+    def __init__(self, url: str, timeout: float = 300):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def request(self, path: str, body: dict = None, **params):
+        url = f"{self.url}{path}"
+        if params:
+            url += "?" + urllib.parse.urlencode(params)
+
+        data = None if body is None else json.dumps(body).encode()
+        request = urllib.request.Request(
+            url, data=data, headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.load(response)
+
+    def sync_node_id(self) -> str:
+        return self.request("/sync")["node"]
+
+    def sync_watermark(self, node: str) -> int:
+        return self.request("/sync", node=node)["watermark"]
+
+    def sync_handshake(self, node: str) -> tuple[str, int]:
+        state = self.request("/sync", node=node)
+        return state["node"], state["watermark"]
+
+    def sync_changes(self, since: int = 0, for_node: str = None) -> dict:
+        params = {"since": since}
+        if for_node is not None:
+            params["for"] = for_node
+        return self.request("/sync/changes", **params)
+
+    def apply_changes(self, change_set: dict) -> SyncReport:
+        return SyncReport(**self.request("/sync/changes", change_set))
+
+    def close(self):
+        pass
+
+
+def open_peer(target: str):
+    """
+    Return the peer of a database path, a SQLAlchemy URL or a server URL
+    """
+    if target.startswith(("http://", "https://")):
+        return HttpPeer(target)
+    return DatabasePeer(target)
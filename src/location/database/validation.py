@@ -0,0 +1,43 @@
+import re
+
+# Compiled once, shared by the forms and the imports
+EMAIL_PATTERN = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+PHONE_PATTERN = re.compile(r"[0-9]{10}")
+
+# Separators allowed in a phone number: spaces, dots, dashes and parentheses
+PHONE_SEPARATORS = re.compile(r"[\s.()-]")
+
+
+def normalize_email(email: str) -> str:
+    """
+    Emails are compared without case
+    """
+    return email.strip().lower()
+
+
+def normalize_phone(phone: str) -> str:
+    """
+    Remove the separators of a phone number and the country code 1, so
+    "+1 (514) 111-2222" becomes "5141112222"
+    """
+    phone = phone.strip()
+    if len(phone) == 10 and phone.isdigit():
+        return phone
+
+    phone = PHONE_SEPARATORS.sub("", phone)
+    if phone.startswith("+"):
+        phone = phone[1:]
+    if len(phone) == 11 and phone.startswith("1"):
+        phone = phone[1:]
+    return phone
+
+
+def is_valid_email(email: str) -> bool:
+    return EMAIL_PATTERN.fullmatch(email) is not None
+
+
+def is_valid_phone(phone: str) -> bool:
+    """
+    Valid phone numbers have 10 digits, once normalized: 5141112222
+    """
+    return PHONE_PATTERN.fullmatch(phone) is not None
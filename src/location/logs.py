@@ -0,0 +1,15 @@
+import logging
+import os
+
+# Level of the SQL logs, WARNING by default, INFO to print the statements
+LOG_LEVEL = os.environ.get("LOCATION_DB_LOG_LEVEL", "WARNING")
+
+
+def configure_logging(sql_level: str = LOG_LEVEL):
+    """
+    Configure the logs of a program, only called by the entry points so
+    importing the package never changes the logging of its caller
+    """
+    logging.basicConfig()
+    # SQL statements are logged at INFO level, results at DEBUG level
+    logging.getLogger("sqlalchemy.engine").setLevel(sql_level.upper())
@@ -1,4 +1,10 @@
-from PySide6.QtCore import Qt
+# Imported first to measure the time spent importing the others
+from location.profiler import startup_profiler
+
+import importlib
+import os
+from PySide6.QtCore import QTimer, Signal
+from PySide6.QtGui import QKeySequence, QPaintEvent, QShortcut
 from PySide6.QtWidgets import (
     QApplication,
     QHBoxLayout,
@@ -8,16 +14,22 @@ from PySide6.QtWidgets import (
     QVBoxLayout,
     QWidget,
 )
-import os
+from location.logs import configure_logging
+from location.ui.workers import ThreadSignal
 
-from location.database.database import Base, engine
-from location.ui.client_page import ClientPage
-from location.ui.equipment_page import EquipmentPage
-from location.ui.location_page import LocationPage
-from location.database.models import *
+# Module and class of the pages, imported the first time they are shown
+PAGES = [
+    ("location.ui.client_page", "ClientPage"),  # Index 0
+    ("location.ui.equipment_page", "EquipmentPage"),  # Index 1
+    ("location.ui.location_page", "LocationPage"),  # Index 2
+    ("location.ui.analytics_page", "AnalyticsPage"),  # Index 3
+]
 
 
 class MainWindow(QMainWindow):
+    # Emitted when the window is painted for the first time
+    first_painted = Signal()
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Logiciel de location")
@@ -33,11 +45,13 @@ class MainWindow(QMainWindow):
         self.btn_clients = QPushButton("Clients")
         self.btn_equipments = QPushButton("Equipments")
         self.btn_locations = QPushButton("Locations")
+        self.btn_analytics = QPushButton("Analyses")
 
         # Add the buttons to the sidebar
         self.sidebar_layout.addWidget(self.btn_clients)
         self.sidebar_layout.addWidget(self.btn_equipments)
         self.sidebar_layout.addWidget(self.btn_locations)
+        self.sidebar_layout.addWidget(self.btn_analytics)
         self.sidebar_layout.addStretch()
 
         # Add the sidebar to the main layout
@@ -50,30 +64,114 @@ class MainWindow(QMainWindow):
         self.stack = QStackedWidget()
         self.main_layout.addWidget(self.stack)
 
-        # Add the pages to the stack
-        self.client_page = ClientPage()
-        self.equipment_page = EquipmentPage()
-        self.location_page = LocationPage()
-        self.stack.addWidget(self.client_page)  # Index 0
-        self.stack.addWidget(self.equipment_page)  # Index 1
-        self.stack.addWidget(self.location_page)  # Index 2
+        # The pages are built when first shown and share the database manager
+        self.pages = {}
+        self.db_manager = None
+        self.painted = False
 
         # Set up the navigation
         self.btn_clients.clicked.connect(lambda: self.switch_page(0))
         self.btn_equipments.clicked.connect(lambda: self.switch_page(1))
         self.btn_locations.clicked.connect(lambda: self.switch_page(2))
-
-        # Set the initial page
-        self.switch_page(2)
+        self.btn_analytics.clicked.connect(lambda: self.switch_page(3))
+
+        # The navigation is enabled once the database is opened
+        self.sidebar_container.setEnabled(False)
+
+        # Debug panel of the queries
+        self.profile_shortcut = QShortcut(QKeySequence("Ctrl+Shift+D"), self)
+        self.profile_shortcut.activated.connect(self.show_query_profile)
+
+    def paintEvent(self, event: QPaintEvent):
+        super().paintEvent(event)
+
+        if not self.painted:
+            self.painted = True
+            self.first_painted.emit()
+
+    def open_database(self, db_manager, initial_page: int = 2):
+        """
+        Enable the navigation and show the initial page
+        """
+        self.db_manager = db_manager
+        self.sidebar_container.setEnabled(True)
+        if db_manager.read_only:
+            self.setWindowTitle("Logiciel de location (lecture seule)")
+        self.switch_page(initial_page)
+
+        # Show the number of overdue locations on their button
+        self.overdue_signal = ThreadSignal(self)
+        self.overdue_signal.emitted.connect(self.update_overdue_badge)
+        db_manager.overdue.subscribe(self.overdue_signal)
+        self.update_overdue_badge()
+
+    def update_overdue_badge(self):
+        count = self.db_manager.overdue.count()
+        if count:
+            self.btn_locations.setText(f"Locations ({count})")
+            self.btn_locations.setToolTip(f"{count} locations en retard")
+        else:
+            self.btn_locations.setText("Locations")
+            self.btn_locations.setToolTip("")
+
+        # Apply the style of the overdue property
+        self.btn_locations.setProperty("overdue", count > 0)
+        self.btn_locations.style().unpolish(self.btn_locations)
+        self.btn_locations.style().polish(self.btn_locations)
+
+    def show_query_profile(self):
+        # Imported when needed, it loads SQLAlchemy
+        from location.ui.query_profile_dialog import QueryProfileDialog
+
+        QueryProfileDialog(self).exec()
+
+    def page(self, index: int) -> QWidget:
+        """
+        Return the page at the index, built the first time it is needed
+        """
+        if index not in self.pages:
+            module, name = PAGES[index]
+            page_class = getattr(importlib.import_module(module), name)
+            self.pages[index] = page_class(self.db_manager)
+            self.stack.addWidget(self.pages[index])
+
+        return self.pages[index]
 
     def switch_page(self, index):
-        self.stack.setCurrentIndex(index)
+        self.stack.setCurrentWidget(self.page(index))
 
 
-def main():
-    # Initialize the database
-    Base.metadata.create_all(bind=engine)
+def open_database(window: MainWindow):
+    """
+    Check the schema of the database and show the first page, once the
+    window is painted
+    """
+    startup_profiler.mark("first paint")
+
+    # SQLAlchemy and Pydantic are slow to import, only after the first paint
+    from location.database.database_manager import DatabaseManager
+    from location.database.migrations import migrate, optimize
 
+    startup_profiler.mark("database imports")
+
+    # Initialize the database and apply the migrations
+    migrate()
+    QApplication.instance().aboutToQuit.connect(optimize)
+    startup_profiler.mark("schema")
+
+    # Scan the overdue locations in the background
+    db_manager = DatabaseManager()
+    db_manager.track_overdue()
+    QApplication.instance().aboutToQuit.connect(db_manager.overdue.stop)
+
+    window.open_database(db_manager)
+    startup_profiler.mark("first page")
+    startup_profiler.report()
+
+
+def main():
+    startup_profiler.mark("imports")
+    configure_logging()
     app = QApplication([])
 
     # Load and apply stylesheet
@@ -82,8 +180,14 @@ def main():
         with open(stylesheet_path, "r") as f:
             app.setStyleSheet(f.read())
 
+    startup_profiler.mark("application")
+
     window = MainWindow()
+    window.first_painted.connect(
+        lambda: QTimer.singleShot(0, lambda: open_database(window))
+    )
     window.show()
+    startup_profiler.mark("window")
     app.exec()
 
 
@@ -0,0 +1,42 @@
+import os
+import sys
+import time
+
+# Set LOCATION_PROFILE_STARTUP=1 to print the duration of each startup step
+PROFILE_STARTUP = os.environ.get("LOCATION_PROFILE_STARTUP", "") not in ("", "0")
+
+
+class StartupProfiler:
+    """
+    Measure the time spent between the steps of the startup
+    """
+
+    def __init__(self, enabled: bool = PROFILE_STARTUP):
+        self.enabled = enabled
+        self.start = self.last = time.perf_counter()
+        self.steps = []
+
+    def mark(self, step: str):
+        """
+        End a step, it lasted since the previous one
+        """
+        now = time.perf_counter()
+        self.steps.append((step, now - self.last))
+        self.last = now
+
+    def total(self) -> float:
+        return self.last - self.start
+
+    def report(self):
+        if not self.enabled:
+            return
+
+        print("Startup profile:", file=sys.stderr)
+        for step, seconds in self.steps:
+            print(f"  {step:<18} {seconds * 1000:8.1f} ms", file=sys.stderr)
+        print(f"  {'total':<18} {self.total() * 1000:8.1f} ms", file=sys.stderr)
+
+
+# Created when first imported, the entry point imports it before the others
+# so their import time is measured
+startup_profiler = StartupProfiler()
@@ -0,0 +1,43 @@
+import argparse
+import os
+from location.database.database_manager import DatabaseManager
+from location.database.export import FORMATS, Exporter
+from location.database.migrations import migrate
+from location.logs import configure_logging
+
+ENTITIES = ["clients", "equipments", "locations"]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export the tables of the database to files"
+    )
+    parser.add_argument(
+        "entities", nargs="*", help=f"tables to export, all by default: {ENTITIES}"
+    )
+    parser.add_argument(
+        "--format", choices=sorted(set(FORMATS.values())), default="csv"
+    )
+    parser.add_argument("--output", default="export", help="output folder")
+    args = parser.parse_args()
+
+    entities = args.entities or ENTITIES
+    for entity in entities:
+        if entity not in ENTITIES:
+            parser.error(f"unknown table {entity}")
+
+    # Initialize the database and apply the migrations
+    configure_logging()
+    migrate()
+    exporter = Exporter(DatabaseManager())
+
+    # Export each table to its own file: uv run export locations --format jsonl
+    extension = {format: ext for ext, format in FORMATS.items()}[args.format]
+    os.makedirs(args.output, exist_ok=True)
+    for entity in entities:
+        path = os.path.join(args.output, entity + extension)
+        print(exporter.export(entity, path, args.format))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,21 @@
+import sys
 from location.database.database_manager import DatabaseManager
-from location.database.database import Base, engine
-from location.database.models import *
+from location.database.migrations import migrate, optimize
+from location.logs import configure_logging
 
 
 def main():
-    # Initialize the database
-    Base.metadata.create_all(bind=engine)
+    configure_logging()
+
+    # Initialize the database and apply the migrations
+    migrate()
     db = DatabaseManager()
-    db.seed()
+
+    # The data folder can be given as argument: uv run seed path/to/folder
+    db.seed(sys.argv[1] if len(sys.argv) > 1 else "data")
+
+    # Update the statistics of the query planner with the new rows
+    optimize()
 
 
 if __name__ == "__main__":
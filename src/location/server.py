@@ -0,0 +1,532 @@
+"""
+Local HTTP/JSON API over the database, without the graphical interface
+
+    uv run serve
+    uv run serve --host 0.0.0.0 --port 8080
+
+    GET  /clients?name=ma&order_by=name&limit=50
+    GET  /clients?cursor=<next_cursor of the previous page>
+    GET  /clients/search?q=dupont
+    GET  /clients/12
+    POST /clients
+    PUT  /clients/12
+    POST /locations/3/return
+    GET  /sync?node=<branch id>
+    GET  /sync/changes?since=120&for=<branch id>
+    POST /sync/changes
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from datetime import datetime
+from http import HTTPStatus
+from urllib.parse import parse_qsl, urlsplit
+from pydantic import ValidationError
+from pydantic_core import to_jsonable_python
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+# Only the database is imported, the server must start without Qt
+from location.database.availability import OverlapError
+from location.database.client_import import DuplicateClientError
+from location.database.database import NotFoundError, ReadOnlyError
+from location.database.database_manager import SORT_COLUMNS, DatabaseManager
+from location.database.instrumentation import query_profiler
+from location.database.pricing import AlreadyReturnedError
+from location.database.migrations import migrate
+from location.database.models import Client, Equipment, Location
+from location.database.schema import ClientCreate, EquipmentCreate, LocationCreate
+from location.logs import configure_logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+
+# Threads running the database calls, less than the connections of the
+# engine pool (5 + 10 overflow) so a call never waits for a connection
+DEFAULT_WORKERS = 8
+
+# Pending connections accepted by the socket before the server handles them
+BACKLOG = 1024
+
+# Limits of a request, and time a kept-alive connection may stay idle
+MAX_HEADER_SIZE = 64 * 1024
+MAX_BODY_SIZE = 1024 * 1024
+# The changes of another branch, its first synchronization sends all its rows
+MAX_SYNC_BODY_SIZE = 512 * 1024 * 1024
+SYNC_PATH = "/sync/changes"
+IDLE_TIMEOUT = 30
+
+# Number of items of a page, by default and at most
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+MODELS = {"clients": Client, "equipments": Equipment, "locations": Location}
+SINGULAR = {"clients": "client", "equipments": "equipment", "locations": "location"}
+CREATE_SCHEMAS = {
+    "clients": ClientCreate,
+    "equipments": EquipmentCreate,
+    "locations": LocationCreate,
+}
+
+ENTITY = r"(?P<entity>clients|equipments|locations)"
+ROUTES = [
+    ("GET", rf"/{ENTITY}", "list_page"),
+    ("POST", rf"/{ENTITY}", "create"),
+    ("GET", rf"/{ENTITY}/search", "search"),
+    ("GET", rf"/{ENTITY}/(?P<id>\d+)", "read"),
+    ("PUT", rf"/(?P<entity>clients|equipments)/(?P<id>\d+)", "update"),
+    ("POST", r"/(?P<entity>locations)/(?P<id>\d+)/return", "return_location"),
+    ("GET", r"/debug/queries", "query_profile"),
+    ("GET", r"/sync", "sync_state"),
+    ("GET", SYNC_PATH, "sync_changes"),
+    ("POST", SYNC_PATH, "apply_changes"),
+]
+ROUTES = [(method, re.compile(path), name) for method, path, name in ROUTES]
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str = None, headers: dict = None):
+        super().__init__(message or HTTPStatus(status).phrase)
+        self.status = status
+        self.headers = headers or {}
+
+
+class Request:
+    def __init__(self, method: str, target: str, version: str, headers: dict):
+        url = urlsplit(target)
+        self.method = method
+        self.path = url.path.rstrip("/") or "/"
+        self.query = dict(parse_qsl(url.query))
+        self.version = version
+        self.headers = headers
+        self.body = b""
+
+    @property
+    def keep_alive(self) -> bool:
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+
+def parse_bool(value: str) -> bool:
+    if value.lower() in ("1", "true", "yes"):
+        return True
+    if value.lower() in ("0", "false", "no"):
+        return False
+    raise ValueError(f"invalid boolean {value}")
+
+
+# Filters of the lists, passed to the get_*_page methods
+FILTERS = {
+    "clients": {"name": str},
+    "equipments": {"name": str, "is_available": parse_bool},
+    "locations": {
+        "id_client": int,
+        "id_equipment": int,
+        "is_returned": parse_bool,
+        "start_after": datetime.fromisoformat,
+        "end_before": datetime.fromisoformat,
+    },
+}
+
+
+def encode_cursor(cursor: tuple) -> str:
+    """
+    Encode the (value, id) cursor of a page as an opaque string
+    """
+    if cursor is None:
+        return None
+    data = json.dumps(to_jsonable_python(list(cursor))).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, model, order_by: str) -> tuple:
+    """
+    Decode a cursor, its value takes the type of the sort column
+    """
+    if order_by not in SORT_COLUMNS[model]:
+        raise HttpError(400, f"Cannot sort on {order_by}")
+
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, last_id = json.loads(data)
+        python_type = getattr(model, order_by).type.python_type
+        if value is not None:
+            if python_type is datetime:
+                value = datetime.fromisoformat(value)
+            else:
+                value = python_type(value)
+        return value, int(last_id)
+    except Exception:
+        raise HttpError(400, "Invalid cursor")
+
+
+def etag_of(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Compare the If-None-Match header of a request to an ETag, weakly
+    """
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def json_body(value) -> bytes:
+    return json.dumps(value, ensure_ascii=False).encode()
+
+
+def page_body(items: list, next_cursor: str) -> bytes:
+    # The items are serialized by Pydantic, faster than a dict per item
+    items = b",".join(item.model_dump_json().encode() for item in items)
+    cursor = json_body(next_cursor)
+    return b'{"items":[' + items + b'],"next_cursor":' + cursor + b"}"
+
+
+class Api:
+    """
+    Handle the requests with a DatabaseManager, runs in the worker threads
+
+    The handlers return a status, a JSON body and extra headers. The
+    responses of GET requests carry an ETag of their body, a request with a
+    matching If-None-Match gets a 304 without body.
+    """
+
+    def __init__(self, db: DatabaseManager):
+        self.db = db
+
+    def handle(self, request: Request) -> tuple[int, bytes, dict]:
+        try:
+            handler, params = self.route(request)
+            status, body, headers = handler(request, **params)
+        except HttpError as e:
+            status, body, headers = e.status, json_body({"error": str(e)}), e.headers
+        except ValidationError as e:
+            errors = e.errors(include_url=False, include_context=False)
+            status, body, headers = 422, json_body({"error": errors}), {}
+        except NotFoundError as e:
+            status, body, headers = 404, json_body({"error": str(e)}), {}
+        except ReadOnlyError as e:
+            status, body, headers = 403, json_body({"error": str(e)}), {}
+        except (
+            OverlapError,
+            DuplicateClientError,
+            AlreadyReturnedError,
+            IntegrityError,
+        ) as e:
+            message = str(e.orig) if isinstance(e, IntegrityError) else str(e)
+            status, body, headers = 409, json_body({"error": message}), {}
+        except ValueError as e:
+            status, body, headers = 400, json_body({"error": str(e)}), {}
+        except SQLAlchemyError:
+            logger.exception("Database error on %s %s", request.method, request.path)
+            status, body, headers = 500, json_body({"error": "Database error"}), {}
+        except Exception:
+            logger.exception("Error on %s %s", request.method, request.path)
+            status, body, headers = 500, json_body({"error": "Internal error"}), {}
+
+        if request.method == "GET" and status == 200:
+            etag = etag_of(body)
+            headers = headers | {"ETag": etag}
+            if etag_matches(request.headers.get("if-none-match", ""), etag):
+                return 304, b"", headers
+
+        return status, body, headers
+
+    def route(self, request: Request):
+        allowed = []
+        for method, path, name in ROUTES:
+            match = path.fullmatch(request.path)
+            if match is None:
+                continue
+            if method == request.method:
+                return getattr(self, name), match.groupdict()
+            allowed.append(method)
+
+        if allowed:
+            raise HttpError(405, headers={"Allow": ", ".join(allowed)})
+        raise HttpError(404)
+
+    def get_limit(self, request: Request) -> int:
+        try:
+            limit = int(request.query.get("limit", PAGE_SIZE))
+        except ValueError:
+            raise HttpError(400, "Invalid limit")
+        return min(max(limit, 1), MAX_PAGE_SIZE)
+
+    def get_item(self, entity: str, id: int):
+        if entity == "clients":
+            item = self.db.get_client_by_id(id)
+        elif entity == "equipments":
+            item = self.db.get_equipment_by_id(id)
+        else:
+            item = next(iter(self.db.get_locations_by_ids([id])), None)
+
+        if item is None:
+            raise HttpError(404, f"{SINGULAR[entity].capitalize()} not found")
+        return item
+
+    def list_page(self, request: Request, entity: str):
+        model = MODELS[entity]
+        order_by = request.query.get("order_by", "id")
+        filters = {}
+        for name, parse in FILTERS[entity].items():
+            if name in request.query:
+                try:
+                    filters[name] = parse(request.query[name])
+                except ValueError:
+                    raise HttpError(400, f"Invalid {name}")
+
+        cursor = request.query.get("cursor")
+        if cursor is not None:
+            cursor = decode_cursor(cursor, model, order_by)
+
+        get_page = getattr(self.db, f"get_{entity}_page")
+        page = get_page(
+            limit=self.get_limit(request),
+            cursor=cursor,
+            order_by=order_by,
+            descending=parse_bool(request.query.get("descending", "false")),
+            **filters,
+        )
+        return 200, page_body(page.items, encode_cursor(page.next_cursor)), {}
+
+    def search(self, request: Request, entity: str):
+        """
+        Full text search, the matches are paginated by id
+        """
+        text = request.query.get("q", "").strip()
+        if not text:
+            raise HttpError(400, "Missing q")
+
+        ids = sorted(getattr(self.db, f"search_{entity}")(text))
+        cursor = request.query.get("cursor")
+        if cursor is not None:
+            _, last_id = decode_cursor(cursor, MODELS[entity], "id")
+            ids = [id for id in ids if id > last_id]
+
+        limit = self.get_limit(request)
+        next_cursor = None
+        if len(ids) > limit:
+            ids = ids[:limit]
+            next_cursor = encode_cursor((ids[-1], ids[-1]))
+
+        items = getattr(self.db, f"get_{entity}_by_ids")(ids)
+        items.sort(key=lambda item: item.id)
+        return 200, page_body(items, next_cursor), {}
+
+    def read(self, request: Request, entity: str, id: str):
+        item = self.get_item(entity, int(id))
+        return 200, item.model_dump_json().encode(), {}
+
+    def create(self, request: Request, entity: str):
+        data = CREATE_SCHEMAS[entity].model_validate_json(request.body or b"{}")
+        id = getattr(self.db, f"create_{SINGULAR[entity]}")(data)
+        item = self.get_item(entity, id)
+        headers = {"Location": f"/{entity}/{id}"}
+        return 201, item.model_dump_json().encode(), headers
+
+    def update(self, request: Request, entity: str, id: str):
+        self.get_item(entity, int(id))
+        data = CREATE_SCHEMAS[entity].model_validate_json(request.body or b"{}")
+        getattr(self.db, f"update_{SINGULAR[entity]}")(int(id), data)
+        item = self.get_item(entity, int(id))
+        return 200, item.model_dump_json().encode(), {}
+
+    def return_location(self, request: Request, entity: str, id: str):
+        location = self.get_item(entity, int(id))
+        if location.is_returned:
+            raise HttpError(409, "Location already returned")
+
+        self.db.return_location(int(id))
+        item = self.get_item(entity, int(id))
+        return 200, item.model_dump_json().encode(), {}
+
+    def query_profile(self, request: Request):
+        """
+        Report of the query profiler, with LOCATION_PROFILE_QUERIES=1
+        """
+        if not query_profiler.enabled:
+            raise HttpError(404, "Query profiler disabled")
+        return 200, json_body(query_profiler.to_dict()), {}
+
+    def sync_state(self, request: Request):
+        """
+        Branch id of the database and last change of the branch node applied
+        """
+        node, watermark = self.db.sync_handshake(request.query.get("node", ""))
+        return 200, json_body({"node": node, "watermark": watermark}), {}
+
+    def sync_changes(self, request: Request):
+        try:
+            since = int(request.query.get("since", 0))
+        except ValueError:
+            raise HttpError(400, "Invalid since")
+
+        change_set = self.db.sync_changes(since, request.query.get("for"))
+        return 200, json_body(change_set), {}
+
+    def apply_changes(self, request: Request):
+        try:
+            change_set = json.loads(request.body or b"{}")
+        except ValueError:
+            raise HttpError(400, "Invalid JSON")
+        if not isinstance(change_set, dict) or "node" not in change_set:
+            raise HttpError(400, "Invalid change set")
+
+        report = self.db.apply_changes(change_set)
+        return 200, report.model_dump_json().encode(), {}
+
+
+async def read_request(reader: asyncio.StreamReader) -> Request:
+    """
+    Read the next request of a connection, None when the client closed it
+    """
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if e.partial.strip():
+            raise HttpError(400, "Incomplete request")
+        return None
+    except asyncio.LimitOverrunError:
+        raise HttpError(431)
+
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ")
+    except ValueError:
+        raise HttpError(400, "Invalid request line")
+
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+    request = Request(method, target, version, headers)
+    if "transfer-encoding" in headers:
+        raise HttpError(501, "Chunked requests are not supported")
+
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HttpError(400, "Invalid Content-Length")
+    if length > (MAX_SYNC_BODY_SIZE if request.path == SYNC_PATH else MAX_BODY_SIZE):
+        raise HttpError(413)
+    if length:
+        request.body = await reader.readexactly(length)
+
+    return request
+
+
+def encode_response(status: int, body: bytes, headers: dict, keep_alive: bool):
+    lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+    headers = {
+        "Content-Type": "application/json; charset=utf-8",
+        "Content-Length": str(len(body)),
+        "Connection": "keep-alive" if keep_alive else "close",
+    } | headers
+    if status == 304:
+        del headers["Content-Type"], headers["Content-Length"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+class ApiServer:
+    """
+    Serve the API with asyncio, the database calls run in a pool of threads
+
+    The event loop only reads and writes the sockets, so hundreds of
+    connections can be open at once while a few threads query SQLite. In
+    WAL mode the reads run in parallel and the writes wait for each other
+    (busy_timeout) instead of failing.
+    """
+
+    def __init__(self, db: DatabaseManager, workers: int = DEFAULT_WORKERS):
+        self.api = Api(db)
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="api")
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        server = await asyncio.start_server(
+            self.handle_connection,
+            host,
+            port,
+            backlog=BACKLOG,
+            limit=MAX_HEADER_SIZE,
+        )
+        for socket in server.sockets:
+            print("Serving on http://{}:{}".format(*socket.getsockname()[:2]))
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown(cancel_futures=True)
+
+    async def handle_connection(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(read_request(reader), IDLE_TIMEOUT)
+                except HttpError as e:
+                    body = json_body({"error": str(e)})
+                    writer.write(encode_response(e.status, body, e.headers, False))
+                    await writer.drain()
+                    return
+                if request is None:
+                    return
+
+                status, body, headers = await loop.run_in_executor(
+                    self.executor, self.api.handle, request
+                )
+                keep_alive = request.keep_alive
+                writer.write(encode_response(status, body, headers, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            with suppress(Exception):
+                await writer.wait_closed()
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="number of database calls run at once",
+    )
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    # Initialize the database and apply the migrations
+    migrate()
+    server = ApiServer(DatabaseManager(), args.workers)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,3 @@
-import re
 from PySide6.QtWidgets import (
     QDialog,
     QVBoxLayout,
@@ -8,12 +7,20 @@ from PySide6.QtWidgets import (
     QMessageBox,
 )
 from location.database.schema import ClientRead
+from location.database.validation import (
+    is_valid_email,
+    is_valid_phone,
+    normalize_email,
+    normalize_phone,
+)
 
 
 class AddClientForm(QDialog):
-    def __init__(self, parent=None, client: ClientRead = None):
+    def __init__(self, parent=None, client: ClientRead = None, db_manager=None):
         super().__init__(parent)
         self.client = client
+        # Used to look for another client with the same email or phone
+        self.db_manager = db_manager
         self.setWindowTitle("Modifier un client" if client else "Ajouter un client")
 
         # Layout
@@ -60,13 +67,11 @@ class AddClientForm(QDialog):
 
     def validate_email(self, email: str) -> bool:
         """Validate email format"""
-        email_pattern = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
-        return re.match(email_pattern, email) is not None
+        return is_valid_email(normalize_email(email))
 
     def validate_phone(self, phone: str) -> bool:
         """Validate phone number format (10 digits: 5141112222)"""
-        phone_pattern = r"^\d{10}$"
-        return re.match(phone_pattern, phone) is not None
+        return is_valid_phone(normalize_phone(phone))
 
     def validate_and_accept(self):
         """Validate form data before accepting"""
@@ -116,13 +121,43 @@ class AddClientForm(QDialog):
             self.phone_input.setFocus()
             return
 
+        # Validate that no other client has the same email or phone
+        if not self.validate_unique(email, phone):
+            return
+
         # All validation passed
         self.accept()
 
+    def validate_unique(self, email: str, phone: str) -> bool:
+        if self.db_manager is None:
+            return True
+
+        client_id = self.client.id if self.client else None
+        duplicates = self.db_manager.find_client_duplicates(email, phone, client_id)
+        for duplicate in duplicates:
+            if duplicate.email.lower() == normalize_email(email):
+                QMessageBox.warning(
+                    self,
+                    "Validation Error",
+                    f"L'adresse email est déjà utilisée par {duplicate.name}.",
+                )
+                self.email_input.setFocus()
+                return False
+
+            QMessageBox.warning(
+                self,
+                "Validation Error",
+                f"Le numéro de téléphone est déjà utilisé par {duplicate.name}.",
+            )
+            self.phone_input.setFocus()
+            return False
+
+        return True
+
     def get_data(self):
         """Helper to return the data entered by the user"""
         return {
             "name": self.name_input.text().strip(),
-            "email": self.email_input.text().strip(),
-            "phone": self.phone_input.text().strip(),
+            "email": normalize_email(self.email_input.text()),
+            "phone": normalize_phone(self.phone_input.text()),
         }
@@ -34,6 +34,13 @@ class AddEquipmentForm(QDialog):
         self.cost_input.setDecimals(2)
         self.cost_input.setValue(0.00)
 
+        # Optional rates, 0 means no weekly or monthly rate
+        self.week_cost_label = QLabel("Coût par semaine ($):")
+        self.week_cost_input = self.create_optional_cost_input()
+
+        self.month_cost_label = QLabel("Coût par mois ($):")
+        self.month_cost_input = self.create_optional_cost_input()
+
         self.available_label = QLabel("Disponible:")
         self.available_input = QCheckBox()
         self.available_input.setChecked(True)
@@ -43,6 +50,10 @@ class AddEquipmentForm(QDialog):
         layout.addWidget(self.name_input)
         layout.addWidget(self.cost_label)
         layout.addWidget(self.cost_input)
+        layout.addWidget(self.week_cost_label)
+        layout.addWidget(self.week_cost_input)
+        layout.addWidget(self.month_cost_label)
+        layout.addWidget(self.month_cost_input)
         layout.addWidget(self.available_label)
         layout.addWidget(self.available_input)
 
@@ -50,6 +61,8 @@ class AddEquipmentForm(QDialog):
         if self.equipment:
             self.name_input.setText(self.equipment.name)
             self.cost_input.setValue(float(self.equipment.cost_per_day))
+            self.week_cost_input.setValue(float(self.equipment.cost_per_week or 0))
+            self.month_cost_input.setValue(float(self.equipment.cost_per_month or 0))
             self.available_input.setChecked(self.equipment.is_available)
 
         # Add Standard Buttons (Ok / Cancel)
@@ -64,6 +77,15 @@ class AddEquipmentForm(QDialog):
         layout.addWidget(self.buttons)
         self.setLayout(layout)
 
+    def create_optional_cost_input(self) -> QDoubleSpinBox:
+        cost_input = QDoubleSpinBox()
+        cost_input.setMinimum(0.00)
+        cost_input.setMaximum(999999.99)
+        cost_input.setDecimals(2)
+        cost_input.setSpecialValueText("Aucun")
+        cost_input.setValue(0.00)
+        return cost_input
+
     def validate_and_accept(self):
         """Validate form data before accepting"""
         name = self.name_input.text().strip()
@@ -93,5 +115,7 @@ class AddEquipmentForm(QDialog):
         return {
             "name": self.name_input.text().strip(),
             "cost_per_day": self.cost_input.value(),
+            "cost_per_week": self.week_cost_input.value() or None,
+            "cost_per_month": self.month_cost_input.value() or None,
             "is_available": self.available_input.isChecked(),
         }
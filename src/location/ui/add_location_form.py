@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, time
 from PySide6.QtWidgets import (
     QDialog,
     QVBoxLayout,
@@ -9,6 +9,8 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtCore import QDate
 from location.database.database_manager import DatabaseManager
+from location.database.pricing import PricingEngine
+from location.ui.workers import AsyncLoader
 
 
 class AddLocationForm(QDialog):
@@ -19,9 +21,11 @@ class AddLocationForm(QDialog):
         # Create the database manager
         self.db_manager = DatabaseManager()
 
-        # Get clients and equipments from the database
-        self.clients = self.db_manager.get_clients()
-        self.equipments = self.db_manager.get_available_equipments()
+        # Load the clients and the free equipments off the GUI thread
+        self.clients_loader = AsyncLoader(self)
+        self.clients_loader.batch_loaded.connect(self.set_clients)
+        self.equipments_loader = AsyncLoader(self)
+        self.equipments_loader.batch_loaded.connect(self.set_equipments)
 
         # Layout
         layout = QVBoxLayout()
@@ -29,21 +33,11 @@ class AddLocationForm(QDialog):
         # Add Input Fields
         self.client_label = QLabel("Client:")
         self.client_input = QComboBox()
-        for client in self.clients:
-            # Create a display text for the client
-            display_text = f"{client.name} ({client.email})"
-
-            # Add the client data to the combo box
-            self.client_input.addItem(display_text, client)
+        self.client_input.setPlaceholderText("Chargement...")
 
         self.equipment_label = QLabel("Equipement:")
         self.equipment_input = QComboBox()
-        for equipment in self.equipments:
-            # Create a display text for the equipment
-            display_text = f"{equipment.name} ({equipment.cost_per_day} $/jour)"
-
-            # Add the equipment data to the combo box
-            self.equipment_input.addItem(display_text, equipment)
+        self.equipment_input.setPlaceholderText("Chargement...")
 
         # Set up the date inputs
         self.start_date_label = QLabel("Date de début:")
@@ -73,13 +67,10 @@ class AddLocationForm(QDialog):
         self.total_cost_label.setStyleSheet("font-weight: bold; font-size: 14px;")
         layout.addWidget(self.total_cost_label)
 
-        # Connect signals to update cost calculation
+        # Connect signals to update the free equipments and the cost calculation
         self.equipment_input.currentIndexChanged.connect(self.update_total_cost)
-        self.start_date_input.dateChanged.connect(self.update_total_cost)
-        self.end_date_input.dateChanged.connect(self.update_total_cost)
-
-        # Initial cost calculation
-        self.update_total_cost()
+        self.start_date_input.dateChanged.connect(self.update_equipments)
+        self.end_date_input.dateChanged.connect(self.update_equipments)
 
         # Add Standard Buttons (Ok / Cancel)
         self.buttons = QDialogButtonBox(
@@ -93,6 +84,15 @@ class AddLocationForm(QDialog):
         layout.addWidget(self.buttons)
         self.setLayout(layout)
 
+        # The form can be accepted once a client and an equipment are selected
+        self.client_input.currentIndexChanged.connect(self.update_ok_button)
+        self.equipment_input.currentIndexChanged.connect(self.update_ok_button)
+        self.update_ok_button()
+
+        # Initial clients, equipments and cost calculation
+        self.clients_loader.load(self.db_manager.get_clients)
+        self.update_equipments()
+
     def get_data(self):
         """Helper to return the data entered by the user"""
         return {
@@ -102,6 +102,67 @@ class AddLocationForm(QDialog):
             "end_date": self.end_date_input.date().toPython(),
         }
 
+    def update_equipments(self):
+        """
+        Only list the equipments free for the selected dates
+        """
+        start_date = datetime.combine(self.start_date_input.date().toPython(), time())
+        end_date = datetime.combine(self.end_date_input.date().toPython(), time())
+
+        if end_date < start_date:
+            self.equipments_loader.cancel()
+            self.set_equipments([])
+            return
+
+        self.equipments_loader.load(
+            self.db_manager.get_free_equipments, start_date, end_date
+        )
+
+    def set_clients(self, clients: list):
+        self.client_input.setPlaceholderText("")
+        for client in clients:
+            # Create a display text for the client
+            display_text = f"{client.name} ({client.email})"
+
+            # Add the client data to the combo box
+            self.client_input.addItem(display_text, client)
+
+        if clients:
+            self.client_input.setCurrentIndex(0)
+
+    def set_equipments(self, equipments: list):
+        # Keep the selected equipment if it is still free
+        selected = self.equipment_input.currentData()
+
+        self.equipment_input.blockSignals(True)
+        self.equipment_input.clear()
+        self.equipment_input.setPlaceholderText("Aucun équipement disponible")
+
+        for equipment in equipments:
+            # Create a display text for the equipment
+            display_text = f"{equipment.name} ({equipment.cost_per_day} $/jour)"
+
+            # Add the equipment data to the combo box
+            self.equipment_input.addItem(display_text, equipment)
+
+            if selected is not None and equipment.id == selected.id:
+                self.equipment_input.setCurrentIndex(self.equipment_input.count() - 1)
+
+        # Select the first equipment by default
+        if equipments and self.equipment_input.currentIndex() == -1:
+            self.equipment_input.setCurrentIndex(0)
+        self.equipment_input.blockSignals(False)
+
+        self.update_total_cost()
+        self.update_ok_button()
+
+    def update_ok_button(self):
+        ok_button = self.buttons.button(QDialogButtonBox.StandardButton.Ok)
+        ok_button.setEnabled(
+            self.client_input.currentData() is not None
+            and self.equipment_input.currentData() is not None
+        )
+
     def update_total_cost(self):
         """Calculate and display the estimated total cost"""
         # Get the selected equipment
@@ -112,18 +173,14 @@ class AddLocationForm(QDialog):
             return
 
         # Get the dates
-        start_date = self.start_date_input.date().toPython()
-        end_date = self.end_date_input.date().toPython()
-
-        # Calculate number of days
-        duration = (end_date - start_date).days
-
-        # Make sure duration is at least 1 day
-        if duration < 1:
-            duration = 1
-
-        # Calculate total cost
-        total_cost = equipment.cost_per_day * duration
+        start_date = datetime.combine(self.start_date_input.date().toPython(), time())
+        end_date = datetime.combine(self.end_date_input.date().toPython(), time())
+
+        # Calculate the cost like it will be stored, with the weekly and
+        # monthly rates of the equipment
+        pricing = PricingEngine()
+        duration = pricing.rental_days(start_date, end_date)
+        total_cost = pricing.quote(equipment, start_date, end_date)["total_cost"]
 
         # Update the label
         self.total_cost_label.setText(
@@ -0,0 +1,178 @@
+from datetime import datetime, time, timedelta
+from PySide6.QtCore import QDate
+from PySide6.QtGui import QShowEvent
+from PySide6.QtWidgets import (
+    QComboBox,
+    QDateEdit,
+    QHBoxLayout,
+    QLabel,
+    QMessageBox,
+    QTabWidget,
+    QVBoxLayout,
+    QWidget,
+)
+from location.database.database_manager import DatabaseManager
+from location.database.instrumentation import query_profiler
+from location.ui.table_model import TableModel
+from location.ui.widgets import create_table_view
+from location.ui.workers import AsyncLoader
+
+
+class AnalyticsPage(QWidget):
+    """
+    Revenue, utilization and overdue reports over a period
+
+    The reports are computed off the GUI thread when the page is shown, and
+    again when the period changes or the database is modified.
+    """
+
+    def __init__(self, db_manager: DatabaseManager = None):
+        super().__init__()
+        layout = QVBoxLayout()
+
+        # Set up the period and the grouping of the revenue
+        self.filter_layout = QHBoxLayout()
+        today = QDate.currentDate()
+
+        self.start_date_input = QDateEdit()
+        self.start_date_input.setDate(QDate(today.year(), 1, 1))
+        self.start_date_input.setCalendarPopup(True)
+        self.start_date_input.setDisplayFormat("dd/MM/yyyy")
+
+        self.end_date_input = QDateEdit()
+        self.end_date_input.setDate(today)
+        self.end_date_input.setCalendarPopup(True)
+        self.end_date_input.setDisplayFormat("dd/MM/yyyy")
+
+        self.group_input = QComboBox()
+        self.group_input.addItem("Par équipement", "equipment")
+        self.group_input.addItem("Par client", "client")
+        self.group_input.addItem("Par mois", "month")
+
+        self.filter_layout.addWidget(QLabel("Du:"))
+        self.filter_layout.addWidget(self.start_date_input)
+        self.filter_layout.addWidget(QLabel("Au:"))
+        self.filter_layout.addWidget(self.end_date_input)
+        self.filter_layout.addWidget(self.group_input)
+        self.filter_layout.addStretch()
+
+        # Set up the summary of the period
+        self.summary_label = QLabel("Chargement...")
+        self.summary_label.setStyleSheet("font-weight: bold; font-size: 14px;")
+
+        # Set up one table per report
+        self.revenue_model = TableModel(
+            ["Index", "Libellé", "Locations", "Jours", "Revenu"],
+            {4: lambda value: f"{value:.2f} $"},
+        )
+        self.utilization_model = TableModel(
+            ["Index", "Équipement", "Jours loués", "Utilisation"],
+            {2: lambda value: f"{value:.1f}", 3: lambda value: f"{value:.1%}"},
+        )
+        self.overdue_model = TableModel(
+            ["Index", "Client", "En retard", "Plus ancienne fin"],
+            {3: lambda value: value.strftime("%Y-%m-%d")},
+        )
+
+        self.tabs = QTabWidget()
+        for model, title in (
+            (self.revenue_model, "Revenus"),
+            (self.utilization_model, "Utilisation"),
+            (self.overdue_model, "Retards"),
+        ):
+            self.tabs.addTab(create_table_view(model), title)
+
+        # Set up the layouts
+        layout.addLayout(self.filter_layout)
+        layout.addWidget(self.summary_label)
+        layout.addWidget(self.tabs)
+        self.setLayout(layout)
+
+        # Use the shared database manager and listen to its changes
+        self.db_manager = db_manager or DatabaseManager()
+        self.loaded = False
+        DatabaseManager.subscribe(self.on_database_change)
+
+        # Compute the reports off the GUI thread
+        self.loader = AsyncLoader(self)
+        self.loader.batch_loaded.connect(self.on_loaded)
+        self.loader.failed.connect(self.on_load_failed)
+
+        # Connect the inputs to the reload of the reports
+        self.start_date_input.dateChanged.connect(self.reload)
+        self.end_date_input.dateChanged.connect(self.reload)
+        self.group_input.currentIndexChanged.connect(self.reload)
+
+    def showEvent(self, event: QShowEvent):
+        """
+        Compute the reports if they are not up to date
+        """
+        with query_profiler.operation("AnalyticsPage.showEvent"):
+            if not self.loaded:
+                self.reload()
+
+            super().showEvent(event)
+
+    def reload(self):
+        # The end date is included in the period
+        start = datetime.combine(self.start_date_input.date().toPython(), time())
+        end = datetime.combine(self.end_date_input.date().toPython(), time())
+        end += timedelta(days=1)
+
+        if end <= start:
+            self.loader.cancel()
+            self.summary_label.setText("La date de fin est avant la date de début")
+            return
+
+        self.loaded = True
+        self.summary_label.setText("Chargement...")
+        self.loader.load(self.fetch_reports, self.group_input.currentData(), start, end)
+
+    def fetch_reports(self, group_by: str, start: datetime, end: datetime):
+        """
+        Compute the reports, runs in a worker thread
+        """
+        return (
+            self.db_manager.get_revenue(group_by, start, end),
+            self.db_manager.get_utilization(start, end),
+            self.db_manager.get_overdue(),
+        )
+
+    def on_loaded(self, reports: tuple):
+        revenue, utilization, overdue = reports
+
+        self.revenue_model.set_rows(
+            (r.key, r.label, r.rentals, r.days, r.revenue) for r in revenue
+        )
+        self.utilization_model.set_rows(
+            (u.id, u.name, u.rented_days, u.utilization) for u in utilization
+        )
+        self.overdue_model.set_rows(
+            (o.id, o.name, o.count, o.oldest_end_date) for o in overdue
+        )
+
+        total = sum(r.revenue for r in revenue)
+        rentals = sum(r.rentals for r in revenue)
+        overdue_count = sum(o.count for o in overdue)
+        self.summary_label.setText(
+            f"Revenu: {total:.2f} $ ({rentals} locations), "
+            f"{overdue_count} location{'s' if overdue_count > 1 else ''} en retard"
+        )
+
+    def on_load_failed(self, message: str):
+        self.summary_label.setText("")
+        QMessageBox.critical(
+            self,
+            "Erreur de chargement",
+            f"Les analyses n'ont pas pu être calculées: {message}",
+        )
+
+    def on_database_change(self, entity: str, ids: list[int], fields: set[str]):
+        """
+        Compute the reports again now if the page is shown, or the next time
+        it is shown
+        """
+        if self.isVisible():
+            self.reload()
+        else:
+            self.loaded = False
@@ -1,99 +1,52 @@
-from PySide6.QtWidgets import (
-    QAbstractItemView,
-    QTableWidget,
-    QVBoxLayout,
-    QWidget,
-    QHeaderView,
-    QPushButton,
-    QTableWidgetItem,
-    QHBoxLayout,
-    QMessageBox,
-    QLineEdit,
-)
-from PySide6.QtGui import QShowEvent
-from PySide6.QtCore import Qt
-from location.database.schema import ClientRead, ClientCreate
-from location.database.database_manager import DatabaseManager
-from location.ui.widgets import SortableItem
+from PySide6.QtWidgets import QFileDialog, QPushButton, QMessageBox
+from location.database.client_import import ClientImportReport
+from location.database.schema import ClientCreate
 from location.ui.add_client_form import AddClientForm
+from location.database.database_manager import DatabaseManager
+from location.ui.table_page import TablePage
+from location.ui.workers import AsyncLoader
 
 
-class ClientPage(QWidget):
-    def __init__(self):
-        super().__init__()
-        layout = QVBoxLayout()
+class ClientPage(TablePage):
+    entity = "clients"
+    headers = ["Index", "Nom", "Email", "Téléphone"]
+    search_placeholder = "Rechercher un client"
 
-        # Set up buttons
-        self.button_container = QWidget()
-        self.button_layout = QHBoxLayout()
-        self.button_container.setLayout(self.button_layout)
+    def __init__(self, db_manager: DatabaseManager = None):
+        super().__init__(db_manager)
 
+        # Set up buttons
         self.add_button = QPushButton("Nouveau client")
         self.edit_button = QPushButton("Modifier le client")
+        self.import_button = QPushButton("Importer des clients")
 
         self.button_layout.addWidget(self.add_button)
         self.button_layout.addWidget(self.edit_button)
-
-        # Set up the search bar
-        self.search_layout = QHBoxLayout()
-        self.search_bar = QLineEdit()
-        self.search_bar.setPlaceholderText("Rechercher un client")
-        self.search_bar.textChanged.connect(self.search_client)
-        self.search_layout.addWidget(self.search_bar)
-
-        # Set up the table
-        self.table = QTableWidget()
-        self.table.setSortingEnabled(True)
-        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
-        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
-        self.table.setColumnCount(4)
-        self.table.verticalHeader().setVisible(False)
-        self.table.setHorizontalHeaderLabels(["Index", "Nom", "Email", "Téléphone"])
-        header = self.table.horizontalHeader()
-        header.setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-
-        # Set up the layouts
-        layout.addWidget(self.button_container)
-        layout.addLayout(self.search_layout)
-        layout.addWidget(self.table)
-        self.setLayout(layout)
+        self.button_layout.addWidget(self.import_button)
 
         # Connect the buttons
         self.add_button.clicked.connect(self.show_add_client)
         self.edit_button.clicked.connect(self.show_edit_client)
+        self.import_button.clicked.connect(self.show_import)
+        self.disable_writes(self.add_button, self.edit_button, self.import_button)
 
-        # Create the database manager
-        self.db_manager = DatabaseManager()
-
-    def search_client(self, text: str):
-        """
-        Search for a client in the table
-        """
-        search_text = text.lower()
-
-        # Hide all rows that don't match the search text
-        for row in range(self.table.rowCount()):
-            match_found = False
-
-            item = self.table.item(row, 1)
-
-            if item and search_text in item.text().lower():
-                match_found = True
-
-            self.table.setRowHidden(row, not match_found)
+        # Import the clients off the GUI thread
+        self.import_loader = AsyncLoader(self)
+        self.import_loader.batch_loaded.connect(self.on_imported)
+        self.import_loader.failed.connect(self.on_import_failed)
 
     def show_add_client(self):
         """
         Show the add client form
         """
-        add_form = AddClientForm()
+        add_form = AddClientForm(db_manager=self.db_manager)
         if add_form.exec():
             data = add_form.get_data()
             self.create_client(data)
 
     def create_client(self, data: dict):
         """
-        Create a client in the database and refresh the table
+        Create a client in the database
         """
         try:
             # Create the client
@@ -104,7 +57,6 @@ class ClientPage(QWidget):
             )
 
             self.db_manager.create_client(client)
-            self.showEvent(QShowEvent())
         except Exception as e:
             QMessageBox.critical(
                 self,
@@ -114,7 +66,7 @@ class ClientPage(QWidget):
 
     def update_client(self, client_id: int, data: dict):
         """
-        Update a client in the database and refresh the table
+        Update a client in the database
         """
         try:
             # Update the client
@@ -125,7 +77,6 @@ class ClientPage(QWidget):
             )
 
             self.db_manager.update_client(client_id, client)
-            self.showEvent(QShowEvent())
         except Exception as e:
             QMessageBox.critical(
                 self,
@@ -137,8 +88,8 @@ class ClientPage(QWidget):
         """
         Show the edit client form
         """
-        selected_row = self.table.currentRow()
-        if selected_row == -1:
+        client_id = self.selected_id()
+        if client_id is None:
             QMessageBox.warning(
                 self,
                 "Aucune sélection",
@@ -146,9 +97,6 @@ class ClientPage(QWidget):
             )
             return
 
-        # Get the client ID from the selected row
-        client_id = self.table.item(selected_row, 0).data(Qt.ItemDataRole.UserRole)
-
         # Get the client data by ID
         client = self.db_manager.get_client_by_id(client_id)
 
@@ -161,52 +109,50 @@ class ClientPage(QWidget):
             return
 
         # Show the edit form with client data
-        edit_form = AddClientForm(client=client)
+        edit_form = AddClientForm(client=client, db_manager=self.db_manager)
         if edit_form.exec():
             data = edit_form.get_data()
             self.update_client(client_id, data)
 
-    def showEvent(self, event: QShowEvent):
-        """
-        When the page is shown, get the clients from the database and add them to the table
-        """
-
-        # Disable sorting while populating to avoid race conditions
-        self.table.setSortingEnabled(False)
-
-        # Clear the table
-        self.table.clearContents()
-        self.table.setRowCount(0)
-
-        # Get the clients
-        clients = self.db_manager.get_clients()
-
-        # Add the clients to the table
-        for client in clients:
-            self.add_item(client)
+    def search_ids(self, text: str):
+        return self.db_manager.search_clients(text)
 
-        # Re-enable sorting after all items are added
-        self.table.setSortingEnabled(True)
-
-        super().showEvent(event)
-
-    def add_item(self, data: ClientRead):
+    def show_import(self):
         """
-        Add a client to the table
+        Ask for a CSV file of clients and merge it in the background
         """
-        row_index = self.table.rowCount()
-        self.table.insertRow(row_index)
-
-        # Column 0
-        id_item = SortableItem(str(data.id))
-        id_item.setData(Qt.ItemDataRole.UserRole, data.id)
-        self.table.setItem(row_index, 0, id_item)
-
-        # Column 1
-        self.table.setItem(row_index, 1, QTableWidgetItem(data.name))
-
-        # Column 2
-        self.table.setItem(row_index, 2, QTableWidgetItem(data.email))
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Importer des clients", "", "CSV (*.csv)"
+        )
+        if not path:
+            return
 
-        # Column 3
-        self.table.setItem(row_index, 3, QTableWidgetItem(data.phone))
+        self.import_button.setEnabled(False)
+        self.loading_label.setText("Importation...")
+        self.loading_label.show()
+        # The changes are notified from the GUI thread, in on_imported
+        self.import_loader.load(self.db_manager.import_clients, path, notify=False)
+
+    def on_imported(self, report: ClientImportReport):
+        self.import_button.setEnabled(True)
+        self.loading_label.hide()
+        self.db_manager.notify_import(report)
+
+        message = (
+            f"{report.inserted} clients ajoutés, {report.updated} modifiés, "
+            f"{report.unchanged} inchangés.\n"
+            f"{report.duplicates} doublons dans le fichier, "
+            f"{report.conflicts} conflits, {report.rejected} lignes invalides."
+        )
+        if report.errors:
+            message += "\n\n" + "\n".join(report.errors)
+        QMessageBox.information(self, "Importation terminée", message)
+
+    def on_import_failed(self, message: str):
+        self.import_button.setEnabled(True)
+        self.loading_label.hide()
+        QMessageBox.critical(
+            self,
+            "Erreur d'importation",
+            f"Les clients n'ont pas pu être importés: {message}",
+        )
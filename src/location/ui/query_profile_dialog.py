@@ -0,0 +1,76 @@
+import json
+from PySide6.QtGui import QFontDatabase
+from PySide6.QtWidgets import (
+    QDialog,
+    QDialogButtonBox,
+    QFileDialog,
+    QLabel,
+    QPlainTextEdit,
+    QPushButton,
+    QVBoxLayout,
+)
+from location.database.instrumentation import query_profiler
+
+
+class QueryProfileDialog(QDialog):
+    """
+    Debug panel showing the report of the query profiler
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Profil des requêtes")
+        self.resize(1100, 700)
+
+        # Layout
+        layout = QVBoxLayout()
+
+        self.report_text = QPlainTextEdit()
+        self.report_text.setReadOnly(True)
+        self.report_text.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        self.report_text.setFont(
+            QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont)
+        )
+
+        if not query_profiler.enabled:
+            layout.addWidget(
+                QLabel(
+                    "Le profilage est désactivé, relancer l'application avec "
+                    "LOCATION_PROFILE_QUERIES=1."
+                )
+            )
+        layout.addWidget(self.report_text)
+
+        # Add the buttons
+        self.buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        self.refresh_button = QPushButton("Actualiser")
+        self.reset_button = QPushButton("Réinitialiser")
+        self.save_button = QPushButton("Enregistrer en JSON")
+        for button in (self.refresh_button, self.reset_button, self.save_button):
+            self.buttons.addButton(button, QDialogButtonBox.ButtonRole.ActionRole)
+
+        self.refresh_button.clicked.connect(self.refresh)
+        self.reset_button.clicked.connect(self.reset)
+        self.save_button.clicked.connect(self.save)
+        self.buttons.rejected.connect(self.reject)
+
+        layout.addWidget(self.buttons)
+        self.setLayout(layout)
+        self.refresh()
+
+    def refresh(self):
+        self.report_text.setPlainText(query_profiler.report())
+
+    def reset(self):
+        query_profiler.reset()
+        self.refresh()
+
+    def save(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Enregistrer le profil", "queries.json", "JSON (*.json)"
+        )
+        if not path:
+            return
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(query_profiler.to_dict(), f, indent=2)
@@ -0,0 +1,382 @@
+from array import array
+from datetime import datetime, timedelta
+from decimal import Decimal
+from functools import partial
+from itertools import compress, repeat
+from operator import is_, is_not
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def datetime_keys(values):
+    # Seconds since 1970, converted without a Python call per value
+    return map(timedelta.total_seconds, map(EPOCH.__rsub__, values))
+
+
+# Convert the values of a column to keys compared without calling Python:
+# dates to seconds and decimals to floats
+SORT_KEYS = {datetime: datetime_keys, Decimal: partial(map, float)}
+
+
+def sort_keys(values) -> list:
+    """
+    Return the sort keys of the values of a column, None stays None
+    """
+    kind = next((type(value) for value in values if value is not None), None)
+    to_keys = SORT_KEYS.get(kind)
+    if to_keys is None:
+        return list(values)
+    if None not in values:
+        return list(to_keys(values))
+
+    keys = iter(to_keys([value for value in values if value is not None]))
+    return [None if value is None else next(keys) for value in values]
+
+
+class TableModel(QAbstractTableModel):
+    """
+    A read-only table model backed by column arrays
+
+    Column 0 is always the id of the row and is stored in a compact integer
+    array. The other columns keep the raw values and are only formatted when
+    the view asks for a visible cell.
+
+    The model sorts and filters the rows itself. The columns are never
+    moved: the rows shown are a list of positions in the columns, ordered on
+    the typed keys of the sorted column and restricted to a set of ids, so
+    no Python code runs per comparison. Empty cells are sorted first, last
+    in descending order.
+    """
+
+    def __init__(self, headers: list[str], formatters: dict = None, parent=None):
+        super().__init__(parent)
+        self.headers = headers
+        self.formatters = formatters or {}
+        self.ids = array("q")
+        self.columns = [self.ids] + [[] for _ in headers[1:]]
+        self.row_of_id = {}
+
+        # Sorted column, its order and the keys of its values
+        self.sort_column = None
+        self.sort_order = Qt.SortOrder.AscendingOrder
+        self.keys = []
+
+        # Positions of all the rows in the sort order, and of the rows shown
+        self.visible_ids = None
+        self.order = []
+        self.rows = []
+        self.row_of_position = None
+
+        # Ids of the rows drawn with another background
+        self.highlighted_ids = set()
+        self.highlight_brush = None
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.headers)
+
+    def data(self, index: QModelIndex, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+
+        value = self.columns[index.column()][self.rows[index.row()]]
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if value is None:
+                return ""
+            formatter = self.formatters.get(index.column(), str)
+            return formatter(value)
+
+        if role == Qt.ItemDataRole.UserRole:
+            return value
+
+        if role == Qt.ItemDataRole.BackgroundRole and self.highlighted_ids:
+            if self.ids[self.rows[index.row()]] in self.highlighted_ids:
+                return self.highlight_brush
+
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if (
+            role == Qt.ItemDataRole.DisplayRole
+            and orientation == Qt.Orientation.Horizontal
+        ):
+            return self.headers[section]
+        return None
+
+    def set_rows(self, rows):
+        """
+        Replace the content of the model with the given rows
+
+        Each row is a tuple with one value per column, starting with the id.
+        """
+        self.beginResetModel()
+
+        self.ids = array("q")
+        self.columns = [self.ids] + [[] for _ in self.headers[1:]]
+        for row in rows:
+            self.ids.append(row[0])
+            for column, value in zip(self.columns[1:], row[1:]):
+                column.append(value)
+        self.row_of_id = {id: index for index, id in enumerate(self.ids)}
+
+        if self.sort_column is not None:
+            self.keys = sort_keys(self.columns[self.sort_column])
+        self.order = self.sorted_positions(range(len(self.ids)))
+        self.rows = self.shown(self.order)
+        self.row_of_position = None
+
+        self.endResetModel()
+
+    def append_rows(self, rows: list[tuple]):
+        """
+        Append a batch of rows to the model
+
+        Rows already in the model are skipped, they were loaded by a more
+        recent change.
+        """
+        rows = [row for row in rows if row[0] not in self.row_of_id]
+        if not rows:
+            return
+
+        # Transpose the rows to extend each column at once
+        first = len(self.ids)
+        for column, values in zip(self.columns, zip(*rows)):
+            column.extend(values)
+        self.row_of_id.update(zip(self.ids[first:], range(first, len(self.ids))))
+        if self.sort_column is not None:
+            self.keys.extend(sort_keys(self.columns[self.sort_column][first:]))
+
+        self.insert_positions(range(first, len(self.ids)))
+
+    def upsert_rows(self, rows):
+        """
+        Update the rows already in the model and append the new ones
+
+        Only the touched rows are signaled to the views, unless a change of
+        the sorted column moves them.
+        """
+        new = []
+        moved = False
+        for row in rows:
+            position = self.row_of_id.get(row[0])
+
+            if position is None:
+                # New row, stored at the end
+                self.row_of_id[row[0]] = len(self.ids)
+                new.append(len(self.ids))
+                for column, value in zip(self.columns, row):
+                    column.append(value)
+                if self.sort_column is not None:
+                    self.keys.extend(sort_keys([row[self.sort_column]]))
+                continue
+
+            # Existing row, replace its values
+            for column, value in zip(self.columns[1:], row[1:]):
+                column[position] = value
+            if self.sort_column is not None:
+                key = sort_keys([row[self.sort_column]])[0]
+                moved = moved or key != self.keys[position]
+                self.keys[position] = key
+
+            shown_row = self.shown_row(position)
+            if shown_row is not None:
+                self.dataChanged.emit(
+                    self.index(shown_row, 0),
+                    self.index(shown_row, len(self.headers) - 1),
+                )
+
+        if moved:
+            self.change_layout(self.sorted_positions(self.order + new))
+        elif new:
+            self.insert_positions(new)
+
+    def sort(self, column: int, order=Qt.SortOrder.AscendingOrder):
+        """
+        Sort the rows on the typed keys of a column
+        """
+        if column < 0 or column >= len(self.headers):
+            return
+        if column == self.sort_column and order == self.sort_order:
+            return
+
+        if column == self.sort_column:
+            # Only the direction changes, reverse the filled cells
+            self.sort_order = order
+            filled = len(self.order) - self.keys.count(None)
+            if order == Qt.SortOrder.DescendingOrder:
+                empty = self.order[: len(self.order) - filled]
+                positions = self.order[len(self.order) - filled :][::-1] + empty
+            else:
+                positions = self.order[filled:] + self.order[:filled][::-1]
+            self.change_layout(positions)
+            return
+
+        self.keys = sort_keys(self.columns[column])
+        self.sort_column = column
+        self.sort_order = order
+        self.change_layout(self.sorted_positions(range(len(self.ids))))
+
+    def set_visible_ids(self, ids):
+        """
+        Only show the rows with the given ids, or all of them if ids is None
+        """
+        self.visible_ids = None if ids is None else set(ids)
+        self.change_layout(self.order)
+
+    def sorted_positions(self, positions) -> list[int]:
+        """
+        Return positions of rows in the sort order, the comparisons all run
+        in C
+        """
+        if self.sort_column is None:
+            return list(positions)
+
+        keys = self.keys
+        is_filled = map(is_not, map(keys.__getitem__, positions), repeat(None))
+        filled = list(compress(positions, is_filled))
+        empty = []
+        if len(filled) < len(positions):
+            is_empty = map(is_, map(keys.__getitem__, positions), repeat(None))
+            empty = list(compress(positions, is_empty))
+
+        descending = self.sort_order == Qt.SortOrder.DescendingOrder
+        filled.sort(key=keys.__getitem__, reverse=descending)
+        return filled + empty if descending else empty + filled
+
+    def shown(self, positions: list[int]) -> list[int]:
+        """
+        Keep the positions of the rows with a visible id
+        """
+        if self.visible_ids is None:
+            return list(positions)
+
+        ids = map(self.ids.__getitem__, positions)
+        return list(compress(positions, map(self.visible_ids.__contains__, ids)))
+
+    def shown_row(self, position: int):
+        """
+        Return the row where a position is shown, or None if it is hidden
+        """
+        if self.row_of_position is None:
+            self.row_of_position = dict(zip(self.rows, range(len(self.rows))))
+        return self.row_of_position.get(position)
+
+    def insert_positions(self, positions):
+        """
+        Show new positions, inserted at the start or the end of the rows if
+        their keys allow it, otherwise the rows are sorted again
+        """
+        positions = self.sorted_positions(positions)
+        if self.order and not self.in_order(self.order[-1], positions[0]):
+            if self.in_order(positions[-1], self.order[0]):
+                self.order = positions + self.order
+                self.insert_shown(0, self.shown(positions))
+            else:
+                self.change_layout(self.sorted_positions(self.order + positions))
+            return
+
+        self.order += positions
+        self.insert_shown(len(self.rows), self.shown(positions))
+
+    def insert_shown(self, row: int, positions: list[int]):
+        if not positions:
+            return
+
+        self.beginInsertRows(QModelIndex(), row, row + len(positions) - 1)
+        self.rows[row:row] = positions
+        self.row_of_position = None
+        self.endInsertRows()
+
+    def in_order(self, first: int, second: int) -> bool:
+        """
+        Check that the row at a position can be shown before another one
+        """
+        if self.sort_column is None:
+            return True
+
+        a, b = self.keys[first], self.keys[second]
+        if self.sort_order == Qt.SortOrder.DescendingOrder:
+            a, b = b, a
+        if a is None or b is None:
+            return a is None
+        return a <= b
+
+    def change_layout(self, order: list[int]):
+        """
+        Show the rows in a new order and move the persistent indexes of the
+        views along, the indexes of the rows now hidden become invalid
+        """
+        self.layoutAboutToBeChanged.emit()
+
+        old_rows = self.rows
+        self.order = order
+        self.rows = self.shown(order)
+        self.row_of_position = None
+
+        # Only a few indexes are persistent, the selection and the current one
+        old_indexes = self.persistentIndexList()
+        if old_indexes:
+            new_rows = {}
+            for position in {old_rows[index.row()] for index in old_indexes}:
+                try:
+                    new_rows[position] = self.rows.index(position)
+                except ValueError:
+                    new_rows[position] = None
+
+            new_indexes = []
+            for index in old_indexes:
+                row = new_rows[old_rows[index.row()]]
+                if row is None:
+                    new_indexes.append(QModelIndex())
+                else:
+                    new_indexes.append(self.index(row, index.column()))
+            self.changePersistentIndexList(old_indexes, new_indexes)
+
+        self.layoutChanged.emit()
+
+    def highlight(self, ids, brush):
+        """
+        Draw the rows with the given ids on the brush, the others normally
+        """
+        self.highlighted_ids = set(ids)
+        self.highlight_brush = brush
+        if self.rows:
+            self.dataChanged.emit(
+                self.index(0, 0),
+                self.index(len(self.rows) - 1, len(self.headers) - 1),
+                [Qt.ItemDataRole.BackgroundRole],
+            )
+
+    def matching_ids(self, text: str) -> list[int]:
+        """
+        Return the ids of the rows with a cell showing the text, whatever its
+        case
+
+        Runs off the GUI thread on the columns as they are, a row appended
+        meanwhile may be missed.
+        """
+        text = text.casefold()
+        columns = self.columns
+        formatters = [self.formatters.get(i, str) for i in range(1, len(columns))]
+
+        ids = []
+        for row in zip(*columns):
+            for value, formatter in zip(row[1:], formatters):
+                if value is not None and text in formatter(value).casefold():
+                    ids.append(row[0])
+                    break
+        return ids
+
+    def id_at(self, row: int) -> int:
+        """
+        Return the id of the entity displayed at the given row
+        """
+        return self.ids[self.rows[row]]
@@ -0,0 +1,277 @@
+from functools import partial
+from PySide6.QtWidgets import (
+    QFileDialog,
+    QVBoxLayout,
+    QWidget,
+    QHBoxLayout,
+    QMessageBox,
+    QLabel,
+    QLineEdit,
+    QProgressBar,
+    QPushButton,
+)
+from PySide6.QtGui import QShowEvent
+from location.database.database_manager import DatabaseManager
+from location.database.instrumentation import query_profiler
+from location.database.export import FORMATS, Exporter
+from location.ui.table_model import TableModel
+from location.ui.widgets import create_search_timer, create_table_view
+from location.ui.workers import AsyncLoader
+
+# Number of rows fetched from the database at once
+LOAD_BATCH_SIZE = 2000
+
+# Above this number of changed rows, the table is loaded again instead
+RELOAD_THRESHOLD = 10_000
+
+# Filters of the export dialog, by extension
+EXPORT_FILTERS = {
+    ".csv": "CSV (*.csv)",
+    ".jsonl": "JSON Lines (*.jsonl)",
+    ".lcol": "Colonnes compressées (*.lcol)",
+}
+
+
+class TablePage(QWidget):
+    """
+    Base of the pages listing a table of the database
+
+    The rows are loaded in batches off the GUI thread the first time the page
+    is shown, then kept up to date with the changes of the DatabaseManager.
+    """
+
+    # Table of the database listed by the page
+    entity = ""
+    headers = []
+    formatters = {}
+    search_placeholder = ""
+
+    def __init__(self, db_manager: DatabaseManager = None):
+        super().__init__()
+        layout = QVBoxLayout()
+
+        # Set up the button bar, filled by the pages
+        self.button_container = QWidget()
+        self.button_layout = QHBoxLayout()
+        self.button_container.setLayout(self.button_layout)
+
+        # Set up the search bar
+        self.search_layout = QHBoxLayout()
+        self.search_bar = QLineEdit()
+        self.search_bar.setPlaceholderText(self.search_placeholder)
+        self.search_timer = create_search_timer(self, self.search)
+        self.search_bar.textChanged.connect(lambda: self.search_timer.start())
+        self.search_layout.addWidget(self.search_bar)
+
+        # Set up the loading state
+        self.loading_label = QLabel("Chargement...")
+        self.loading_label.hide()
+        self.search_layout.addWidget(self.loading_label)
+
+        # Set up the export, with its progress
+        self.export_progress = QProgressBar()
+        self.export_progress.hide()
+        self.export_button = QPushButton("Exporter")
+        self.export_button.clicked.connect(self.show_export)
+        self.search_layout.addWidget(self.export_progress)
+        self.search_layout.addWidget(self.export_button)
+
+        # Set up the table
+        self.model = TableModel(self.headers, self.formatters)
+        self.table = create_table_view(self.model)
+
+        # Set up the layouts
+        layout.addWidget(self.button_container)
+        layout.addLayout(self.search_layout)
+        layout.addWidget(self.table)
+        self.setLayout(layout)
+
+        # Use the shared database manager and listen to its changes
+        self.db_manager = db_manager or DatabaseManager()
+        self.loaded = False
+        DatabaseManager.subscribe(self.on_database_change)
+
+        # Load the rows and the search results off the GUI thread
+        self.loader = AsyncLoader(self)
+        self.loader.batch_loaded.connect(self.on_batch_loaded)
+        self.loader.finished.connect(self.on_loaded)
+        self.loader.failed.connect(self.on_load_failed)
+
+        self.search_loader = AsyncLoader(self)
+        self.search_loader.batch_loaded.connect(self.model.set_visible_ids)
+        self.search_loader.failed.connect(self.on_load_failed)
+
+        self.export_loader = AsyncLoader(self)
+        self.export_loader.batch_loaded.connect(self.on_export_progress)
+        self.export_loader.finished.connect(self.on_exported)
+        self.export_loader.failed.connect(self.on_export_failed)
+
+    def disable_writes(self, *buttons: QPushButton):
+        """
+        Disable the buttons writing to the database when it is opened
+        read-only
+        """
+        if not self.db_manager.read_only:
+            return
+
+        for button in buttons:
+            button.setEnabled(False)
+            button.setToolTip("Base de données en lecture seule")
+
+    def search_ids(self, text: str) -> list[int]:
+        """
+        Return the ids of the entities matching the search text
+
+        Searches the text shown in the table by default, the pages of a
+        table with a full text index override it.
+        """
+        return self.model.matching_ids(text)
+
+    def selected_id(self):
+        """
+        Return the id of the selected row, or None
+        """
+        selected_index = self.table.currentIndex()
+        if not selected_index.isValid():
+            return None
+
+        return self.model.id_at(selected_index.row())
+
+    def search(self):
+        """
+        Search in the database and only show the matching rows in the table
+        """
+        text = self.search_bar.text().strip()
+        if not text:
+            self.search_loader.cancel()
+            self.model.set_visible_ids(None)
+            return
+
+        self.search_loader.load(self.search_ids, text)
+
+    def showEvent(self, event: QShowEvent):
+        """
+        The first time the page is shown, start loading the rows
+        """
+        with query_profiler.operation(f"{type(self).__name__}.showEvent"):
+            if not self.loaded:
+                self.loaded = True
+                self.reload()
+
+            super().showEvent(event)
+
+    def reload(self):
+        """
+        Load all the rows of the table again
+        """
+        self.model.set_rows([])
+        self.loading_label.setText("Chargement...")
+        self.loading_label.show()
+        self.loader.load(self.fetch_rows)
+
+    def fetch_rows(self):
+        """
+        Yield the rows of the table by batches, runs in a worker thread
+        """
+        get_page = partial(self.db_manager.get_rows_page, self.entity)
+        yield from self.db_manager.iter_pages(get_page, batch_size=LOAD_BATCH_SIZE)
+
+    def on_batch_loaded(self, rows: list[tuple]):
+        self.model.append_rows(rows)
+        self.loading_label.setText(f"Chargement... ({self.model.rowCount()} lignes)")
+
+    def on_loaded(self):
+        self.loading_label.hide()
+
+    def on_load_failed(self, message: str):
+        self.loading_label.hide()
+        QMessageBox.critical(
+            self,
+            "Erreur de chargement",
+            f"Les données n'ont pas pu être chargées: {message}",
+        )
+
+    def show_export(self):
+        """
+        Ask for a file and export the table to it in the background
+        """
+        path, selected_filter = QFileDialog.getSaveFileName(
+            self,
+            "Exporter",
+            f"{self.entity}.csv",
+            ";;".join(EXPORT_FILTERS.values()),
+        )
+        if not path:
+            return
+
+        # Use the extension of the selected filter if the name has none
+        if not path.lower().endswith(tuple(FORMATS)):
+            for extension, name in EXPORT_FILTERS.items():
+                if name == selected_filter:
+                    path += extension
+
+        self.export(path)
+
+    def export(self, path: str):
+        self.export_button.setEnabled(False)
+        self.export_progress.setValue(0)
+        self.export_progress.setMaximum(0)
+        self.export_progress.show()
+        self.export_loader.load(self.fetch_export, path)
+
+    def fetch_export(self, path: str):
+        """
+        Export the table and yield the number of rows written and to write,
+        runs in a worker thread
+        """
+        total = self.db_manager.count_rows(self.entity)
+        for rows in Exporter(self.db_manager).iter_export(self.entity, path):
+            yield rows, max(total, rows)
+
+    def on_export_progress(self, progress: tuple):
+        rows, total = progress
+        self.export_progress.setMaximum(total)
+        self.export_progress.setValue(rows)
+
+    def on_exported(self):
+        self.export_progress.hide()
+        self.export_button.setEnabled(True)
+
+    def on_export_failed(self, message: str):
+        self.export_progress.hide()
+        self.export_button.setEnabled(True)
+        QMessageBox.critical(
+            self,
+            "Erreur d'exportation",
+            f"Les données n'ont pas pu être exportées: {message}",
+        )
+
+    def on_database_change(self, entity: str, ids: list[int], fields: set[str]):
+        """
+        Only reload the rows that were inserted or updated
+        """
+        if not self.loaded or entity != self.entity:
+            return
+
+        self.refresh_rows(ids)
+
+    def refresh_rows(self, ids: list[int]):
+        if not ids:
+            return
+
+        # A large import is faster to load again than to look up by ids
+        if len(ids) > RELOAD_THRESHOLD:
+            self.refresh_all()
+            return
+
+        rows = self.db_manager.get_rows_by_ids(self.entity, ids)
+        self.model.upsert_rows(rows)
+
+        # New or updated rows may now match the search
+        if self.model.visible_ids is not None:
+            self.search()
+
+    def refresh_all(self):
+        self.reload()
+        if self.model.visible_ids is not None:
+            self.search()
@@ -1,16 +1,32 @@
-from PySide6.QtWidgets import QTableWidgetItem
-from PySide6.QtCore import Qt
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import QAbstractItemView, QHeaderView, QTableView
+from location.ui.table_model import TableModel
 
+# Delay between the last keystroke and the search
+SEARCH_DELAY_MS = 250
 
-class SortableItem(QTableWidgetItem):
+
+def create_table_view(model: TableModel) -> QTableView:
     """
-    A table item that can be sorted as a number
+    Create a read-only, sortable table view for a list page
     """
+    table = QTableView()
+    table.setModel(model)
+    table.setSortingEnabled(True)
+    table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+    table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+    table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+    table.verticalHeader().setVisible(False)
+    table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+    return table
 
-    def __lt__(self, other):
-        role = Qt.ItemDataRole.UserRole
-
-        value1 = self.data(role)
-        value2 = other.data(role)
 
-        return (value1 or 0) < (value2 or 0)
+def create_search_timer(parent, callback) -> QTimer:
+    """
+    Create a timer that runs the search once the user stopped typing
+    """
+    timer = QTimer(parent)
+    timer.setSingleShot(True)
+    timer.setInterval(SEARCH_DELAY_MS)
+    timer.timeout.connect(callback)
+    return timer
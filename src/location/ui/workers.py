@@ -0,0 +1,128 @@
+import inspect
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+
+class WorkerSignals(QObject):
+    """
+    Signals of a QueryWorker, delivered in the GUI thread
+    """
+
+    batch = Signal(int, object)
+    finished = Signal(int)
+    failed = Signal(int, str)
+
+
+class QueryWorker(QRunnable):
+    """
+    Run a database call in a thread of the pool
+
+    If the call returns a generator, each item is sent as a batch as soon as
+    it is ready, otherwise the result is sent as a single batch.
+    """
+
+    def __init__(self, request_id: int, function, *args, **kwargs):
+        super().__init__()
+        self.request_id = request_id
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.cancelled = False
+        self.signals = WorkerSignals()
+
+    def run(self):
+        try:
+            result = self.function(*self.args, **self.kwargs)
+
+            if inspect.isgenerator(result):
+                for batch in result:
+                    # Stop fetching the next batches of a stale request
+                    if self.cancelled:
+                        result.close()
+                        return
+                    self.signals.batch.emit(self.request_id, batch)
+            elif not self.cancelled:
+                self.signals.batch.emit(self.request_id, result)
+
+            self.signals.finished.emit(self.request_id)
+        except RuntimeError as e:
+            # The signals are deleted when the application quits during a call
+            if "deleted" not in str(e):
+                self.emit_failed(e)
+        except Exception as e:
+            self.emit_failed(e)
+
+    def emit_failed(self, error: Exception):
+        try:
+            self.signals.failed.emit(self.request_id, str(error))
+        except RuntimeError:
+            pass
+
+
+class AsyncLoader(QObject):
+    """
+    Run database calls off the GUI thread, one at a time
+
+    Starting a new call cancels the previous one, the results of a cancelled
+    call are never delivered.
+    """
+
+    batch_loaded = Signal(object)
+    finished = Signal()
+    failed = Signal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.request_id = 0
+        self.worker = None
+        self.pool = QThreadPool.globalInstance()
+
+    def load(self, function, *args, **kwargs):
+        self.cancel()
+
+        self.worker = QueryWorker(self.request_id, function, *args, **kwargs)
+        self.worker.signals.batch.connect(self.on_batch)
+        self.worker.signals.finished.connect(self.on_finished)
+        self.worker.signals.failed.connect(self.on_failed)
+        self.pool.start(self.worker)
+
+    def cancel(self):
+        """
+        Forget the current call, its remaining batches are not fetched
+        """
+        if self.worker is not None:
+            self.worker.cancelled = True
+            self.worker = None
+        self.request_id += 1
+
+    def is_loading(self) -> bool:
+        return self.worker is not None
+
+    def on_batch(self, request_id: int, batch):
+        if request_id == self.request_id:
+            self.batch_loaded.emit(batch)
+
+    def on_finished(self, request_id: int):
+        if request_id == self.request_id:
+            self.worker = None
+            self.finished.emit()
+
+    def on_failed(self, request_id: int, message: str):
+        if request_id == self.request_id:
+            self.worker = None
+            self.failed.emit(message)
+
+
+class ThreadSignal(QObject):
+    """
+    Callback for a listener called from any thread, emits a signal
+    delivered in the thread of the receivers
+
+        signal = ThreadSignal()
+        signal.emitted.connect(self.update_badge)
+        tracker.subscribe(signal)
+    """
+
+    emitted = Signal()
+
+    def __call__(self):
+        self.emitted.emit()
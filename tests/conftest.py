@@ -0,0 +1,75 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+# The engine is created when the database package is imported, point it to a
+# database of the tests first
+TEST_DIR = tempfile.mkdtemp(prefix="location-tests-")
+os.environ["LOCATION_DATABASE_URL"] = "sqlite:///" + os.path.join(TEST_DIR, "test.db")
+
+import pytest
+from location.database.database import Base, engine
+from location.database.database_manager import DatabaseManager
+from location.database.migrations import migrate
+from location.database.schema import ClientCreate, EquipmentCreate, LocationCreate
+
+
+@pytest.fixture
+def db() -> DatabaseManager:
+    """
+    Manager of an empty database with the schema up to date
+    """
+    migrate()
+    with engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            # The branch id of the database is kept
+            if table.name != "sync_node":
+                connection.execute(table.delete())
+
+    DatabaseManager.cache.clear()
+    return DatabaseManager()
+
+
+@pytest.fixture
+def client_id(db) -> int:
+    return db.create_client(
+        ClientCreate(name="Marc Dubois", email="marc@email.fr", phone="5141112201")
+    )
+
+
+@pytest.fixture
+def make_equipment(db):
+    def make_equipment(name="Perceuse", daily="10.00", weekly=None, monthly=None):
+        return db.create_equipment(
+            EquipmentCreate(
+                name=name,
+                cost_per_day=Decimal(daily),
+                cost_per_week=weekly and Decimal(weekly),
+                cost_per_month=monthly and Decimal(monthly),
+                is_available=True,
+            )
+        )
+
+    return make_equipment
+
+
+@pytest.fixture
+def make_location(db, client_id):
+    def make_location(equipment_id: int, start_days: int, end_days: int):
+        """
+        Location of the equipment starting and ending a number of days from
+        today
+        """
+        today = datetime.combine(datetime.now().date(), datetime.min.time())
+        return db.create_location(
+            LocationCreate(
+                id_client=client_id,
+                id_equipment=equipment_id,
+                start_date=today + timedelta(days=start_days),
+                end_date=today + timedelta(days=end_days),
+                is_returned=False,
+            )
+        )
+
+    return make_location
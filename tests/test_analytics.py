@@ -0,0 +1,78 @@
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+
+def day(days: int) -> datetime:
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    return today + timedelta(days=days)
+
+
+def test_revenue_per_equipment(db, make_equipment, make_location):
+    drill_id = make_equipment("Perceuse", daily="10.00")
+    saw_id = make_equipment("Scie", daily="20.00")
+    # Newest first, a location not returned keeps its equipment busy after
+    # its end date
+    make_location(drill_id, -20, -18)
+    make_location(drill_id, -30, -27)
+    make_location(saw_id, -10, -9)
+    # Started before the period
+    make_location(saw_id, -60, -50)
+
+    rows = db.get_revenue("equipment", day(-40), day(0))
+
+    assert [(r.label, r.rentals, r.days, r.revenue) for r in rows] == [
+        ("Perceuse", 2, 5, Decimal("50.00")),
+        ("Scie", 1, 1, Decimal("20.00")),
+    ]
+
+
+def test_revenue_per_month_and_client(db, make_equipment, make_location):
+    equipment_id = make_equipment(daily="10.00")
+    make_location(equipment_id, -3, -1)
+
+    month = db.get_revenue("month")
+    assert [(r.label, r.revenue) for r in month] == [
+        (day(-3).strftime("%Y-%m"), Decimal("20.00"))
+    ]
+    assert [r.label for r in db.get_revenue("client")] == ["Marc Dubois"]
+
+    with pytest.raises(ValueError):
+        db.get_revenue("week")
+
+
+def test_utilization_clips_the_locations(db, make_equipment, make_location):
+    busy_id = make_equipment("Perceuse")
+    free_id = make_equipment("Scie")
+    # 5 of its 10 days in the period
+    make_location(busy_id, -15, -5)
+    db.return_locations_before(day(0))
+
+    rows = {r.id: r for r in db.get_utilization(day(-10), day(0))}
+
+    assert rows[busy_id].rented_days == pytest.approx(5)
+    assert rows[busy_id].utilization == pytest.approx(0.5)
+    assert rows[free_id].utilization == 0
+
+
+def test_overdue_location_is_rented_until_now(db, make_equipment, make_location):
+    equipment_id = make_equipment()
+    make_location(equipment_id, -10, -8)
+
+    rows = {r.id: r for r in db.get_utilization(day(-10), day(10))}
+
+    # From 10 days ago until now, of a period of 20 days
+    elapsed = (datetime.now() - day(-10)).total_seconds() / 86400
+    assert rows[equipment_id].rented_days == pytest.approx(elapsed, abs=0.01)
+
+
+def test_overdue_per_client(db, client_id, make_equipment, make_location):
+    make_location(make_equipment(), -10, -8)
+    make_location(make_equipment("Scie"), -6, -2)
+    make_location(make_equipment("Marteau"), -2, 3)
+
+    rows = db.get_overdue()
+
+    assert [(r.id, r.count, r.oldest_end_date) for r in rows] == [
+        (client_id, 2, day(-8))
+    ]
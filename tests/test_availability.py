@@ -0,0 +1,76 @@
+import pytest
+from datetime import datetime, timedelta
+from location.database.availability import OverlapError
+from location.database.schema import EquipmentCreate
+
+
+def day(days: int) -> datetime:
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    return today + timedelta(days=days)
+
+
+def free_ids(db, start: int, end: int):
+    return [e.id for e in db.get_free_equipments(day(start), day(end))]
+
+
+def test_overlapping_location_is_refused(db, make_equipment, make_location):
+    equipment_id = make_equipment()
+    make_location(equipment_id, 2, 5)
+
+    # Dates are inclusive
+    for start, end in [(0, 2), (3, 4), (5, 8), (0, 9)]:
+        with pytest.raises(OverlapError):
+            make_location(equipment_id, start, end)
+
+    make_location(equipment_id, 6, 8)
+    make_location(equipment_id, 0, 1)
+
+
+def test_rented_equipment_can_be_booked_for_later(db, make_equipment, make_location):
+    equipment_id = make_equipment()
+    make_location(equipment_id, -1, 3)
+
+    assert equipment_id not in free_ids(db, 0, 1)
+    assert equipment_id in free_ids(db, 4, 6)
+
+    make_location(equipment_id, 4, 6)
+
+
+def test_overdue_location_keeps_the_equipment_busy(db, make_equipment, make_location):
+    equipment_id = make_equipment()
+    make_location(equipment_id, -5, -2)
+
+    assert equipment_id not in free_ids(db, 10, 12)
+    with pytest.raises(OverlapError):
+        make_location(equipment_id, 10, 12)
+
+
+def test_equipment_out_of_service_is_not_free(db, make_equipment, make_location):
+    equipment_id = make_equipment()
+    equipment = db.get_equipment_by_id(equipment_id)
+    data = EquipmentCreate.model_validate(
+        equipment.model_dump() | {"is_available": False}
+    )
+    db.update_equipment(equipment_id, data)
+
+    assert equipment_id not in free_ids(db, 1, 3)
+    with pytest.raises(OverlapError):
+        make_location(equipment_id, 1, 3)
+
+
+def test_locations_leave_the_flag_of_the_staff(db, make_equipment, make_location):
+    equipment_id = make_equipment()
+    location_id = make_location(equipment_id, -1, 3)
+    assert db.get_equipment_by_id(equipment_id).is_available
+
+    db.return_location(location_id)
+    assert db.get_equipment_by_id(equipment_id).is_available
+
+
+def test_location_ending_today_is_not_overdue(db, make_equipment, make_location):
+    equipment_id = make_equipment()
+    make_location(equipment_id, -2, 0)
+
+    assert equipment_id not in free_ids(db, 0, 0)
+    assert equipment_id in free_ids(db, 1, 3)
+    make_location(equipment_id, 1, 3)
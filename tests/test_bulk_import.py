@@ -0,0 +1,82 @@
+from decimal import Decimal
+from location.database.bulk_import import BulkImporter
+from location.database.models import Equipment
+from location.database.schema import EquipmentCreate
+
+
+def write_csv(tmp_path, name: str, content: str, encoding="utf-8"):
+    path = tmp_path / name
+    path.write_text(content, encoding=encoding)
+    return str(path)
+
+
+def test_import_reads_utf8_with_a_bom(db, tmp_path):
+    # Excel saves the CSV files in UTF-8 with a byte order mark
+    content = "name,cost_per_day,is_available\nÉlévateur,45.00,True\n"
+    path = write_csv(tmp_path, "equipments.csv", content, encoding="utf-8-sig")
+
+    report = BulkImporter().import_csv(path, Equipment, EquipmentCreate)
+
+    assert (report.inserted, report.rejected) == (1, 0)
+    assert [e.name for e in db.get_equipments()] == ["Élévateur"]
+
+
+def test_import_reports_the_rejected_rows_of_each_chunk(db, tmp_path):
+    content = """name,cost_per_day,is_available
+Perceuse,15.50,True
+Scie,abc,True
+Marteau,8.00,True
+Ponceuse,12.00,True
+Niveau,4.00,peut-être
+Échelle,9.00,False
+"""
+    path = write_csv(tmp_path, "equipments.csv", content)
+
+    # Chunks of two rows, the invalid rows are in the first and third ones
+    report = BulkImporter(chunk_size=2).import_csv(path, Equipment, EquipmentCreate)
+
+    assert (report.inserted, report.rejected) == (4, 2)
+    assert [error.split(":")[0] for error in report.errors] == ["line 3", "line 6"]
+    names = [e.name for e in db.get_equipments()]
+    assert names == ["Perceuse", "Marteau", "Ponceuse", "Échelle"]
+
+
+def test_import_keeps_the_first_errors(db, tmp_path):
+    rows = "".join(f"Outil {i},gratuit,True\n" for i in range(30))
+    path = write_csv(
+        tmp_path, "equipments.csv", "name,cost_per_day,is_available\n" + rows
+    )
+
+    report = BulkImporter(chunk_size=7).import_csv(path, Equipment, EquipmentCreate)
+
+    assert (report.inserted, report.rejected) == (0, 30)
+    assert len(report.errors) == BulkImporter.max_errors
+    assert report.errors[-1].startswith(f"line {BulkImporter.max_errors + 1}:")
+
+
+def test_import_folder_prices_the_locations(db, tmp_path):
+    write_csv(
+        tmp_path, "clients.csv", "name,email,phone\nMarc,marc@email.fr,5141112201\n"
+    )
+    write_csv(
+        tmp_path,
+        "equipments.csv",
+        "name,cost_per_day,is_available\nPerceuse,10.00,True\n",
+    )
+    write_csv(
+        tmp_path,
+        "locations.csv",
+        "id_client,id_equipment,start_date,end_date,is_returned\n"
+        "1,1,2025-12-10,2025-12-14,False\n"
+        "1,1,2025-12-20,2025-12-22,True\n",
+    )
+
+    reports = BulkImporter().import_folder(str(tmp_path))
+
+    assert [(r.table, r.inserted) for r in reports] == [
+        ("clients", 1),
+        ("equipments", 1),
+        ("locations", 2),
+    ]
+    costs = [location.total_cost for location in db.get_locations()]
+    assert costs == [Decimal("40.00"), Decimal("20.00")]
@@ -0,0 +1,57 @@
+from sqlalchemy import create_engine, text
+from location.database.cache import LRUCache
+from location.database.database import engine
+from location.database.schema import ClientCreate
+
+
+def test_writes_of_other_processes_drop_the_cache(db, client_id, monkeypatch):
+    monkeypatch.setattr(db.cache, "version_interval", 0)
+    assert db.get_client_by_id(client_id).name == "Marc Dubois"
+
+    # Another process has its own engine, it doesn't notify the manager
+    other = create_engine(engine.url)
+    with other.begin() as connection:
+        connection.execute(
+            text("UPDATE clients SET name = 'Marc Roy' WHERE id = :id"),
+            {"id": client_id},
+        )
+    other.dispose()
+
+    assert db.get_client_by_id(client_id).name == "Marc Roy"
+
+
+def test_cache_is_kept_without_writes(db, client_id):
+    db.get_client_by_id(client_id)
+    hits = db.cache_stats()["hits"]
+
+    db.get_client_by_id(client_id)
+
+    assert db.cache_stats()["hits"] == hits + 1
+
+
+def test_writes_of_the_manager_only_drop_their_entries(
+    db, client_id, make_equipment, monkeypatch
+):
+    monkeypatch.setattr(db.cache, "version_interval", 0)
+    equipment_id = make_equipment()
+    db.get_equipment_by_id(equipment_id)
+    client = db.get_client_by_id(client_id)
+
+    data = ClientCreate.model_validate(client.model_dump() | {"name": "Marc Roy"})
+    db.update_client(client_id, data)
+    hits = db.cache_stats()["hits"]
+
+    assert db.get_client_by_id(client_id).name == "Marc Roy"
+    db.get_equipment_by_id(equipment_id)
+    assert db.cache_stats()["hits"] == hits + 1
+
+
+def test_version_is_read_once_per_interval():
+    versions = []
+    cache = LRUCache(version=lambda: versions.append(1) or 1, version_interval=60)
+
+    for _ in range(3):
+        cache.get_or_load(("clients", 1), lambda: "Marc")
+
+    assert len(versions) == 1
+    assert cache.stats()["hits"] == 2
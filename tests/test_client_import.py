@@ -0,0 +1,52 @@
+from location.database.schema import ClientCreate
+
+CSV = """name,email,phone
+Marc Dubois,MARC@email.fr,5141112201
+Julie Tremblay,julie@email.fr,514-222-3302
+Julie T.,julie@email.fr,5149999999
+Sans Email,,5143334403
+Luc Martin,luc@email.fr,5144445504
+"""
+
+
+def write_csv(tmp_path, content: str):
+    path = tmp_path / "clients.csv"
+    path.write_text(content, encoding="utf-8")
+    return str(path)
+
+
+def test_import_merges_the_clients(db, client_id, tmp_path):
+    luc_id = db.create_client(
+        ClientCreate(name="Luc M.", email="luc@email.fr", phone="5144445504")
+    )
+
+    report = db.import_clients(write_csv(tmp_path, CSV))
+
+    assert (report.inserted, report.updated, report.unchanged) == (1, 1, 1)
+    assert (report.duplicates, report.rejected) == (1, 1)
+    assert report.updated_ids == [luc_id]
+    assert db.get_client_by_id(luc_id).name == "Luc Martin"
+
+    julie = db.get_client_by_id(report.inserted_ids[0])
+    assert (julie.email, julie.phone) == ("julie@email.fr", "5142223302")
+
+
+def test_update_frees_an_email_for_an_insert(db, client_id, tmp_path):
+    content = """name,email,phone
+Marc Dubois,marc.dubois@email.fr,5141112201
+Nouveau Client,marc@email.fr,5147778807
+"""
+    report = db.import_clients(write_csv(tmp_path, content))
+
+    assert (report.inserted, report.updated) == (1, 1)
+    assert db.get_client_by_id(client_id).email == "marc.dubois@email.fr"
+    assert db.get_client_by_id(report.inserted_ids[0]).email == "marc@email.fr"
+
+
+def test_skip_existing_leaves_the_clients(db, client_id, tmp_path):
+    content = "name,email,phone\nMarc Roy,marc@email.fr,5141112201\n"
+
+    report = db.import_clients(write_csv(tmp_path, content), update_existing=False)
+
+    assert (report.inserted, report.updated, report.unchanged) == (0, 0, 1)
+    assert db.get_client_by_id(client_id).name == "Marc Dubois"
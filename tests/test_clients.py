@@ -0,0 +1,38 @@
+import pytest
+from location.database.client_import import DuplicateClientError
+from location.database.schema import ClientCreate
+
+
+def client(name="Julie Tremblay", email="julie@email.fr", phone="5142223302"):
+    return ClientCreate(name=name, email=email, phone=phone)
+
+
+def test_duplicate_email_or_phone_is_refused(db, client_id):
+    with pytest.raises(DuplicateClientError):
+        db.create_client(client(email="MARC@email.fr"))
+    with pytest.raises(DuplicateClientError):
+        db.create_client(client(phone="+1 (514) 111-2201"))
+
+    assert [c.id for c in db.get_clients()] == [client_id]
+
+
+def test_update_to_a_duplicate_is_refused(db, client_id):
+    other_id = db.create_client(client())
+
+    with pytest.raises(DuplicateClientError):
+        db.update_client(other_id, client(email="marc@email.fr"))
+
+    assert db.get_client_by_id(other_id).email == "julie@email.fr"
+
+    # Its own email and phone are not duplicates
+    db.update_client(other_id, client(name="Julie Roy"))
+    assert db.get_client_by_id(other_id).name == "Julie Roy"
+
+
+def test_duplicates_in_the_same_transaction_are_refused(db):
+    with pytest.raises(DuplicateClientError):
+        with db.transaction():
+            db.create_client(client())
+            db.create_client(client(name="Julie T."))
+
+    assert db.get_clients() == []
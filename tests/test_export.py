@@ -0,0 +1,71 @@
+import csv
+import json
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from itertools import chain
+from location.database.export import Exporter, read_columnar
+from location.database.schema import ClientCreate
+
+
+@pytest.fixture
+def rows(db, client_id, make_equipment, make_location):
+    db.create_client(
+        ClientCreate(name="Élise Côté", email="elise@email.fr", phone="5145556605")
+    )
+    drill_id = make_equipment("Perceuse", daily="10.00", weekly="55.50")
+    make_equipment("Scie ronde", daily="7.25", monthly="120.00")
+    make_location(drill_id, 1, 9)
+    make_location(make_equipment("Marteau"), -2, 3)
+    return db
+
+
+def all_rows(db, entity: str) -> list[tuple]:
+    pages = db.iter_pages(lambda **kwargs: db.get_rows_page(entity, **kwargs))
+    return [tuple(row) for row in chain.from_iterable(pages)]
+
+
+@pytest.mark.parametrize("entity", ["clients", "equipments", "locations"])
+def test_columnar_export_round_trip(rows, entity, tmp_path):
+    path = str(tmp_path / f"{entity}.lcol")
+
+    # Batches of 2 rows, several groups in the file
+    report = Exporter(rows, batch_size=2).export(entity, path)
+
+    exported = list(chain.from_iterable(read_columnar(path)))
+    assert report.rows == len(exported)
+    assert exported == all_rows(rows, entity)
+
+
+def test_columnar_keeps_the_types(rows, tmp_path):
+    path = str(tmp_path / "equipments.lcol")
+    Exporter(rows).export("equipments", path)
+
+    saw = list(chain.from_iterable(read_columnar(path)))[1]
+
+    assert saw[1] == "Scie ronde"
+    assert saw[2] is True
+    assert saw[3:] == (Decimal("7.25"), None, Decimal("120.00"))
+
+
+def test_columnar_export_of_an_empty_table(db, tmp_path):
+    path = str(tmp_path / "locations.lcol")
+
+    assert Exporter(db).export("locations", path).rows == 0
+    assert list(read_columnar(path)) == []
+
+
+def test_text_exports(rows, tmp_path):
+    exporter = Exporter(rows)
+    exporter.export("locations", str(tmp_path / "locations.csv"))
+    exporter.export("locations", str(tmp_path / "locations.jsonl"))
+
+    with open(tmp_path / "locations.csv", newline="", encoding="utf-8") as f:
+        csv_rows = list(csv.DictReader(f))
+    with open(tmp_path / "locations.jsonl", encoding="utf-8") as f:
+        json_rows = [json.loads(line) for line in f]
+
+    assert len(csv_rows) == len(json_rows) == 2
+    assert csv_rows[0]["total_cost"] == json_rows[0]["total_cost"] == "65.50"
+    start = datetime.fromisoformat(json_rows[0]["start_date"])
+    assert csv_rows[0]["start_date"] == start.isoformat()
@@ -0,0 +1,145 @@
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from location.database.database import Base, create_db_engine
+from location.database.migrations import MIGRATIONS, migrate
+
+# Tables of the first version of the application, before the migrations
+BASELINE_SCHEMA = [
+    """
+    CREATE TABLE clients (
+        id INTEGER NOT NULL,
+        name VARCHAR,
+        email VARCHAR,
+        phone VARCHAR,
+        PRIMARY KEY (id),
+        UNIQUE (email),
+        UNIQUE (phone)
+    )
+    """,
+    """
+    CREATE TABLE equipments (
+        id INTEGER NOT NULL,
+        name VARCHAR,
+        cost_per_day DECIMAL(10, 2),
+        is_available BOOLEAN,
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE locations (
+        id INTEGER NOT NULL,
+        id_client INTEGER,
+        id_equipment INTEGER,
+        start_date DATETIME,
+        end_date DATETIME,
+        is_returned BOOLEAN,
+        PRIMARY KEY (id),
+        FOREIGN KEY(id_client) REFERENCES clients (id),
+        FOREIGN KEY(id_equipment) REFERENCES equipments (id)
+    )
+    """,
+]
+
+
+def day(days: int) -> str:
+    """
+    Date a number of days from today, as stored by SQLAlchemy
+    """
+    date = datetime.combine(datetime.now().date(), datetime.min.time())
+    return str(date + timedelta(days=days))
+
+
+@pytest.fixture
+def baseline(tmp_path):
+    """
+    Engine of a database of the first version, with a few rows
+    """
+    bind = create_db_engine("sqlite:///" + str(tmp_path / "baseline.db"))
+    # The equipment 2 is out only because it is rented, the 3 is out of
+    # service
+    with bind.begin() as connection:
+        for ddl in BASELINE_SCHEMA:
+            connection.exec_driver_sql(ddl)
+        connection.exec_driver_sql(
+            "INSERT INTO clients VALUES "
+            "(1, 'Marc Dubois', 'marc@email.fr', '5141112201'), "
+            "(2, 'Julie Tremblay', 'julie@email.fr', '5142223302')"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO equipments VALUES (1, 'Perceuse', 10.00, 1), "
+            "(2, 'Élévateur', 25.00, 0), (3, 'Scie', 7.00, 0)"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO locations VALUES (1, 1, 1, ?, ?, 1), (2, 2, 2, ?, ?, 0)",
+            (day(-10), day(-7), day(-1), day(2)),
+        )
+    yield bind
+    bind.dispose()
+
+
+def scalars(bind, sql: str) -> list:
+    with bind.connect() as connection:
+        return connection.exec_driver_sql(sql).scalars().all()
+
+
+def test_migrate_baseline_database(baseline):
+    migrate(baseline)
+
+    assert scalars(baseline, "PRAGMA user_version") == [len(MIGRATIONS)]
+    for table in ("clients", "equipments", "locations"):
+        gids = scalars(baseline, f"SELECT gid FROM {table}")
+        assert None not in gids
+        assert len(set(gids)) == len(gids)
+
+    indexes = scalars(baseline, "SELECT name FROM sqlite_master WHERE type = 'index'")
+    assert {"ux_clients_gid", "ux_equipments_gid", "ux_locations_gid"} <= set(indexes)
+
+    # Up to date, nothing left to apply
+    migrate(baseline)
+    assert scalars(baseline, "PRAGMA user_version") == [len(MIGRATIONS)]
+
+
+def test_migrate_applies_every_migration(baseline, tmp_path):
+    assert scalars(baseline, "PRAGMA user_version") == [0]
+
+    migrate(baseline)
+
+    # Same tables, columns and indexes as a new database
+    new = create_db_engine("sqlite:///" + str(tmp_path / "new.db"))
+    migrate(new)
+    schema = """
+        SELECT m.name, p.name FROM sqlite_master m, pragma_table_info(m.name) p
+        WHERE m.type = 'table'
+        UNION ALL SELECT name, type FROM sqlite_master WHERE type != 'table'
+        ORDER BY 1, 2
+    """
+    with baseline.connect() as old_db, new.connect() as new_db:
+        assert (
+            old_db.exec_driver_sql(schema).all() == new_db.exec_driver_sql(schema).all()
+        )
+    new.dispose()
+    assert set(Base.metadata.tables) <= set(
+        scalars(baseline, "SELECT name FROM sqlite_master WHERE type = 'table'")
+    )
+
+
+def test_migrate_prices_the_locations(baseline):
+    migrate(baseline)
+
+    with baseline.connect() as connection:
+        costs = connection.exec_driver_sql(
+            "SELECT daily_rate, total_cost, late_fee FROM locations ORDER BY id"
+        ).all()
+    assert [tuple(Decimal(str(value)) for value in row) for row in costs] == [
+        (Decimal("10"), Decimal("30"), Decimal("0")),
+        (Decimal("25"), Decimal("75"), Decimal("0")),
+    ]
+
+
+def test_migrate_keeps_is_available_for_the_staff(baseline):
+    migrate(baseline)
+
+    # The rented equipment is in service again, the other one stays out
+    flags = scalars(baseline, "SELECT is_available FROM equipments ORDER BY id")
+    assert flags == [1, 1, 0]
@@ -0,0 +1,56 @@
+import pytest
+from location.database.overdue import OverdueTracker
+
+
+@pytest.fixture
+def tracker(db):
+    """
+    Tracker kept up to date by the writes of the manager, without its thread
+    """
+    tracker = OverdueTracker()
+    db.subscribe(tracker.on_database_change)
+    yield tracker
+    db.unsubscribe(tracker.on_database_change)
+
+
+def test_scan_finds_the_locations_ended_before_today(
+    db, tracker, make_equipment, make_location
+):
+    late_id = make_location(make_equipment("Perceuse"), -5, -1)
+    make_location(make_equipment("Scie"), -3, 0)
+    make_location(make_equipment("Marteau"), 1, 4)
+
+    tracker.scan()
+
+    assert tracker.overdue_ids() == {late_id}
+
+
+def test_writes_update_the_overdue_locations(
+    db, tracker, make_equipment, make_location
+):
+    changes = []
+    tracker.subscribe(lambda: changes.append(tracker.count()))
+    late_id = make_location(make_equipment("Perceuse"), -5, -1)
+    tracker.scan()
+    assert changes == [1]
+
+    # Created after the scan, checked without scanning again
+    other_id = make_location(make_equipment("Scie"), -8, -2)
+    assert tracker.overdue_ids() == {late_id, other_id}
+
+    db.return_location(late_id)
+    assert tracker.overdue_ids() == {other_id}
+    assert changes == [1, 2, 1]
+
+
+def test_other_fields_are_not_checked(db, tracker, make_equipment, make_location):
+    location_id = make_location(make_equipment(), -5, -1)
+    tracker.scan()
+    queries = []
+    tracker.query = lambda ids=None: queries.append(ids) or set()
+
+    db.notify("locations", [location_id], {"total_cost"})
+    db.notify("equipments", [1], None)
+
+    assert queries == []
+    assert tracker.is_overdue(location_id)
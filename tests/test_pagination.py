@@ -0,0 +1,41 @@
+import pytest
+
+
+def all_pages(db, order_by, descending):
+    ids, cursor = [], None
+    while True:
+        page = db.get_equipments_page(
+            limit=2, cursor=cursor, order_by=order_by, descending=descending
+        )
+        ids += [equipment.id for equipment in page.items]
+        if page.next_cursor is None:
+            return ids
+        cursor = page.next_cursor
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_pages_over_a_nullable_column(db, make_equipment, descending):
+    weekly = [None, "50.00", None, "40.00", "50.00", None, "60.00"]
+    equipments = [
+        (make_equipment(name=f"Outil {i}", weekly=cost), cost)
+        for i, cost in enumerate(weekly)
+    ]
+
+    # Empty values first, last in descending order, then by id
+    empty = [id for id, cost in equipments if cost is None]
+    priced = sorted(
+        (id for id, cost in equipments if cost is not None),
+        key=lambda id: (float(dict(equipments)[id]), id),
+    )
+    expected = empty + priced
+    if descending:
+        expected.reverse()
+
+    assert all_pages(db, "cost_per_week", descending) == expected
+
+
+def test_pages_when_every_value_is_empty(db, make_equipment):
+    ids = [make_equipment(name=f"Outil {i}") for i in range(5)]
+
+    assert all_pages(db, "cost_per_month", False) == ids
+    assert all_pages(db, "cost_per_month", True) == ids[::-1]
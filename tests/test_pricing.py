@@ -0,0 +1,87 @@
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import select
+from location.database.database import SessionLocal
+from location.database.models import Location
+from location.database.pricing import PricingEngine
+
+pricing = PricingEngine()
+
+
+@pytest.mark.parametrize(
+    "days, weekly, monthly, cost",
+    [
+        # Daily rate only
+        (1, None, None, "10.00"),
+        (10, None, None, "100.00"),
+        # A week and 3 days, the days cost less than a week
+        (10, "50.00", None, "80.00"),
+        # A week and 6 days, the days cost more than a week
+        (13, "50.00", None, "100.00"),
+        # A month and 10 days priced by the week
+        (40, "50.00", "150.00", "230.00"),
+        # The monthly rate is not cheaper here
+        (30, "50.00", "250.00", "220.00"),
+    ],
+)
+def test_price_takes_the_cheapest_rates(days, weekly, monthly, cost):
+    assert pricing.price(days, "10.00", weekly, monthly) == Decimal(cost)
+
+
+def test_rental_days_are_at_least_one():
+    start = datetime(2025, 3, 1, 9)
+
+    assert pricing.rental_days(start, datetime(2025, 3, 1, 17)) == 1
+    assert pricing.rental_days(start, datetime(2025, 3, 8, 8)) == 7
+
+
+def test_late_fee_is_one_and_a_half_daily_rate():
+    end = datetime(2025, 3, 10)
+
+    assert pricing.late_fee("12.00", end, datetime(2025, 3, 9)) == Decimal("0.00")
+    assert pricing.late_fee("12.00", end, datetime(2025, 3, 10, 18)) == Decimal("0.00")
+    assert pricing.late_fee("12.00", end, datetime(2025, 3, 13)) == Decimal("54.00")
+
+
+def test_sql_late_fee_matches_late_fee(db, make_equipment, make_location):
+    location_id = make_location(make_equipment(daily="12.35"), -9, -2)
+    returned_at = datetime.now()
+
+    with SessionLocal() as session:
+        location = session.get(Location, location_id)
+        fee = session.scalar(
+            select(pricing.sql_late_fee(returned_at)).where(Location.id == location_id)
+        )
+
+    expected = pricing.late_fee("12.35", location.end_date, returned_at)
+    assert Decimal(str(fee)) == expected
+
+
+def test_location_keeps_the_rates_of_its_creation(db, make_equipment, make_location):
+    equipment_id = make_equipment(daily="10.00", weekly="50.00")
+    location_id = make_location(equipment_id, 1, 11)
+
+    db.update_prices(percent=20, equipment_ids=[equipment_id])
+
+    location = db.get_locations_by_ids([location_id])[0]
+    assert location.total_cost == Decimal("80.00")
+    assert db.get_equipment_by_id(equipment_id).cost_per_day == Decimal("12.00")
+
+
+def test_recompute_costs_keeps_the_stored_costs(db, make_equipment, make_location):
+    location_id = make_location(make_equipment(daily="10.00"), 1, 4)
+    missing_id = make_location(make_equipment(daily="7.00"), 1, 3)
+    with SessionLocal() as session, session.begin():
+        # A discount given at the counter, and a location not priced yet
+        session.get(Location, location_id).total_cost = Decimal("25.00")
+        session.get(Location, missing_id).total_cost = None
+
+    assert db.recompute_costs() == 1
+
+    locations = db.get_locations_by_ids([location_id, missing_id])
+    costs = {location.id: location.total_cost for location in locations}
+    assert costs == {location_id: Decimal("25.00"), missing_id: Decimal("14.00")}
+
+    assert db.recompute_costs(only_missing=False) == 2
+    assert db.get_locations_by_ids([location_id])[0].total_cost == Decimal("30.00")
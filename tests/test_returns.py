@@ -0,0 +1,131 @@
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from location.database.database import SessionLocal
+from location.database.models import Equipment, Location
+from location.database.pricing import AlreadyReturnedError
+
+
+def get(model, id):
+    with SessionLocal() as session:
+        return session.get(model, id)
+
+
+def free_ids(db, start, end):
+    return [equipment.id for equipment in db.get_free_equipments(start, end)]
+
+
+def test_return_adds_the_late_fee(db, make_equipment, make_location):
+    equipment_id = make_equipment(daily="10.00")
+    location_id = make_location(equipment_id, -10, -4)
+
+    db.return_location(location_id)
+
+    location = get(Location, location_id)
+    assert location.is_returned
+    assert location.late_fee == Decimal("60.00")
+    assert location.total_cost == Decimal("120.00")
+    assert get(Equipment, equipment_id).is_available
+
+
+def test_second_return_is_refused(db, make_equipment, make_location):
+    equipment_id = make_equipment(daily="10.00")
+    location_id = make_location(equipment_id, -10, -4)
+    db.return_location(location_id)
+    returned = get(Location, location_id)
+
+    with pytest.raises(AlreadyReturnedError):
+        db.return_location(location_id)
+
+    location = get(Location, location_id)
+    assert location.total_cost == returned.total_cost
+    assert location.late_fee == returned.late_fee
+    assert location.returned_at == returned.returned_at
+
+
+def test_return_keeps_equipment_rented_by_another_location(
+    db, make_equipment, make_location
+):
+    equipment_id = make_equipment()
+    location_id = make_location(equipment_id, -3, 2)
+
+    # A double booking, as a synchronization between branches may create
+    with SessionLocal() as session, session.begin():
+        other = session.get(Location, location_id)
+        session.add(
+            Location(
+                id_client=other.id_client,
+                id_equipment=equipment_id,
+                start_date=other.start_date - timedelta(days=1),
+                end_date=other.end_date,
+                is_returned=False,
+            )
+        )
+
+    db.return_location(location_id)
+
+    today = datetime.now()
+    assert equipment_id not in free_ids(db, today, today)
+
+
+def test_return_locations_before_frees_the_equipments(
+    db, make_equipment, make_location
+):
+    equipment_id = make_equipment()
+    late_id = make_location(equipment_id, -10, -4)
+    other_id = make_location(make_equipment("Scie"), -2, 5)
+
+    ids = db.return_locations_before(datetime.now() - timedelta(days=1))
+
+    assert ids == [late_id]
+    today = datetime.now()
+    assert equipment_id in free_ids(db, today, today)
+    assert not get(Location, other_id).is_returned
+
+
+def test_return_locations_before_bills_up_to_today(db, make_equipment, make_location):
+    late_id = make_location(make_equipment(daily="10.00"), -10, -4)
+
+    db.return_locations_before(datetime.now() - timedelta(days=3))
+
+    # Returned today, not at the date: 4 days late at 1.5 times the rate
+    location = get(Location, late_id)
+    assert location.returned_at.date() == datetime.now().date()
+    assert location.late_fee == Decimal("60.00")
+    assert location.total_cost == Decimal("120.00")
+
+
+def unpriced_location(client_id, equipment_id, start_days, end_days) -> int:
+    """
+    Location without rates nor cost, as inserted by an older version
+    """
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    with SessionLocal() as session, session.begin():
+        location = Location(
+            id_client=client_id,
+            id_equipment=equipment_id,
+            start_date=today + timedelta(days=start_days),
+            end_date=today + timedelta(days=end_days),
+            is_returned=False,
+        )
+        session.add(location)
+        session.flush()
+        return location.id
+
+
+def test_returns_price_the_locations_without_cost(db, client_id, make_equipment):
+    equipment_id = make_equipment(daily="10.00", weekly="50.00")
+    one_id = unpriced_location(client_id, equipment_id, -20, -13)
+    batch_id = unpriced_location(client_id, equipment_id, -10, -3)
+
+    db.return_location(one_id)
+    db.return_locations_before(datetime.now() - timedelta(days=1))
+
+    # A week at the weekly rate, and the days late at 1.5 times the daily rate
+    one, batch = get(Location, one_id), get(Location, batch_id)
+    assert (one.daily_rate, one.weekly_rate) == (Decimal("10.00"), Decimal("50.00"))
+    assert one.late_fee == Decimal("195.00")
+    assert one.total_cost == Decimal("245.00")
+    assert (batch.daily_rate, batch.weekly_rate) == (one.daily_rate, one.weekly_rate)
+    assert batch.late_fee == Decimal("45.00")
+    assert batch.total_cost == Decimal("95.00")
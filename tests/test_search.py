@@ -0,0 +1,46 @@
+from decimal import Decimal
+from location.database.database import create_db_engine
+from location.database.migrations import migrate
+from location.database.schema import ClientCreate, EquipmentCreate
+
+
+def test_migrate_creates_the_search_indexes(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    migrate(engine)
+
+    with engine.connect() as connection:
+        sql = dict(
+            connection.exec_driver_sql(
+                "SELECT name, sql FROM sqlite_master WHERE name LIKE '%_search%'"
+            ).all()
+        )
+    engine.dispose()
+
+    assert "clients_search" in sql and "equipments_search" in sql
+    assert (
+        "AFTER UPDATE OF name, email, phone ON clients" in sql["clients_search_update"]
+    )
+
+
+def test_search_follows_the_updates(db, client_id):
+    assert db.search_clients("dubois") == [client_id]
+
+    db.update_client(
+        client_id,
+        ClientCreate(name="Marc Leblanc", email="marc@email.fr", phone="5141112201"),
+    )
+
+    assert db.search_clients("dubois") == []
+    assert db.search_clients("leblanc") == [client_id]
+
+
+def test_search_ignores_other_columns(db, make_equipment):
+    equipment_id = make_equipment("Perceuse")
+    db.update_equipment(
+        equipment_id,
+        EquipmentCreate(
+            name="Perceuse", cost_per_day=Decimal("12"), is_available=False
+        ),
+    )
+
+    assert db.search_equipments("perceuse") == [equipment_id]
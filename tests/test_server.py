@@ -0,0 +1,54 @@
+import json
+import logging
+from location.server import Api, Request
+
+
+def call(db, method: str, target: str, body: dict = None):
+    request = Request(method, target, "HTTP/1.1", {})
+    if body is not None:
+        request.body = json.dumps(body).encode()
+    status, body, _ = Api(db).handle(request)
+    return status, json.loads(body) if body else None
+
+
+def test_missing_row_is_not_found(db, client_id):
+    location = {
+        "id_client": client_id,
+        "id_equipment": 999,
+        "start_date": "2030-01-01T00:00:00",
+        "end_date": "2030-01-03T00:00:00",
+        "is_returned": False,
+    }
+    status, body = call(db, "POST", "/locations", location)
+
+    assert status == 404
+    assert body == {"error": "Equipment not found"}
+    assert call(db, "POST", "/locations/999/return")[0] == 404
+
+
+def test_invalid_input_is_a_bad_request(db, make_equipment):
+    equipment_id = make_equipment()
+    location = {
+        "id_client": 1,
+        "id_equipment": equipment_id,
+        "start_date": "2030-01-03T00:00:00",
+        "end_date": "2030-01-01T00:00:00",
+        "is_returned": False,
+    }
+
+    assert call(db, "POST", "/locations", location)[0] == 400
+    assert call(db, "GET", "/equipments?order_by=gid")[0] == 400
+    assert call(db, "GET", "/equipments?descending=maybe")[0] == 400
+
+
+def test_unexpected_error_is_logged(db, monkeypatch, caplog):
+    def broken(**kwargs):
+        raise KeyError("secret")
+
+    monkeypatch.setattr(db, "get_clients_page", broken)
+    with caplog.at_level(logging.ERROR, logger="location.server"):
+        status, body = call(db, "GET", "/clients")
+
+    assert status == 500
+    assert body == {"error": "Internal error"}
+    assert "secret" in caplog.text
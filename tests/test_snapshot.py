@@ -0,0 +1,69 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from location.database import database_manager
+from location.database.database import ReadOnlyError, create_db_engine
+from location.database.database_manager import DatabaseManager
+from location.database.migrations import migrate
+from location.database.schema import ClientCreate
+from location.database.snapshot import LocationRow
+
+
+@pytest.fixture
+def snapshot(db, client_id, make_equipment, make_location, tmp_path):
+    """
+    Engine of a read-only snapshot of a database with two locations
+    """
+    make_location(make_equipment("Perceuse"), 1, 3)
+    make_location(make_equipment("Scie"), -5, -1)
+    path = str(tmp_path / "snapshot.db")
+    report = db.create_snapshot(path)
+    assert report.locations == 2
+
+    bind = create_db_engine("sqlite:///" + path, read_only=True)
+    yield bind
+    bind.dispose()
+
+
+def test_snapshot_precomputes_the_location_rows(db, snapshot):
+    with snapshot.connect() as connection:
+        rows = connection.execute(
+            select(
+                LocationRow.id, LocationRow.client_name, LocationRow.equipment_name
+            ).order_by(LocationRow.id)
+        ).all()
+        assert (
+            connection.exec_driver_sql("SELECT count(*) FROM change_log").scalar() == 0
+        )
+
+    expected = db.get_rows_by_ids("locations", [row.id for row in rows])
+    assert [tuple(row) for row in rows] == [
+        (row.id, row.client_name, row.equipment_name) for row in expected
+    ]
+    assert rows[0][1:] == ("Marc Dubois", "Perceuse")
+
+
+def test_snapshot_is_not_written(snapshot):
+    # Up to date, the migrations don't write it
+    migrate(snapshot)
+
+    with pytest.raises(OperationalError), snapshot.begin() as connection:
+        connection.exec_driver_sql("DELETE FROM clients")
+
+
+def test_read_only_manager(db, snapshot, monkeypatch):
+    monkeypatch.setattr(database_manager, "SessionLocal", sessionmaker(bind=snapshot))
+    monkeypatch.setattr(DatabaseManager, "read_only", True)
+    monkeypatch.setattr(DatabaseManager, "location_rows", None)
+
+    rows = db.get_rows_page("locations", order_by="end_date").items
+    assert [row.equipment_name for row in rows] == ["Scie", "Perceuse"]
+    assert DatabaseManager.location_rows
+
+    with pytest.raises(ReadOnlyError):
+        db.create_client(
+            ClientCreate(
+                name="Julie Tremblay", email="julie@email.fr", phone="5142223302"
+            )
+        )
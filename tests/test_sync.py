@@ -0,0 +1,148 @@
+import pytest
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from location.database.models import Client, Equipment, Location
+from location.database.sync import DatabasePeer, synchronize
+
+
+@pytest.fixture
+def remote(db, tmp_path):
+    """
+    Database of another branch
+    """
+    peer = DatabasePeer(str(tmp_path / "branch.db"))
+    yield peer
+    peer.close()
+
+
+def add(peer: DatabasePeer, *rows):
+    with Session(peer.engine, expire_on_commit=False) as session, session.begin():
+        session.add_all(rows)
+    # The versions are stamped to the millisecond
+    time.sleep(0.002)
+
+
+def rows(peer: DatabasePeer, model) -> list:
+    with Session(peer.engine, expire_on_commit=False) as session:
+        return session.scalars(select(model).order_by(model.id)).all()
+
+
+def today(days: int = 0) -> datetime:
+    return datetime.combine(datetime.now().date(), datetime.min.time()) + timedelta(
+        days=days
+    )
+
+
+def test_sync_exchanges_the_rows(db, client_id, make_equipment, remote):
+    equipment_id = make_equipment("Perceuse")
+    client = Client(name="Julie Tremblay", email="julie@email.fr", phone="5142223302")
+    equipment = Equipment(name="Scie", cost_per_day=Decimal("7.00"), is_available=True)
+    add(remote, client, equipment)
+    add(
+        remote,
+        Location(
+            id_client=client.id,
+            id_equipment=equipment.id,
+            start_date=today(1),
+            end_date=today(3),
+            is_returned=False,
+            total_cost=Decimal("14.00"),
+        ),
+    )
+
+    pulled, pushed = synchronize(db, remote)
+
+    assert (pulled.inserted, pushed.inserted) == (3, 2)
+    location = db.get_locations()[0]
+    assert location.client.name == "Julie Tremblay"
+    assert location.equipment.name == "Scie"
+    assert [e.name for e in rows(remote, Equipment)] == ["Scie", "Perceuse"]
+    assert db.get_equipment_by_id(equipment_id).name == "Perceuse"
+
+
+def test_watermarks_only_send_the_new_changes(db, client_id, remote):
+    synchronize(db, remote)
+
+    pulled, pushed = synchronize(db, remote)
+    assert (pulled.received, pushed.received) == (0, 0)
+
+    add(remote, Client(name="Luc Martin", email="luc@email.fr", phone="5144445504"))
+    pulled, pushed = synchronize(db, remote)
+    assert (pulled.received, pushed.received) == (1, 0)
+    assert len(db.get_clients()) == 2
+
+
+def test_most_recent_version_wins(db, client_id, remote):
+    synchronize(db, remote)
+    with Session(remote.engine) as session, session.begin():
+        session.scalars(select(Client)).one().name = "Marc D."
+    time.sleep(0.002)
+    data = db.get_client_by_id(client_id).model_copy(update={"name": "Marc Roy"})
+    db.update_client(client_id, data)
+
+    synchronize(db, remote)
+
+    assert db.get_client_by_id(client_id).name == "Marc Roy"
+    assert rows(remote, Client)[0].name == "Marc Roy"
+
+
+def test_returned_location_stays_returned(db, make_equipment, make_location, remote):
+    location_id = make_location(make_equipment(), -5, -1)
+    synchronize(db, remote)
+
+    db.return_location(location_id)
+    time.sleep(0.002)
+    with Session(remote.engine) as session, session.begin():
+        session.scalars(select(Location)).one().end_date = today(2)
+
+    synchronize(db, remote)
+
+    for location in (db.get_locations()[0], rows(remote, Location)[0]):
+        assert location.is_returned
+        assert location.end_date == today(2)
+
+
+def test_client_created_in_both_branches_is_merged(db, client_id, remote):
+    add(remote, Client(name="Marc Dubois", email="MARC@email.fr", phone="5141112201"))
+
+    pulled, _ = synchronize(db, remote)
+
+    assert pulled.merged == 1
+    assert len(db.get_clients()) == 1
+    assert len(rows(remote, Client)) == 1
+
+
+def test_double_booking_is_kept_as_a_conflict(
+    db, make_equipment, make_location, remote
+):
+    # The client of make_location and the equipment are in both branches
+    equipment_id = make_equipment()
+    synchronize(db, remote)
+    make_location(equipment_id, 1, 4)
+    with Session(remote.engine) as session, session.begin():
+        client = session.scalars(select(Client)).one()
+        equipment = session.scalars(select(Equipment)).one()
+        session.add(
+            Location(
+                id_client=client.id,
+                id_equipment=equipment.id,
+                start_date=today(3),
+                end_date=today(6),
+                is_returned=False,
+            )
+        )
+
+    pulled, pushed = synchronize(db, remote)
+
+    assert (pulled.conflicts, pushed.conflicts) == (1, 1)
+    assert len(db.get_locations()) == 2
+    [conflict] = db.get_sync_conflicts()
+    assert conflict.id_equipment == equipment_id
+
+
+def test_same_branch_is_refused(db):
+    with pytest.raises(ValueError):
+        synchronize(db, db)
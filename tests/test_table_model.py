@@ -0,0 +1,84 @@
+from datetime import datetime
+from decimal import Decimal
+from PySide6.QtCore import QPersistentModelIndex, Qt
+from location.ui.table_model import TableModel
+
+
+def test_matching_ids_search_the_text_shown():
+    model = TableModel(
+        ["Index", "Nom", "Disponible"], {2: lambda value: "Oui" if value else "Non"}
+    )
+    model.set_rows([(1, "Perceuse", True), (2, "Scie", False), (3, None, True)])
+
+    assert model.matching_ids("PERC") == [1]
+    assert model.matching_ids("non") == [2]
+    assert model.matching_ids("oui") == [1, 3]
+    assert model.matching_ids("marteau") == []
+
+
+def shown_ids(model) -> list[int]:
+    return [model.id_at(row) for row in range(model.rowCount())]
+
+
+def cost_model() -> TableModel:
+    model = TableModel(["Index", "Coût", "Fin"])
+    model.set_rows(
+        [
+            (1, Decimal("9.50"), datetime(2026, 3, 1)),
+            (2, None, datetime(2025, 12, 31)),
+            (3, Decimal("10.00"), None),
+            (4, Decimal("100.00"), datetime(2026, 1, 15)),
+        ]
+    )
+    return model
+
+
+def test_sort_compares_the_typed_values():
+    model = cost_model()
+
+    # As text, "10.00" would come before "9.50"
+    model.sort(1)
+    assert shown_ids(model) == [2, 1, 3, 4]
+
+    model.sort(2, Qt.SortOrder.DescendingOrder)
+    assert shown_ids(model) == [1, 4, 2, 3]
+
+
+def test_empty_cells_are_first_ascending_and_last_descending():
+    model = cost_model()
+    model.sort(1)
+
+    # Only the direction changes, the filled cells are reversed
+    model.sort(1, Qt.SortOrder.DescendingOrder)
+    assert shown_ids(model) == [4, 3, 1, 2]
+    model.sort(1, Qt.SortOrder.AscendingOrder)
+    assert shown_ids(model) == [2, 1, 3, 4]
+
+    # New rows are placed by their keys, empty ones included
+    model.upsert_rows([(5, None, None), (6, Decimal("50.00"), None)])
+    assert shown_ids(model) == [2, 5, 1, 3, 6, 4]
+
+
+def test_updated_rows_move_with_their_key():
+    model = cost_model()
+    model.sort(1)
+
+    model.upsert_rows([(4, Decimal("1.00"), None), (2, Decimal("20.00"), None)])
+
+    assert shown_ids(model) == [4, 1, 3, 2]
+    assert model.data(model.index(0, 1)) == "1.00"
+
+
+def test_persistent_indexes_follow_their_row():
+    model = cost_model()
+    selected = QPersistentModelIndex(model.index(2, 1))
+    hidden = QPersistentModelIndex(model.index(1, 1))
+    assert model.id_at(selected.row()) == 3
+
+    model.sort(1, Qt.SortOrder.DescendingOrder)
+    assert model.id_at(selected.row()) == 3
+
+    model.set_visible_ids([1, 3])
+    assert shown_ids(model) == [3, 1]
+    assert model.id_at(selected.row()) == 3
+    assert not hidden.isValid()